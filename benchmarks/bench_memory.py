@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Memory regression harness for scans and result writers, using tracemalloc.
+
+For each tree size a synthetic tree of small Python files is generated and
+each stage runs under tracemalloc: the scan (``analyze_directory``), the
+JSON writer and the SQLite writer. Peak bytes (while the stage runs) and
+retained bytes (still allocated once it returns, e.g. the result of the
+scan) are reported per file and checked against ``BUDGETS``; the exit status
+is 1 when a budget is exceeded. The top allocation sites of the retained
+memory are printed so a regression can be traced to a line. CPython reuses
+freed dicts and lists from free lists without a new allocation, so a site
+may be where a block was first allocated for another object; rerun with a
+deeper ``tracemalloc`` traceback if a site looks unlikely.
+
+tracemalloc makes the stages several times slower, so this is not a timing
+benchmark. Generating the 1M-file tree takes a while and a few GiB of disk
+(set BENCH_DIR to put it elsewhere than the temporary directory).
+
+Usage:
+    python benchmarks/bench_memory.py [PATH] [--files N[,N...]] [--top N] [--budget-scale X]
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from lines_counter.core import analyze_directory, save_results_to_json  # noqa: E402
+from lines_counter.resultdb import write_results_to_sqlite  # noqa: E402
+
+
+# (peak, retained) bytes per file allowed for each stage: the figures of the
+# 10k-file tree on CPython 3.11 (the largest per file, as fixed costs such as
+# imports are spread over fewer files) with about 50% headroom
+BUDGETS = {
+    'scan': (2600, 900),
+    'json': (64, 16),
+    'sqlite': (128, 16),
+}
+
+# Files per leaf directory of the generated tree
+FILES_PER_DIRECTORY = 100
+
+
+def make_tree(root: Path, files: int) -> None:
+    """Write a tree of small Python files, FILES_PER_DIRECTORY per directory, two levels deep."""
+    rng = random.Random(0)
+    lines = ["# comment\n", "value = compute(1, 2)\n", "\n"]
+    for index in range(files):
+        directory = index // FILES_PER_DIRECTORY
+        path = root / f"service{directory // 100}" / f"package{directory % 100}" / f"module{index}.py"
+        if index % FILES_PER_DIRECTORY == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("".join(rng.choice(lines) for _ in range(rng.randint(1, 20))))
+
+
+def measure(stage, *args):
+    """
+    Run one stage under tracemalloc.
+
+    Returns:
+        Tuple of (result of the stage, peak bytes, retained bytes, snapshot
+        taken before the stage, snapshot taken after it)
+    """
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = stage(*args)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    return result, peak, retained, before, tracemalloc.take_snapshot()
+
+
+def report(files: int, stage: str, peak: int, retained: int, budget_scale: float) -> bool:
+    """Print the per-file figures of a stage; return whether they are within budget."""
+    peak_budget, retained_budget = (limit * budget_scale for limit in BUDGETS[stage])
+    peak_per_file = peak / max(files, 1)
+    retained_per_file = retained / max(files, 1)
+    ok = peak_per_file <= peak_budget and retained_per_file <= retained_budget
+    print(f"{files:8d} files  {stage:7s} peak {peak_per_file:8.1f} B/file (budget {peak_budget:6.0f})  "
+          f"retained {retained_per_file:8.1f} B/file (budget {retained_budget:6.0f})  "
+          f"{'ok' if ok else 'OVER BUDGET'}")
+    return ok
+
+
+def print_top_sites(before, after, top: int) -> None:
+    """Print the allocation sites that grew the most between two snapshots."""
+    for stat in after.compare_to(before, 'lineno')[:top]:
+        frame = stat.traceback[0]
+        print(f"    {stat.size_diff / 1024:10.1f} KiB  {stat.count_diff:+9d} blocks  "
+              f"{frame.filename}:{frame.lineno}")
+
+
+def run(root: Path, top: int, budget_scale: float) -> bool:
+    """Measure every stage on one tree; return whether all stayed within budget."""
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_memory_out_", dir=os.environ.get("BENCH_DIR")))
+    within_budget = True
+    try:
+        tracemalloc.start(1)
+        results, peak, retained, before, after = measure(analyze_directory, root)
+        files = results['summary']['total_files']
+        within_budget &= report(files, 'scan', peak, retained, budget_scale)
+        print_top_sites(before, after, top)
+
+        writers = [
+            ('json', save_results_to_json, work_dir / "results.json"),
+            ('sqlite', write_results_to_sqlite, work_dir / "results.db"),
+        ]
+        for stage, writer, output_path in writers:
+            _, peak, retained, before, after = measure(writer, results, output_path)
+            within_budget &= report(files, stage, peak, retained, budget_scale)
+            print_top_sites(before, after, top)
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(work_dir)
+    return within_budget
+
+
+def main():
+    """Run the harness and exit with status 1 if a budget is exceeded."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", type=Path, help="Tree to scan (default: generated trees)")
+    parser.add_argument("--files", default="10000,100000,1000000",
+                        help="Comma-separated sizes of the generated trees")
+    parser.add_argument("--top", type=int, default=5, help="Allocation sites printed per stage")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget by this factor")
+    args = parser.parse_args()
+
+    if args.path is not None:
+        within_budget = run(args.path, args.top, args.budget_scale)
+    else:
+        within_budget = True
+        for files in (int(size) for size in args.files.split(",")):
+            temp_dir = tempfile.mkdtemp(prefix="bench_memory_", dir=os.environ.get("BENCH_DIR"))
+            try:
+                make_tree(Path(temp_dir), files)
+                within_budget &= run(Path(temp_dir), args.top, args.budget_scale)
+            finally:
+                shutil.rmtree(temp_dir)
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Overhead of classifier plugins compared with the built-in comment patterns.
+
+The same Python tree is scanned with the built-in patterns, with a plugin
+that only counts lines (the cost of dispatching to a plugin) and with a
+MarkerClassifier implementing the same comment rules as the built-in entry,
+each with the serial backend and a process pool. The tree is either given
+on the command line or generated in a temporary directory.
+
+Usage:
+    python benchmarks/bench_plugins.py [PATH] [--files N] [--repeat N] [--jobs N]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from lines_counter.core import analyze_directory  # noqa: E402
+from lines_counter.plugins import Classifier, MarkerClassifier  # noqa: E402
+
+
+class LineCountClassifier(Classifier):
+    """Plugin doing no classification at all, so only the plugin overhead is left."""
+
+    language = 'Python'
+    extensions = ('.py',)
+
+    def count(self, data):
+        total = data.count(b'\n') + (not data.endswith(b'\n') and bool(data))
+        return {'total': total, 'code': total, 'comments': 0, 'blank': 0}
+
+
+PYTHON_RULES = MarkerClassifier('Python', ['.py'], single=('#',), blocks=[('"""', '"""')])
+
+
+def make_tree(root: Path, files: int) -> None:
+    """Write a tree of Python files."""
+    rng = random.Random(0)
+    lines = ['# comment\n', 'value = compute(1, 2)\n', '\n', '"""doc\n', 'text"""\n']
+    for index in range(files):
+        path = root / f"pkg{index % 50}" / f"module{index}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(''.join(rng.choice(lines) for _ in range(rng.randint(20, 400))))
+
+
+def time_scan(root: Path, repeat: int, **options) -> float:
+    """Median wall time of warm scans."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        analyze_directory(root, **options)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark and print one line per configuration."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", type=Path, help="Tree to scan (default: generated)")
+    parser.add_argument("--files", type=int, default=5000, help="Files in the generated tree")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per configuration")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Workers of the process pool")
+    args = parser.parse_args()
+
+    temp_dir = None
+    root = args.path
+    if root is None:
+        temp_dir = tempfile.mkdtemp(prefix="bench_plugins_", dir=os.environ.get("BENCH_DIR"))
+        root = Path(temp_dir)
+        make_tree(root, args.files)
+
+    files = analyze_directory(root, classifiers=[])['summary']['total_files']
+    configurations = [
+        ("built-in patterns", []),
+        ("line-count plugin", [LineCountClassifier()]),
+        ("MarkerClassifier", [PYTHON_RULES]),
+    ]
+    backends = [("serial", {}), (f"process x{args.jobs}", {'backend': 'process', 'workers': args.jobs})]
+    try:
+        for backend_name, backend_options in backends:
+            baseline = None
+            for name, classifiers in configurations:
+                elapsed = time_scan(root, args.repeat, classifiers=classifiers, **backend_options)
+                baseline = baseline or elapsed
+                per_file = (elapsed - baseline) / max(files, 1) * 1e6
+                print(f"{backend_name:12s} {name:20s} {elapsed * 1000:9.1f} ms  "
+                      f"{elapsed / baseline:5.2f}x  {per_file:+7.1f} us/file")
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
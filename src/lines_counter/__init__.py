@@ -5,7 +5,8 @@ Lines Counter - A Python package to count lines of code, comments, and blank lin
 __version__ = "0.1.0"
 __author__ = "Team Legend"
 
-from .core import count_lines, analyze_directory
+from .core import count_lines, analyze_directory, analyze_directories, analyze_stream
 from .file_analyzer import FileAnalyzer
+from .git_source import GitSource, analyze_revision
 
-__all__ = ["count_lines", "analyze_directory", "FileAnalyzer"] 
\ No newline at end of file
+__all__ = ["count_lines", "analyze_directory", "analyze_directories", "analyze_stream", "FileAnalyzer", "GitSource", "analyze_revision"] 
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Optional vectorised line classification kernel.
+
+The kernel is used automatically when NumPy is installed. It only handles
+buffers it can classify exactly like ``FileAnalyzer._count_line_types``;
+for everything else it returns None and the caller falls back to the
+scalar implementation.
+"""
+
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is missing
+    np = None
+
+
+HAVE_NUMPY = np is not None
+
+# Below this size the fixed cost of the vectorised pass outweighs its gain
+MIN_KERNEL_SIZE = 16 * 1024
+
+# With extra metrics the scalar path does more work per line, so the
+# vectorised pass pays off for smaller buffers
+MIN_METRICS_KERNEL_SIZE = 8 * 1024
+
+# ASCII characters that str.strip() removes
+_WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+if HAVE_NUMPY:
+    _IS_WHITESPACE = np.zeros(256, dtype=bool)
+    _IS_WHITESPACE[list(_WHITESPACE)] = True
+
+
+def _delimiter_bytes(delimiter: Optional[str]) -> Optional[bytes]:
+    """
+    Encode a comment delimiter, or raise ValueError if the kernel can't handle it.
+
+    Delimiters must be ASCII and must not begin or end with whitespace, so that
+    finding them in the raw line is the same as finding them in the stripped line.
+    """
+    if not delimiter:
+        return None
+    raw = delimiter.encode('ascii')
+    if raw[:1] in _WHITESPACE or raw[-1:] in _WHITESPACE or b'\n' in raw:
+        raise ValueError(delimiter)
+    return raw
+
+
+def _lines_containing(arr, starts, total: int, delimiter: bytes):
+    """Mark the lines that contain at least one occurrence of ``delimiter``."""
+    hits = np.zeros(total, dtype=bool)
+    width = len(delimiter)
+    if arr.size < width:
+        return hits
+
+    span = arr.size - width + 1
+    found = arr[:span] == delimiter[0]
+    for offset in range(1, width):
+        found &= arr[offset:span + offset] == delimiter[offset]
+
+    positions = np.flatnonzero(found)
+    hits[np.searchsorted(starts, positions, side='right') - 1] = True
+    return hits
+
+
+def _starts_with(arr, first, ends, nonblank, prefix: bytes):
+    """Mark the non-blank lines whose first non-whitespace characters are ``prefix``."""
+    width = len(prefix)
+    match = nonblank & (first + width <= ends)
+    last = arr.size - 1
+    for offset in range(width):
+        match &= arr[np.minimum(first + offset, last)] == prefix[offset]
+    return match
+
+
+def _line_metrics(arr, starts, ends, first, nonblank) -> Dict:
+    """Derive the extra per-file metrics from the line boundaries already computed."""
+    total = starts.size
+    if total == 0:
+        return {'longest_line': 0, 'average_line_length': 0.0, 'max_indent': 0,
+                'trailing_whitespace_lines': 0, 'bytes': 0}
+    lengths = ends - starts
+    last = arr[np.maximum(ends - 1, 0)]
+    trailing = (lengths > 0) & ((last == 32) | (last == 9))
+    indents = (first - starts)[nonblank]
+    return {
+        'longest_line': int(lengths.max()),
+        'average_line_length': round(int(lengths.sum()) / total, 2),
+        'max_indent': int(indents.max()) if indents.size else 0,
+        'trailing_whitespace_lines': int(np.count_nonzero(trailing)),
+        'bytes': int(arr.size)
+    }
+
+
+def count_line_types(data: bytes, patterns: Dict[str, str], metrics: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Count line types in a UTF-8 buffer with a vectorised pass.
+
+    Blank lines and single-line comments are classified in bulk. The block
+    comment state is derived from the lines that contain a block delimiter
+    and broadcast to the lines in between, so no per-line Python loop runs.
+
+    Args:
+        data: Raw file content
+        patterns: Comment patterns for the file type
+        metrics: Whether to add a 'metrics' dictionary (see
+            ``FileAnalyzer._count_line_types``, plus 'bytes'), derived from the
+            same line boundaries
+
+    Returns:
+        Dictionary with line counts, or None if the buffer must be handled by
+        the scalar implementation (non-ASCII content, carriage returns or
+        unsupported delimiters)
+    """
+    if not HAVE_NUMPY or not data.isascii() or b'\r' in data:
+        return None
+
+    try:
+        single = _delimiter_bytes(patterns.get('single'))
+        multi_start = _delimiter_bytes(patterns.get('multi_start'))
+        multi_end = _delimiter_bytes(patterns.get('multi_end'))
+    except (UnicodeEncodeError, ValueError):
+        return None
+
+    arr = np.frombuffer(data, dtype=np.uint8)
+    size = arr.size
+    if size == 0:
+        counts = {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+        if metrics:
+            counts['metrics'] = _line_metrics(arr, arr, arr, arr, arr)
+        return counts
+
+    # Line boundaries: a trailing newline does not start another line
+    newlines = np.flatnonzero(arr == 10)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [size]))
+    if data.endswith(b'\n'):
+        starts = starts[:-1]
+        ends = ends[:-1]
+    total = int(starts.size)
+
+    # Position of the first non-whitespace byte of each line
+    non_whitespace = np.flatnonzero(~_IS_WHITESPACE[arr])
+    if non_whitespace.size == 0:
+        first = np.full(total, size)
+    else:
+        index = np.searchsorted(non_whitespace, starts)
+        first = np.where(
+            index < non_whitespace.size,
+            non_whitespace[np.minimum(index, non_whitespace.size - 1)],
+            size
+        )
+    nonblank = first < ends
+
+    comment = np.zeros(total, dtype=bool)
+    if single is not None:
+        comment |= _starts_with(arr, first, ends, nonblank, single)
+
+    if multi_start is not None:
+        has_start = _lines_containing(arr, starts, total, multi_start) & nonblank
+        if multi_end is not None:
+            has_end = _lines_containing(arr, starts, total, multi_end) & nonblank
+        else:
+            has_end = np.zeros(total, dtype=bool)
+
+        # A line that opens a block without closing it always leaves the state
+        # "inside", and a line that only closes one always leaves it "outside";
+        # every other line keeps the state. So the state before each line is
+        # the kind of the last such event above it.
+        events = np.flatnonzero(has_start != has_end)
+        last_event = np.searchsorted(events, np.arange(total), side='left') - 1
+        inside = np.zeros(total, dtype=bool)
+        has_event = last_event >= 0
+        inside[has_event] = has_start[events[last_event[has_event]]]
+
+        comment |= has_start | (inside & nonblank)
+
+    nonblank_lines = int(np.count_nonzero(nonblank))
+    comment_lines = int(np.count_nonzero(comment))
+    counts = {
+        'total': total,
+        'code': nonblank_lines - comment_lines,
+        'comments': comment_lines,
+        'blank': total - nonblank_lines
+    }
+    if metrics:
+        counts['metrics'] = _line_metrics(arr, starts, ends, first, nonblank)
+    return counts
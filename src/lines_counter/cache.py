@@ -0,0 +1,235 @@
+"""
+Persistent scan cache for directory listings and per-file results.
+
+Directory listings are keyed on the directory's ``st_mtime_ns``: a directory
+whose mtime has not changed still has the same entries, so it does not need
+to be listed again. File results are keyed on ``(st_size, st_mtime_ns)``.
+The cached results also answer directory totals without a scan
+(``directory_totals``).
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .file_analyzer import FileAnalyzer
+from .rollup import ROLLUP_COLUMNS
+
+
+# Entries modified this recently are not cached: another change within the
+# same timestamp tick would go unnoticed
+_RACY_WINDOW_NS = 2_000_000_000
+
+# Version of the layout of cache entries
+_FORMAT = 2
+
+# Listing entry kinds
+DIRECTORY = 'd'
+FILE = 'f'
+OTHER = 'o'
+
+
+def _fingerprint() -> str:
+    """Identify the package version, entry layout and comment patterns the cached results depend on."""
+    from . import __version__
+    patterns = json.dumps(FileAnalyzer.COMMENT_PATTERNS, sort_keys=True)
+    return hashlib.sha1(f'{__version__}:{_FORMAT}:{patterns}'.encode()).hexdigest()
+
+
+class ScanCache:
+    """Directory listing and file result cache, optionally persisted to a JSON file."""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: JSON file to load from and save to; the cache is memory-only if not given
+        """
+        self.path = Path(path) if path is not None else None
+        self._listings: Dict[str, list] = {}
+        self._files: Dict[str, list] = {}
+        self._seen_listings = set()
+        self._seen_files = set()
+        self._listing_mtimes: Dict[str, int] = {}
+        self._started_ns = time.time_ns()
+        self.stats = {'dir_hits': 0, 'dir_misses': 0, 'file_hits': 0, 'file_misses': 0}
+
+    def load(self) -> 'ScanCache':
+        """
+        Load the cache file if it exists and was written by a compatible version.
+
+        Returns:
+            The cache itself
+        """
+        if self.path is None or not self.path.exists():
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('fingerprint') == _fingerprint():
+            self._listings = data.get('listings', {})
+            self._files = data.get('files', {})
+        return self
+
+    def save(self) -> None:
+        """
+        Write the cache file, keeping only entries seen since the cache was created.
+
+        Entries for deleted directories and files are dropped this way.
+        """
+        if self.path is None:
+            return
+        data = {
+            'fingerprint': _fingerprint(),
+            'listings': {key: self._listings[key] for key in self._seen_listings if key in self._listings},
+            'files': {key: self._files[key] for key in self._seen_files if key in self._files},
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def begin_scan(self) -> None:
+        """Reset the racy-timestamp reference point and the statistics before a new scan."""
+        self._started_ns = time.time_ns()
+        self._listing_mtimes.clear()
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def _is_stable(self, mtime_ns: int) -> bool:
+        """Check that an mtime is old enough to be trusted as a cache key."""
+        return mtime_ns < self._started_ns - _RACY_WINDOW_NS
+
+    def get_listing(self, directory: str, mtime_ns: int) -> Optional[List[Tuple[str, bool, str]]]:
+        """
+        Get the cached entries of a directory.
+
+        Args:
+            directory: Absolute directory path
+            mtime_ns: Current ``st_mtime_ns`` of the directory
+
+        Returns:
+            List of (name, is_symlink, kind) tuples, or None if the directory must be listed
+        """
+        self._seen_listings.add(directory)
+        self._listing_mtimes[directory] = mtime_ns
+        cached = self._listings.get(directory)
+        if cached is None or cached[0] != mtime_ns:
+            self.stats['dir_misses'] += 1
+            return None
+        self.stats['dir_hits'] += 1
+        return [tuple(entry) for entry in cached[1]]
+
+    def put_listing(self, directory: str, mtime_ns: int, entries: List[Tuple[str, bool, str]]) -> None:
+        """
+        Store the entries of a directory.
+
+        Args:
+            directory: Absolute directory path
+            mtime_ns: ``st_mtime_ns`` of the directory when it was listed
+            entries: List of (name, is_symlink, kind) tuples
+        """
+        self._seen_listings.add(directory)
+        self._listing_mtimes[directory] = mtime_ns
+        if self._is_stable(mtime_ns):
+            self._listings[directory] = [mtime_ns, [list(entry) for entry in entries]]
+        else:
+            self._listings.pop(directory, None)
+
+    def directories_changed(self) -> bool:
+        """
+        Check whether any directory listed so far has changed since it was listed.
+
+        This costs one stat per directory and no directory reads, so it is a
+        cheap way to notice added, removed or renamed files between scans.
+        Files modified in place do not change their directory's mtime.
+
+        Returns:
+            True if a directory's mtime changed or a directory disappeared
+        """
+        for directory, mtime_ns in self._listing_mtimes.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def get_file(self, file_path: str,
+                 st: os.stat_result) -> Optional[Tuple[Optional[Dict[str, int]], Optional[str], Optional[str]]]:
+        """
+        Get the cached result of a file.
+
+        Args:
+            file_path: Absolute file path
+            st: Current stat result of the file
+
+        Returns:
+            Tuple of (line counts or None for skipped content, encoding, kind
+            of a generated file or None), or None on a miss
+        """
+        self._seen_files.add(file_path)
+        cached = self._files.get(file_path)
+        if cached is None or cached[0] != st.st_size or cached[1] != st.st_mtime_ns:
+            self.stats['file_misses'] += 1
+            return None
+        self.stats['file_hits'] += 1
+        return cached[2], cached[3], cached[4]
+
+    def put_file(self, file_path: str, st: os.stat_result, counts: Optional[Dict[str, int]],
+                 encoding: Optional[str], kind: Optional[str] = None) -> None:
+        """
+        Store the result of a file.
+
+        Args:
+            file_path: Absolute file path
+            st: Stat result of the file taken before it was read
+            counts: Line counts, or None for skipped content
+            encoding: Detected encoding, or None if the file was not read
+            kind: Kind of a generated, minified or vendored file, or None
+        """
+        self._seen_files.add(file_path)
+        if self._is_stable(st.st_mtime_ns):
+            self._files[file_path] = [st.st_size, st.st_mtime_ns, counts, encoding, kind]
+        else:
+            self._files.pop(file_path, None)
+
+    def directory_totals(self, directory: Path) -> Optional[Dict[str, int]]:
+        """
+        Get the totals of the files under a directory from the cached results, without scanning.
+
+        Each counted file is included once, whatever options it was scanned
+        with; skipped and generated files are left out. The totals are those of
+        the last scans through the cache, except for files modified within two
+        seconds of their scan, which are not cached.
+
+        Args:
+            directory: Directory path
+
+        Returns:
+            Dictionary with 'files', 'total_lines', 'code_lines', 'comment_lines'
+            and 'blank_lines', as from ``rollup.get_directory_totals``, or None
+            if no cached file lives under the directory
+        """
+        prefix = os.path.join(os.path.abspath(directory), '')
+        counted = set()
+        values = [0] * len(ROLLUP_COLUMNS)
+        for key, entry in self._files.items():
+            counts, kind = entry[2], entry[4]
+            if counts is None or kind is not None or not key.startswith(prefix):
+                continue
+            file_path = key.split('\0', 1)[0]
+            if file_path in counted:
+                continue
+            counted.add(file_path)
+            for i, value in enumerate((1, counts['total'], counts['code'], counts['comments'], counts['blank'])):
+                values[i] += value
+        if not counted:
+            return None
+        return dict(zip(ROLLUP_COLUMNS, values))
@@ -0,0 +1,134 @@
+"""
+Checkpoint journal for resumable directory scans.
+
+The journal is a JSON Lines file. The first line describes the scan (root
+and options); every following line is the record of one finished file,
+with the size and mtime the file had when it was read. Records are buffered and made durable at regular intervals, so a preempted
+scan loses at most one interval of work.
+
+Only file results are journaled, not the walk: a resumed scan enumerates the
+tree again and skips reading the files it finds in the journal unchanged,
+with the same size and mtime, as in ``ScanCache``. Enumeration
+is cheap next to reading, all the more so with a ScanCache, which lists
+unchanged directories from the cache.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class Checkpoint:
+    """Append-only journal of per-file results for one directory scan."""
+
+    def __init__(self, path: Path, resume: bool = False, interval: float = 10.0):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            path: Journal file path
+            resume: Whether to continue from an existing journal instead of starting over
+            interval: Seconds between durable flushes of the journal
+        """
+        self.path = Path(path)
+        self.resume = resume
+        self.interval = interval
+        self._file = None
+        self._last_sync = 0.0
+        # Journal entries of the previous run, keyed by relative path
+        self._journaled: Dict[str, Dict] = {}
+        self.replayed = 0
+
+    def start(self, header: Dict) -> None:
+        """
+        Open the journal for a scan.
+
+        Args:
+            header: JSON-serialisable description of the scan (root and options)
+
+        Raises:
+            ValueError: If the journal to resume was written for a different scan
+        """
+        self._journaled = {}
+        if self.resume and self.path.exists():
+            self._journaled = self._load(header)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(json.dumps({'checkpoint': header}, ensure_ascii=False) + '\n')
+            self._sync()
+        self._last_sync = time.monotonic()
+        self.replayed = 0
+
+    def replay(self, relative_path: str, st: os.stat_result) -> Optional[Dict]:
+        """
+        Get the record of a file finished by the interrupted run.
+
+        Args:
+            relative_path: File path relative to the scanned root
+            st: Current stat result of the file
+
+        Returns:
+            The journaled record, or None if the file is not in the journal or
+            its size or mtime changed since it was read
+        """
+        entry = self._journaled.get(relative_path)
+        if entry is None or entry['stat'] != [st.st_size, st.st_mtime_ns]:
+            return None
+        self.replayed += 1
+        return entry['record']
+
+    def _load(self, header: Dict) -> Dict[str, Dict]:
+        """Read the records of an existing journal, dropping a trailing partial line."""
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete != len(data):
+                f.truncate(complete)
+
+        lines = data[:complete].decode('utf-8').splitlines()
+        if not lines or json.loads(lines[0]).get('checkpoint') != header:
+            raise ValueError(f"checkpoint {self.path} was written for a different scan")
+
+        entries = {}
+        for line in lines[1:]:
+            entry = json.loads(line)
+            entries[entry['record']['path']] = entry
+        return entries
+
+    def _sync(self) -> None:
+        """Flush buffered records to stable storage."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def record(self, record: Dict, st: os.stat_result) -> None:
+        """
+        Append the record of a finished file.
+
+        Args:
+            record: File result or skip record; must contain 'path'
+            st: Stat result of the file taken before it was read
+        """
+        entry = {'stat': [st.st_size, st.st_mtime_ns], 'record': record}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        if time.monotonic() - self._last_sync >= self.interval:
+            self._sync()
+
+    def close(self, complete: bool) -> None:
+        """
+        Close the journal.
+
+        Args:
+            complete: Whether the scan finished; the journal is removed if so and
+                kept for a later resume otherwise
+        """
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
+        if complete:
+            self.path.unlink()
@@ -3,21 +3,96 @@ Command-line interface for the lines counter tool.
 """
 
 import json
+import signal
 import sys
+import urllib.error
 from pathlib import Path
 from typing import Set
 
 import click
+from click.core import ParameterSource
 
-from .core import analyze_directory, save_results_to_json
+from .cache import ScanCache
+from .checkpoint import Checkpoint
+from .core import analyze_directories, analyze_directory, analyze_stream, save_results_to_json
+from .file_analyzer import FileAnalyzer
+from .governor import ResourceGovernor
+from .history import iter_history, prepare_resume, write_history
+from .iosched import IOScheduler
+from .metrics import MIN_INTERVAL, MetricsExporter
+from .owners import CodeOwners
+from .progress import CancellationToken, ProgressBar
+from .readpolicy import DEFAULT_RETRIES, ReadPolicy
+from .resultdb import CANNED_QUERIES, SqliteWriter, open_results, run_query, run_sql
+from .sampling import StratifiedSample
+from .server import AnalysisClient, AnalysisServer, default_state_file, find_server, is_loopback, write_state_file
 
 
-@click.command()
-@click.argument('path', type=click.Path(exists=True, path_type=Path))
+class DefaultCommandGroup(click.Group):
+    """Command group that falls back to a default command when no subcommand is given."""
+    
+    default_command = 'count'
+    
+    def parse_args(self, ctx, args):
+        """
+        Route ``lines-counter PATH ...`` to the default command.
+        
+        A path that exists is counted even when it has the name of a
+        subcommand, so ``lines-counter history`` in a tree with a ``history``
+        directory scans it as before subcommands existed.
+        """
+        if args and args[0] not in ('--help', '-h') and (args[0] not in self.commands
+                                                          or Path(args[0]).exists()):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+def _validate_file_name(ctx, param, value):
+    """Reject a --filename without a final file name component."""
+    if value is not None and Path(value).name in ('', '..'):
+        raise click.BadParameter(f"{value!r} is not a file name")
+    return value
+
+
+@click.group(cls=DefaultCommandGroup)
+def main():
+    """
+    Count lines of code, comments, and blank lines in a codebase.
+    
+    Running ``lines-counter PATH`` is the same as ``lines-counter count PATH``.
+    A PATH that exists is counted even if it is named like a subcommand; run
+    the subcommand from another directory to reach it.
+    """
+
+
+@main.command()
+@click.argument('paths', nargs=-1, type=click.Path(exists=True, allow_dash=True, path_type=Path))
+@click.option(
+    '--manifest',
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help='File listing one directory per line to analyze in the same batch'
+)
 @click.option(
     '--output', '-o',
     type=click.Path(path_type=Path),
-    help='Output JSON file path'
+    help='Output file path'
+)
+@click.option(
+    '--filename',
+    'file_name',
+    callback=_validate_file_name,
+    help='Name reported for a single file or - (stdin); its extension selects the language'
+)
+@click.option(
+    '--language',
+    help="Language of a single file or - (stdin), e.g. 'Python' or 'py'"
+)
+@click.option(
+    '--format', 'output_format',
+    type=click.Choice(['json', 'sqlite']),
+    default='json',
+    show_default=True,
+    help='Format of --output; sqlite writes an indexed database for the query command'
 )
 @click.option(
     '--extensions', '-e',
@@ -35,6 +110,157 @@ from .core import analyze_directory, save_results_to_json
     is_flag=True,
     help='Do not analyze subdirectories'
 )
+@click.option(
+    '--follow-symlinks/--no-follow-symlinks',
+    default=False,
+    show_default=True,
+    help='Follow symlinks to files and directories'
+)
+@click.option(
+    '--one-file-system',
+    is_flag=True,
+    help='Do not descend into directories on other file systems'
+)
+@click.option(
+    '--dedup-inodes',
+    is_flag=True,
+    help='Count files reachable through hard links, bind mounts or symlinks only once'
+)
+@click.option(
+    '--rollup-depth',
+    type=click.IntRange(min=0),
+    help='Add per-directory totals down to this many levels'
+)
+@click.option(
+    '--codeowners',
+    'codeowners_path',
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help='CODEOWNERS file; adds totals per owner, matching paths relative to PATH'
+)
+@click.option(
+    '--generated',
+    type=click.Choice(['skip', 'count']),
+    help='Recognise generated, minified and vendored files and skip them or only count their lines'
+)
+@click.option(
+    '--metrics',
+    'extra_metrics',
+    is_flag=True,
+    help='Add bytes, longest/average line length, max indentation and trailing-whitespace counts per file'
+)
+@click.option(
+    '--no-plugins',
+    is_flag=True,
+    help='Ignore installed classifier plugins and use only the built-in comment patterns'
+)
+@click.option(
+    '--cache',
+    'cache_path',
+    type=click.Path(dir_okay=False, path_type=Path),
+    help='Cache file for directory listings and file results, reused across runs'
+)
+@click.option(
+    '--io-order',
+    is_flag=True,
+    help='Read files in inode order and prefetch them with kernel readahead hints'
+)
+@click.option(
+    '--prefetch',
+    default=32,
+    show_default=True,
+    type=click.IntRange(min=0),
+    help='Number of files to prefetch ahead of the reader with --io-order'
+)
+@click.option(
+    '--drop-behind',
+    is_flag=True,
+    help='With --io-order, drop files from the page cache after reading them'
+)
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    help='Read and classify files with this many workers'
+)
+@click.option(
+    '--backend',
+    type=click.Choice(['auto', 'serial', 'thread', 'process']),
+    help='Worker backend (default: auto with --jobs, serial otherwise); auto uses threads '
+         'on free-threaded Python builds and processes otherwise'
+)
+@click.option(
+    '--max-read-rate',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Read at most this many MiB/s from disk'
+)
+@click.option(
+    '--memory-limit',
+    type=click.IntRange(min=1),
+    help='Soft cap on memory use in MiB; above it the scan holds back new work'
+)
+@click.option(
+    '--idle',
+    is_flag=True,
+    help='Scan with idle CPU and I/O priority'
+)
+@click.option(
+    '--read-timeout',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Give up on a file whose read takes longer than this many seconds'
+)
+@click.option(
+    '--read-retries',
+    type=click.IntRange(min=0),
+    help=f'Attempts after a transient read error such as EIO or a stale NFS handle (default: {DEFAULT_RETRIES})'
+)
+@click.option(
+    '--progress',
+    is_flag=True,
+    help='Show a progress bar with files/s and ETA on stderr'
+)
+@click.option(
+    '--time-budget',
+    type=click.FloatRange(min=0),
+    help='Stop after this many seconds and output a partial result'
+)
+@click.option(
+    '--max-files',
+    type=click.IntRange(min=0),
+    help='Stop after analyzing this many files and output a partial result'
+)
+@click.option(
+    '--checkpoint',
+    'checkpoint_path',
+    type=click.Path(dir_okay=False, path_type=Path),
+    help='Journal file that records finished files so an interrupted scan can resume'
+)
+@click.option(
+    '--resume',
+    is_flag=True,
+    help='Continue the scan recorded in --checkpoint'
+)
+@click.option(
+    '--sample',
+    'sample_fraction',
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    help='Analyze only this fraction of the files (stratified by language and size) and estimate totals'
+)
+@click.option(
+    '--confidence',
+    default=0.95,
+    show_default=True,
+    type=click.FloatRange(min=0, max=1, min_open=True, max_open=True),
+    help='Confidence level of the intervals reported with --sample'
+)
+@click.option(
+    '--seed',
+    type=int,
+    help='Random seed for a reproducible --sample'
+)
+@click.option(
+    '--no-server',
+    is_flag=True,
+    help='Always scan in this process, even if an analysis server is running'
+)
 @click.option(
     '--verbose', '-v',
     is_flag=True,
@@ -45,14 +271,57 @@ from .core import analyze_directory, save_results_to_json
     is_flag=True,
     help='Pretty print JSON output to console'
 )
-def main(path: Path, output: Path, extensions: tuple, exclude: tuple, 
-         no_recursive: bool, verbose: bool, pretty: bool):
+def count(paths: tuple, manifest: Path, output: Path, file_name: str, language: str, output_format: str,
+          extensions: tuple, exclude: tuple,
+          no_recursive: bool, follow_symlinks: bool, one_file_system: bool,
+          dedup_inodes: bool, rollup_depth: int, codeowners_path: Path, generated: str, extra_metrics: bool,
+          no_plugins: bool, cache_path: Path, io_order: bool, prefetch: int, drop_behind: bool,
+          jobs: int, backend: str, max_read_rate: float, memory_limit: int, idle: bool,
+          read_timeout: float, read_retries: int, progress: bool,
+          time_budget: float, max_files: int, checkpoint_path: Path, resume: bool,
+          sample_fraction: float, confidence: float, seed: int, no_server: bool,
+          verbose: bool, pretty: bool):
     """
     Count lines of code, comments, and blank lines in a codebase.
     
-    PATH: Directory or file path to analyze
+    PATHS: Directories or file paths to analyze. With several paths (or
+    --manifest) the output has a result per root plus a grand total. A
+    single file, or - for stdin, is classified as it is read, in constant
+    memory; without --filename or --language, stdin is counted as 'Unknown'.
     """
+    writer = None
     try:
+        if resume and not checkpoint_path:
+            raise click.UsageError('--resume requires --checkpoint')
+        
+        paths = list(paths) + (_read_manifest(manifest) if manifest else [])
+        if not paths:
+            raise click.UsageError('give at least one PATH or --manifest')
+        batch = manifest is not None or len(paths) > 1
+        if batch and (checkpoint_path or codeowners_path or max_files is not None or sample_fraction is not None):
+            raise click.UsageError('--checkpoint, --codeowners, --max-files and --sample take a single PATH')
+        if sample_fraction is not None and (rollup_depth is not None or codeowners_path or time_budget is not None
+                                            or max_files is not None or checkpoint_path):
+            raise click.UsageError('--sample cannot be combined with --rollup-depth, --codeowners, '
+                                   '--time-budget, --max-files or --checkpoint')
+        if drop_behind and not io_order:
+            raise click.UsageError('--drop-behind requires --io-order')
+        sqlite_output = output_format == 'sqlite'
+        if sqlite_output and (not output or batch or sample_fraction is not None):
+            raise click.UsageError('--format sqlite needs --output and a single PATH, without --sample')
+        path = paths[0]
+        single_file = not batch and (str(path) == '-' or path.is_file())
+        if batch and any(str(p) == '-' for p in paths):
+            raise click.UsageError("- (stdin) cannot be combined with other paths")
+        if (file_name is not None or language is not None) and not single_file:
+            raise click.UsageError('--filename and --language take a single file or - (stdin)')
+        if single_file and (checkpoint_path or rollup_depth is not None or codeowners_path
+                            or sample_fraction is not None):
+            raise click.UsageError('--checkpoint, --rollup-depth, --codeowners and --sample take a directory')
+        exclude_given = click.get_current_context().get_parameter_source('exclude') is not ParameterSource.DEFAULT
+        if single_file and (extensions or exclude_given):
+            raise click.UsageError('--extensions and --exclude take a directory; use --language for a single file')
+        
         # Convert extensions to set
         include_extensions = set(extensions) if extensions else None
         
@@ -60,22 +329,68 @@ def main(path: Path, output: Path, extensions: tuple, exclude: tuple,
         exclude_patterns = set(exclude)
         
         if verbose:
-            click.echo(f"Analyzing: {path}")
+            click.echo(f"Analyzing: {', '.join(str(p) for p in paths)}")
             if include_extensions:
                 click.echo(f"Including extensions: {', '.join(include_extensions)}")
             click.echo(f"Excluding patterns: {', '.join(exclude_patterns)}")
             click.echo(f"Recursive: {not no_recursive}")
         
-        # Analyze the directory
-        results = analyze_directory(
-            directory_path=path,
+        scan_options = dict(
             include_extensions=include_extensions,
             exclude_patterns=exclude_patterns,
-            recursive=not no_recursive
+            recursive=not no_recursive,
+            follow_symlinks=follow_symlinks,
+            one_file_system=one_file_system,
+            dedup_inodes=dedup_inodes,
+            rollup_depth=rollup_depth,
+            generated=generated,
+            extra_metrics=extra_metrics
         )
         
+        # Options that only make sense in this process keep the scan local
+        io_scheduler = IOScheduler(prefetch, drop_behind) if io_order else None
+        governor = _make_governor(max_read_rate, memory_limit, idle)
+        read_policy = None
+        if read_timeout is not None or read_retries is not None:
+            read_policy = ReadPolicy(read_timeout, DEFAULT_RETRIES if read_retries is None else read_retries)
+        local_only = (sqlite_output or cache_path or io_order or jobs is not None or backend is not None
+                      or governor is not None or read_policy is not None or no_plugins or codeowners_path
+                      or progress or time_budget is not None or max_files is not None
+                      or checkpoint_path or sample_fraction is not None)
+        client = None if no_server or local_only or batch or not path.is_dir() else find_server()
+        if client is None:
+            scan_options.update(backend=backend or ('auto' if jobs else 'serial'), workers=jobs)
+        if governor is not None:
+            scan_options['governor'] = governor
+        if read_policy is not None:
+            scan_options['read_policy'] = read_policy
+        if no_plugins:
+            scan_options['classifiers'] = []
+        if codeowners_path:
+            scan_options['codeowners'] = CodeOwners.from_file(codeowners_path)
+        if sqlite_output:
+            # File rows are written in batches while the scan runs
+            writer = SqliteWriter(output)
+            scan_options['sink'] = writer
+        if batch:
+            results = _count_batch(paths, scan_options, cache_path, io_scheduler, progress,
+                                   time_budget, verbose)
+        elif single_file:
+            results = _count_file(path, file_name, language, scan_options)
+        elif client is not None:
+            results = _count_on_server(client, path, scan_options, verbose)
+        else:
+            sample = StratifiedSample(sample_fraction, confidence, seed) if sample_fraction is not None else None
+            results = _count_locally(path, scan_options, cache_path, io_scheduler, progress,
+                                     time_budget, max_files, checkpoint_path, resume, sample, verbose)
+        
         # Output results
-        if output:
+        if writer is not None:
+            writer.finish(results)
+            writer = None
+            if verbose:
+                click.echo(f"Results saved to: {output}")
+        elif output:
             save_results_to_json(results, output)
             if verbose:
                 click.echo(f"Results saved to: {output}")
@@ -86,15 +401,366 @@ def main(path: Path, output: Path, extensions: tuple, exclude: tuple,
             click.echo(json_str)
         
         # Exit with error if no files were found
-        if results['summary']['total_files'] == 0:
+        summary = results['total']['summary'] if batch else results['summary']
+        if summary['total_files'] == 0:
             if verbose:
                 click.echo("No supported files found.", err=True)
             sys.exit(1)
             
+    except click.UsageError:
+        raise
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _count_locally(path: Path, scan_options: dict, cache_path: Path,
+                   io_scheduler: IOScheduler, progress: bool, time_budget: float,
+                   max_files: int, checkpoint_path: Path,
+                   resume: bool, sample: StratifiedSample, verbose: bool) -> dict:
+    """Run the scan of the ``count`` command in this process."""
+    cache = ScanCache(cache_path).load() if cache_path else None
+    progress_bar = ProgressBar() if progress else None
+    cancel_token = _cancel_on_interrupt()
+    checkpoint = Checkpoint(checkpoint_path, resume=resume) if checkpoint_path else None
+    
+    results = analyze_directory(
+        directory_path=path,
+        cache=cache,
+        io_scheduler=io_scheduler,
+        progress_callback=progress_bar,
+        time_budget=time_budget,
+        max_files=max_files,
+        cancel_token=cancel_token,
+        checkpoint=checkpoint,
+        sample=sample,
+        **scan_options
+    )
+    
+    if progress_bar is not None:
+        progress_bar.close()
+    if cache is not None:
+        cache.save()
+    if verbose and 'incomplete' in results:
+        click.echo(f"Scan stopped early: {results['incomplete']['reason']}", err=True)
+    return results
+
+
+def _count_on_server(client: AnalysisClient, path: Path, scan_options: dict, verbose: bool) -> dict:
+    """Run the scan of the ``count`` command on the analysis server, or here if it stopped answering."""
+    if verbose:
+        click.echo(f"Using analysis server at {client.base_url}")
+    try:
+        return client.analyze(path, **scan_options)
+    except (urllib.error.URLError, ConnectionError) as e:
+        if verbose:
+            click.echo(f"Analysis server unavailable ({e}), scanning locally", err=True)
+    return analyze_directory(path, backend='serial', **scan_options)
+
+
+def _count_file(path: Path, file_name: str, language: str, scan_options: dict) -> dict:
+    """Analyze a single file, or stdin for ``-``, while it is read."""
+    stdin = str(path) == '-'
+    if file_name is None:
+        file_name = 'stdin' if stdin else str(path)
+    if language is not None:
+        # Checked before anything is read from stdin
+        try:
+            FileAnalyzer(classifiers=scan_options.get('classifiers')).language_extension(language)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--language')
+    
+    options = {key: scan_options[key] for key in ('extra_metrics', 'classifiers', 'sink') if key in scan_options}
+    if stdin:
+        return analyze_stream(sys.stdin.buffer, file_name, language=language, **options)
+    with open(path, 'rb') as f:
+        return analyze_stream(f, file_name, language=language, **options)
+
+
+def _make_governor(max_read_rate: float, memory_limit: int, idle: bool) -> ResourceGovernor:
+    """Build the ResourceGovernor of the governance options, or None if none is given."""
+    if max_read_rate is None and memory_limit is None and not idle:
+        return None
+    return ResourceGovernor(
+        max_read_rate=max_read_rate * 1024 * 1024 if max_read_rate is not None else None,
+        memory_limit=memory_limit * 1024 * 1024 if memory_limit is not None else None,
+        idle=idle
+    )
+
+
+def _read_manifest(manifest: Path) -> list:
+    """Read the directories listed in a manifest file, skipping blank lines and # comments."""
+    paths = []
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                path = Path(line)
+                if not path.is_absolute():
+                    path = manifest.parent / path
+                paths.append(path)
+    return paths
+
+
+def _count_batch(paths: list, scan_options: dict, cache_path: Path,
+                 io_scheduler: IOScheduler, progress: bool, time_budget: float,
+                 verbose: bool) -> dict:
+    """Analyze several roots in one batch sharing the analyzer and cache."""
+    cache = ScanCache(cache_path).load() if cache_path else None
+    progress_bar = ProgressBar() if progress else None
+    
+    results = analyze_directories(
+        paths,
+        cache=cache,
+        io_scheduler=io_scheduler,
+        progress_callback=progress_bar,
+        time_budget=time_budget,
+        cancel_token=_cancel_on_interrupt(),
+        **scan_options
+    )
+    
+    if progress_bar is not None:
+        progress_bar.close()
+    if cache is not None:
+        cache.save()
+    if verbose:
+        for root, root_results in results['roots'].items():
+            if 'incomplete' in root_results:
+                click.echo(f"Scan of {root} stopped early: {root_results['incomplete']['reason']}", err=True)
+    return results
+
+
+def _cancel_on_interrupt() -> CancellationToken:
+    """
+    Turn the first Ctrl-C into a cooperative cancellation of the scan.
+    
+    The scan then stops at the next file and the partial result is still
+    written. A second Ctrl-C interrupts immediately.
+    """
+    token = CancellationToken()
+    
+    def handle_interrupt(signum, frame):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        token.cancel()
+    
+    signal.signal(signal.SIGINT, handle_interrupt)
+    return token
+
+
+@main.command()
+@click.argument('repo', type=click.Path(exists=True, path_type=Path), default='.')
+@click.option('--from', 'from_rev', help='First revision of the range (default: root commit)')
+@click.option('--to', 'to_rev', default='HEAD', show_default=True, help='Last revision of the range')
+@click.option('--step', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Emit every Nth first-parent commit')
+@click.option(
+    '--output', '-o',
+    type=click.Path(path_type=Path),
+    help='Output JSON Lines file path (default: stdout)'
+)
+@click.option('--resume', is_flag=True, help='Continue an interrupted run recorded in --output')
+@click.option(
+    '--extensions', '-e',
+    multiple=True,
+    help='File extensions to include (e.g., -e .py -e .js)'
+)
+@click.option(
+    '--exclude', '-x',
+    multiple=True,
+    default=['.git', '__pycache__', 'node_modules', '.pytest_cache'],
+    help='Patterns to exclude (default: .git, __pycache__, node_modules, .pytest_cache)'
+)
+def history(repo: Path, from_rev: str, to_rev: str, step: int, output: Path,
+            resume: bool, extensions: tuple, exclude: tuple):
+    """
+    Stream a per-commit time series of line counts as JSON Lines.
+    
+    REPO: Git repository (work tree or bare) to read history from
+    """
+    try:
+        if resume and not output:
+            raise click.UsageError('--resume requires --output')
+        
+        resume_after = prepare_resume(output) if resume else None
+        rows = iter_history(
+            repo,
+            from_rev=from_rev,
+            to_rev=to_rev,
+            step=step,
+            include_extensions=set(extensions) if extensions else None,
+            exclude_patterns=set(exclude),
+            resume_after=resume_after
+        )
+        
+        if output:
+            with open(output, 'a' if resume else 'w', encoding='utf-8') as f:
+                write_history(rows, f)
+        else:
+            write_history(rows, sys.stdout)
+            
+    except click.UsageError:
+        raise
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+
+@main.command()
+@click.argument('database', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument('name', type=click.Choice(sorted(CANNED_QUERIES)), required=False)
+@click.option('--sql', help='Run this SQL statement instead of a named query')
+@click.option('--language', '-l', help="Only files of this language (e.g. 'Go')")
+@click.option('--under', help='Only files or directories below this directory')
+@click.option('--min-lines', type=click.IntRange(min=0), help='Only files with at least this many lines')
+@click.option('--depth', type=click.IntRange(min=0), help='Only directories up to this depth')
+@click.option('--limit', type=click.IntRange(min=0), help='Return at most this many rows')
+@click.option('--pretty', '-p', is_flag=True, help='Pretty print JSON output')
+def query(database: Path, name: str, sql: str, language: str, under: str, min_lines: int,
+          depth: int, limit: int, pretty: bool):
+    """
+    Query a result database written by ``count --format sqlite``.
+    
+    NAME is one of the named queries: 'summary', 'languages' (totals per
+    language), 'files' (largest files, filtered by --language, --under and
+    --min-lines) or 'directories' (totals and comment ratio per directory,
+    filtered by --under and --depth). Use --sql for anything else; the
+    tables are files, languages, directories and meta.
+    """
+    try:
+        if (name is None) == (sql is None):
+            raise click.UsageError('give either a query NAME or --sql')
+        
+        conn = open_results(database)
+        try:
+            if sql is not None:
+                rows = run_sql(conn, sql)
+            else:
+                rows = run_query(conn, name, language=language, under=under, min_lines=min_lines,
+                                 depth=depth, limit=limit)
+        finally:
+            conn.close()
+        click.echo(json.dumps(rows, indent=2 if pretty else None, ensure_ascii=False))
+        
+    except click.UsageError:
+        raise
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
 
+@main.command()
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on')
+@click.option('--port', default=0, show_default=True, type=int, help='Port to listen on (0 picks a free port)')
+@click.option(
+    '--state-file',
+    type=click.Path(dir_okay=False, path_type=Path),
+    help='File advertising the server address to clients (default: per-user runtime directory)'
+)
+@click.option(
+    '--allow-root',
+    'allowed_roots',
+    multiple=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help='Only scan directories under this one (can be used multiple times; default: the '
+         'current directory); required with a non-loopback --host'
+)
+def serve(host: str, port: int, state_file: Path, allowed_roots: tuple):
+    """
+    Run a resident analysis server for ``count`` and other clients.
+    
+    The server keeps directory listings and file results cached in memory
+    across requests and merges concurrent identical requests into one scan.
+    ``count`` uses it automatically while it is running. Requests are not
+    authenticated, so clients may only scan below the current directory or
+    the ``--allow-root`` directories, and other interfaces than loopback are
+    only served with ``--allow-root``.
+    """
+    if not allowed_roots and not is_loopback(host):
+        raise click.BadParameter(f"{host} is not a loopback address; restrict the scanned directories "
+                                 "with --allow-root to serve on it", param_hint='--host')
+    state_file = state_file or default_state_file()
+    analysis_server = AnalysisServer(allowed_roots or [Path.cwd()])
+    server = analysis_server.make_http_server(host, port)
+    write_state_file(state_file, host, server.server_address[1])
+    click.echo(f"Serving analysis requests on http://{host}:{server.server_address[1]}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        state_file.unlink(missing_ok=True)
+
+
+@main.command('serve-metrics')
+@click.argument('path', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--host', default='127.0.0.1', show_default=True, help='Interface to listen on')
+@click.option('--port', default=9464, show_default=True, type=int, help='Port to listen on')
+@click.option('--interval', default=300.0, show_default=True, type=click.FloatRange(min=MIN_INTERVAL),
+              help='Seconds between scheduled rescans')
+@click.option('--watch', is_flag=True, help='Also rescan when files are added, removed or renamed')
+@click.option('--poll', 'poll_interval', default=5.0, show_default=True, type=click.FloatRange(min=0.1),
+              help='Seconds between change checks with --watch')
+@click.option(
+    '--extensions', '-e',
+    multiple=True,
+    help='File extensions to include (e.g., -e .py -e .js)'
+)
+@click.option(
+    '--exclude', '-x',
+    multiple=True,
+    default=['.git', '__pycache__', 'node_modules', '.pytest_cache'],
+    help='Patterns to exclude (default: .git, __pycache__, node_modules, .pytest_cache)'
+)
+@click.option(
+    '--max-read-rate',
+    type=click.FloatRange(min=0, min_open=True),
+    help='Read at most this many MiB/s from disk'
+)
+@click.option(
+    '--memory-limit',
+    type=click.IntRange(min=1),
+    help='Soft cap on memory use in MiB; above it the scan holds back new work'
+)
+@click.option(
+    '--idle',
+    is_flag=True,
+    help='Scan with idle CPU and I/O priority'
+)
+def serve_metrics(path: Path, host: str, port: int, interval: float, watch: bool,
+                  poll_interval: float, extensions: tuple, exclude: tuple,
+                  max_read_rate: float, memory_limit: int, idle: bool):
+    """
+    Serve line counts as OpenMetrics on http://HOST:PORT/metrics.
+    
+    PATH is rescanned in the background; scrapes are answered from the last
+    finished scan and never start one. With --idle only the scanning thread
+    runs at idle priority, so scrapes are still answered promptly.
+    """
+    governor = _make_governor(max_read_rate, memory_limit, idle)
+    exporter = MetricsExporter(
+        path,
+        interval=interval,
+        watch=watch,
+        poll_interval=poll_interval,
+        include_extensions=set(extensions) if extensions else None,
+        exclude_patterns=set(exclude),
+        governor=governor
+    )
+    server = exporter.make_server(host, port)
+    exporter.start()
+    click.echo(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        exporter.stop()
+
+
 if __name__ == '__main__':
     main() 
\ No newline at end of file
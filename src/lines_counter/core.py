@@ -3,9 +3,25 @@ Core module for counting lines in codebases.
 """
 
 import json
+import os
+from collections import deque
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Set, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Set, Optional, Tuple
+from .cache import ScanCache
+from .checkpoint import Checkpoint
+from .encoding import BINARY, read_content, to_utf8
 from .file_analyzer import FileAnalyzer
+from .governor import ResourceGovernor
+from .heuristics import GeneratedFileFilter, count_newlines
+from .iosched import IOScheduler
+from .owners import CodeOwners, OwnerRollup
+from .parallel import CHUNK_SIZE, ReaderPool, resolve_backend
+from .progress import CancellationToken, ScanLimits
+from .readpolicy import ReadError, ReadPolicy, classify_error, describe_error
+from .rollup import DirectoryRollup
+from .sampling import StratifiedSample
+from .walker import Walker
 
 
 def count_lines(file_path: Path, analyzer: Optional[FileAnalyzer] = None) -> Dict[str, int]:
@@ -32,7 +48,28 @@ def analyze_directory(
     directory_path: Path,
     include_extensions: Optional[Set[str]] = None,
     exclude_patterns: Optional[Set[str]] = None,
-    recursive: bool = True
+    recursive: bool = True,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    dedup_inodes: bool = False,
+    rollup_depth: Optional[int] = None,
+    codeowners: Optional[CodeOwners] = None,
+    generated: Optional[str] = None,
+    extra_metrics: bool = False,
+    classifiers: Optional[List] = None,
+    cache: Optional[ScanCache] = None,
+    io_scheduler: Optional[IOScheduler] = None,
+    governor: Optional[ResourceGovernor] = None,
+    read_policy: Optional[ReadPolicy] = None,
+    progress_callback: Optional[Callable[[int, int, Path], None]] = None,
+    time_budget: Optional[float] = None,
+    max_files: Optional[int] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    sample: Optional[StratifiedSample] = None,
+    backend: str = 'serial',
+    workers: Optional[int] = None,
+    sink: Optional[Any] = None
 ) -> Dict:
     """
     Analyze a directory and count lines in all supported files.
@@ -42,48 +79,874 @@ def analyze_directory(
         include_extensions: Set of file extensions to include
         exclude_patterns: Set of patterns to exclude
         recursive: Whether to analyze subdirectories
+        follow_symlinks: Whether to follow symlinks to files and directories
+        one_file_system: Whether to stay on the file system of ``directory_path``
+        dedup_inodes: Whether to count each physical file only once, however many
+            hard links, bind mounts or symlinks lead to it
+        rollup_depth: If given, add a 'tree' section with totals for every
+            directory up to this many levels below ``directory_path``
+        codeowners: CodeOwners rules; if given, an 'owners' section totals the
+            files of each owner (paths are matched relative to ``directory_path``)
+        generated: 'skip' or 'count' to recognise generated, minified and
+            vendored files from their path, size and first block; they are
+            reported in a 'generated' section and either left out or counted
+            with a newline-only pass instead of being classified line by line
+        extra_metrics: Whether each file entry also gets a 'metrics' dictionary
+            with bytes, longest and average line length, maximum indentation
+            and trailing-whitespace lines, computed from the same read
+        classifiers: Classifier plugins for further languages (default: the
+            ones installed under the ``lines_counter.classifiers`` entry point
+            group; an empty list disables plugins)
+        cache: ScanCache reused across runs; unchanged directories are not listed
+            again and unchanged files are not read again
+        io_scheduler: IOScheduler; if given, files are read in inode order with
+            kernel readahead hints and an 'io' section reports the hints given.
+            Files are still reported in walk order.
+        governor: ResourceGovernor limiting read bandwidth and memory use and
+            optionally lowering the scan to idle priority; a 'governor' section
+            reports how often it held the scan back
+        read_policy: ReadPolicy with the per-file read deadline and retries of
+            transient errors (default: no deadline, two retries)
+        progress_callback: Called as ``callback(done, total, path)`` after each file
+        time_budget: Stop after this many seconds and return a partial result
+        max_files: Stop after analyzing this many files and return a partial
+            result; files taken from a resumed checkpoint do not count
+        cancel_token: CancellationToken that stops the scan when cancelled
+        checkpoint: Checkpoint journal that records finished files; when resuming,
+            the tree is walked again and files recorded by the interrupted run
+            are taken from the journal instead of being read
+        sample: StratifiedSample; if given, all files are enumerated but only a
+            sample of them is analyzed, 'summary' and 'languages' hold estimates
+            and an 'estimate' section reports their confidence intervals. Cannot
+            be combined with rollup_depth, codeowners, time_budget, max_files or
+            checkpoint.
+        backend: 'serial' to read files in this thread, 'thread' or 'process' to
+            read and classify them in a pool of ``workers``, or 'auto' for
+            threads on free-threaded Python builds and processes otherwise.
+            The result is the same with every backend.
+        workers: Pool size, or None for the number of CPUs
+        sink: Object with an ``add(record)`` method, such as a SqliteWriter,
+            that receives the record of every file as soon as it is finished,
+            in read order. Cannot be combined with sample.
         
     Returns:
-        Dictionary with analysis results
+        Dictionary with analysis results; each file reports its detected
+        encoding, 'skipped' lists files left out because of their content
+        (e.g. binary data), 'errors' lists files that could not be read with
+        the reason ('permission', 'timeout', 'decode', 'vanished', 'io' or
+        'error') and 'walk' reports how many entries the walker
+        visited and skipped. A scan stopped early by a limit or cancellation
+        returns the files analyzed so far plus an 'incomplete' section.
     """
+    if sample is not None and (rollup_depth is not None or codeowners is not None or time_budget is not None
+                               or max_files is not None or checkpoint is not None or sink is not None):
+        raise ValueError('sampling cannot be combined with rollup_depth, codeowners, time_budget, '
+                         'max_files, checkpoint or sink')
+    
+    backend, workers = resolve_backend(backend, workers)
+    generated_filter = GeneratedFileFilter(generated) if generated is not None else None
+    
     if not directory_path.exists() or not directory_path.is_dir():
         return _create_empty_result()
     
-    analyzer = FileAnalyzer(include_extensions, exclude_patterns)
+    analyzer = FileAnalyzer(include_extensions, exclude_patterns, extra_metrics, classifiers)
+    if read_policy is None:
+        read_policy = ReadPolicy()
+    if governor is not None:
+        governor.lower_priority()
+    pool = None
+    if backend != 'serial' and sample is None:
+        pool = ReaderPool(backend, workers, _read_file, _classify_file, analyzer, generated_filter, read_policy)
+    try:
+        return _scan_directory(
+            directory_path,
+            analyzer=analyzer,
+            limits=ScanLimits(time_budget, max_files, cancel_token),
+            walk_options={
+                'recursive': recursive,
+                'follow_symlinks': follow_symlinks,
+                'one_file_system': one_file_system,
+                'dedup_inodes': dedup_inodes
+            },
+            rollup_depth=rollup_depth,
+            codeowners=codeowners,
+            generated_filter=generated_filter,
+            cache=cache,
+            io_scheduler=io_scheduler,
+            governor=governor,
+            read_policy=read_policy,
+            progress_callback=progress_callback,
+            checkpoint=checkpoint,
+            sample=sample,
+            pool=pool,
+            sink=sink
+        )
+    finally:
+        if pool is not None:
+            pool.close()
+        read_policy.close()
+
+
+def analyze_stream(
+    stream: BinaryIO,
+    file_name: str,
+    extra_metrics: bool = False,
+    classifiers: Optional[List] = None,
+    sink: Optional[Any] = None,
+    language: Optional[str] = None
+) -> Dict:
+    """
+    Analyze the content of one file read from a binary stream, such as stdin.
     
-    # Find all files to analyze
-    files_to_analyze = []
-    if recursive:
-        files_to_analyze = list(directory_path.rglob('*'))
-    else:
-        files_to_analyze = list(directory_path.glob('*'))
+    Lines are classified as the content is read, without a temporary file and
+    in constant memory (see ``FileAnalyzer.analyze_stream``).
     
-    # Filter for supported files
-    supported_files = [f for f in files_to_analyze if f.is_file() and analyzer.is_supported_file(f)]
+    Args:
+        stream: Binary stream with the file content
+        file_name: Name reported for the file; unless ``language`` is given,
+            its extension selects the language, and a name without a known
+            extension is counted as 'Unknown' with every non-blank line as code
+        extra_metrics: Whether the file entry also gets a 'metrics' dictionary
+        classifiers: Classifier plugins, as for ``analyze_directory``
+        sink: Object with an ``add(record)`` method receiving the file record
+        language: Language of the content, by name or extension (see
+            ``FileAnalyzer.language_extension``), instead of the one of ``file_name``
+        
+    Returns:
+        Dictionary with the sections of ``analyze_directory`` that apply to a
+        single file: 'summary', 'languages', 'files', 'skipped' and 'errors'
+        
+    Raises:
+        ValueError: If the language is unknown
+    """
+    analyzer = FileAnalyzer(extra_metrics=extra_metrics, classifiers=classifiers)
+    file_path = Path(file_name)
+    if language is not None:
+        # Only the extension picks the comment rules and the language name
+        file_path = Path('file' + analyzer.language_extension(language))
+    try:
+        file_stats, encoding = analyzer.analyze_stream(stream, file_path)
+        record = _make_record(analyzer, file_path, file_name, file_stats, encoding, None)
+    except Exception as e:
+        record = _error_record(file_name, ReadError(classify_error(e), describe_error(e), 1))
+    if sink is not None:
+        sink.add(record)
+    
+    result = _build_result([record] if 'language' in record else [])
+    result['skipped'] = [record] if 'reason' in record else []
+    result['errors'] = [record] if 'error' in record else []
+    return result
+
+
+def analyze_directories(
+    directory_paths: List[Path],
+    include_extensions: Optional[Set[str]] = None,
+    exclude_patterns: Optional[Set[str]] = None,
+    recursive: bool = True,
+    follow_symlinks: bool = False,
+    one_file_system: bool = False,
+    dedup_inodes: bool = False,
+    rollup_depth: Optional[int] = None,
+    generated: Optional[str] = None,
+    extra_metrics: bool = False,
+    classifiers: Optional[List] = None,
+    cache: Optional[ScanCache] = None,
+    io_scheduler: Optional[IOScheduler] = None,
+    governor: Optional[ResourceGovernor] = None,
+    read_policy: Optional[ReadPolicy] = None,
+    progress_callback: Optional[Callable[[int, int, Path], None]] = None,
+    time_budget: Optional[float] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    backend: str = 'serial',
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Analyze several directories in one batch.
+    
+    All roots share one FileAnalyzer, one cache and one time budget, so a batch
+    of many checkouts pays the setup cost once. A directory given more than
+    once, also as another spelling of the same path, is analyzed once and
+    reported under its first spelling. Options have the same meaning as for
+    ``analyze_directory``.
+    
+    Args:
+        directory_paths: Directories to analyze, in order
+        include_extensions: Set of file extensions to include
+        exclude_patterns: Set of patterns to exclude
+        recursive: Whether to analyze subdirectories
+        follow_symlinks: Whether to follow symlinks to files and directories
+        one_file_system: Whether to stay on the file system of each root
+        dedup_inodes: Whether to count each physical file only once per root
+        rollup_depth: If given, add a 'tree' section to every root's result
+        generated: 'skip' or 'count' to divert generated, minified and vendored files
+        extra_metrics: Whether file entries get a 'metrics' dictionary
+        classifiers: Classifier plugins for further languages
+        cache: ScanCache shared by all roots
+        io_scheduler: IOScheduler used for every root
+        governor: ResourceGovernor used for every root
+        read_policy: ReadPolicy used for every root
+        progress_callback: Called as ``callback(done, total, path)`` after each
+            file, counting per root
+        time_budget: Stop after this many seconds for the whole batch; roots not
+            finished by then get a partial result
+        cancel_token: CancellationToken that stops the batch when cancelled
+        backend: Execution backend, with one pool shared by all roots
+        workers: Pool size, or None for the number of CPUs
+        
+    Returns:
+        Dictionary with 'roots', mapping each path to its ``analyze_directory``
+        result, and 'total' with the 'summary' and 'languages' of all roots
+    """
+    backend, workers = resolve_backend(backend, workers)
+    analyzer = FileAnalyzer(include_extensions, exclude_patterns, extra_metrics, classifiers)
+    generated_filter = GeneratedFileFilter(generated) if generated is not None else None
+    limits = ScanLimits(time_budget, None, cancel_token)
+    walk_options = {
+        'recursive': recursive,
+        'follow_symlinks': follow_symlinks,
+        'one_file_system': one_file_system,
+        'dedup_inodes': dedup_inodes
+    }
+    
+    roots = {}
+    resolved_roots = set()
+    all_files = []
+    if read_policy is None:
+        read_policy = ReadPolicy()
+    if governor is not None:
+        governor.lower_priority()
+    pool = None
+    if backend != 'serial':
+        pool = ReaderPool(backend, workers, _read_file, _classify_file, analyzer, generated_filter, read_policy)
+    try:
+        for directory_path in directory_paths:
+            directory_path = Path(directory_path)
+            resolved_path = directory_path.resolve()
+            if resolved_path in resolved_roots:
+                continue
+            resolved_roots.add(resolved_path)
+            if not directory_path.is_dir():
+                roots[str(directory_path)] = _create_empty_result()
+                continue
+            result = _scan_directory(
+                directory_path,
+                analyzer=analyzer,
+                limits=limits,
+                walk_options=walk_options,
+                rollup_depth=rollup_depth,
+                generated_filter=generated_filter,
+                cache=cache,
+                io_scheduler=io_scheduler,
+                governor=governor,
+                read_policy=read_policy,
+                progress_callback=progress_callback,
+                pool=pool
+            )
+            roots[str(directory_path)] = result
+            all_files.extend(result['files'])
+    finally:
+        if pool is not None:
+            pool.close()
+        read_policy.close()
+    
+    total = _build_result(all_files)
+    del total['files']
+    return {'roots': roots, 'total': total}
+
+
+def _scan_directory(
+    directory_path: Path,
+    analyzer: FileAnalyzer,
+    limits: ScanLimits,
+    walk_options: Dict,
+    rollup_depth: Optional[int] = None,
+    codeowners: Optional[CodeOwners] = None,
+    generated_filter: Optional[GeneratedFileFilter] = None,
+    cache: Optional[ScanCache] = None,
+    io_scheduler: Optional[IOScheduler] = None,
+    governor: Optional[ResourceGovernor] = None,
+    read_policy: Optional[ReadPolicy] = None,
+    progress_callback: Optional[Callable[[int, int, Path], None]] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    sample: Optional[StratifiedSample] = None,
+    pool: Optional[ReaderPool] = None,
+    sink: Optional[Any] = None
+) -> Dict:
+    """
+    Walk and analyze one existing directory.
+    
+    Args:
+        directory_path: Path to the directory to analyze
+        analyzer: FileAnalyzer deciding which files are analyzed and how
+        limits: ScanLimits checked before each file
+        walk_options: Keyword arguments for the Walker ('recursive',
+            'follow_symlinks', 'one_file_system', 'dedup_inodes')
+        rollup_depth: Depth of the 'tree' section, or None for no tree
+        codeowners: CodeOwners rules for the 'owners' section, or None
+        generated_filter: GeneratedFileFilter diverting generated files, or None
+        cache: ScanCache instance or None
+        io_scheduler: IOScheduler deciding the read order, or None for walk order
+        governor: ResourceGovernor throttling reads and memory use, or None
+        read_policy: ReadPolicy for reads in this thread, or None to let read errors propagate
+        progress_callback: Called as ``callback(done, total, path)`` after each file
+        checkpoint: Checkpoint journal or None
+        sample: StratifiedSample to estimate from, or None to analyze every file
+        pool: ReaderPool reading files in parallel, or None to read them here
+        sink: Receiver of every finished record, or None
+        
+    Returns:
+        Dictionary with analysis results (see ``analyze_directory``)
+    """
+    walker = Walker(exclude_dir=analyzer.is_excluded_path, cache=cache, **walk_options)
+    if cache is not None:
+        cache.begin_scan()
+    if governor is not None:
+        governor.begin_scan()
+    
+    # Find all supported files to analyze
+    stop_reason = None
+    supported_files = []
+    for file_path, st in walker.walk(directory_path):
+        if analyzer.is_supported_file(file_path):
+            supported_files.append((file_path, st))
+        if governor is not None:
+            governor.relieve_memory()
+        stop_reason = limits.stop_reason(0)
+        if stop_reason is not None:
+            break
+    walk_finished = stop_reason is None
+    
+    if sample is not None:
+        return _estimate_directory(directory_path, supported_files, analyzer, walker,
+                                   sample, cache, generated_filter, governor, read_policy, progress_callback)
+    
+    if checkpoint is not None:
+        checkpoint.start({
+            'root': os.path.abspath(directory_path),
+            'include_extensions': sorted(analyzer.include_extensions),
+            'exclude_patterns': sorted(analyzer.exclude_patterns),
+            'generated': generated_filter.mode if generated_filter is not None else None,
+            'extra_metrics': analyzer.extra_metrics,
+            'classifiers': sorted(f"{c.language}:{c.version}" for c in analyzer.classifiers),
+            **walk_options
+        })
+    
+    # Analyze each file, in inode order if scheduled, keeping results by walk position
+    if io_scheduler is not None:
+        read_order = io_scheduler.order(supported_files)
+    else:
+        read_order = range(len(supported_files))
+    rollup = DirectoryRollup(rollup_depth) if rollup_depth is not None else None
+    owner_rollup = OwnerRollup(codeowners) if codeowners is not None else None
+    if rollup is not None or owner_rollup is not None:
+        sink = _RollupSink(sink, rollup, owner_rollup)
+    analyze = _analyze_serial if pool is None else _analyze_pooled
+    complete = False
+    try:
+        records, files_done, stop_reason = analyze(
+            directory_path, supported_files, read_order, analyzer, generated_filter, limits,
+            cache, io_scheduler, governor, read_policy, progress_callback, checkpoint, sink,
+            stop_reason, pool
+        )
+        complete = stop_reason is None
+    finally:
+        # Kept for a later resume unless the scan finished
+        if checkpoint is not None:
+            checkpoint.close(complete=complete)
     
-    # Analyze each file
     file_results = []
-    total_stats = {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+    skipped = []
+    errors = []
+    generated_files = []
+    for index in sorted(records):
+        record = records[index]
+        if 'error' in record:
+            errors.append(record)
+        elif 'reason' in record:
+            skipped.append(record)
+        elif 'kind' in record:
+            generated_files.append(record)
+        else:
+            file_results.append(record)
+    
+    result = _build_result(file_results)
+    result['skipped'] = skipped
+    result['errors'] = errors
+    if generated_filter is not None:
+        result['generated'] = generated_files
+    result['walk'] = walker.stats
+    if rollup is not None:
+        result['tree'] = rollup.to_dict()
+    if owner_rollup is not None:
+        result['owners'] = owner_rollup.to_dict()
+    if cache is not None:
+        result['cache'] = dict(cache.stats)
+    if io_scheduler is not None:
+        result['io'] = dict(io_scheduler.stats)
+    if governor is not None:
+        result['governor'] = dict(governor.stats)
+    if stop_reason is not None:
+        result['incomplete'] = {
+            'reason': stop_reason,
+            'files_analyzed': files_done,
+            'files_pending': len(supported_files) - files_done,
+            'walk_finished': walk_finished
+        }
+    return result
+
+
+class _RollupSink:
+    """Adds finished files to the rollups as the scan goes, then passes records on to a sink."""
+    
+    def __init__(self, sink: Optional[Any], rollup: Optional[DirectoryRollup],
+                 owner_rollup: Optional[OwnerRollup]):
+        self.sink = sink
+        self.rollup = rollup
+        self.owner_rollup = owner_rollup
     
-    for file_path in supported_files:
+    def add(self, record: Dict) -> None:
+        if 'language' in record:
+            if self.rollup is not None:
+                self.rollup.add(record['path'], record['lines'])
+            if self.owner_rollup is not None:
+                self.owner_rollup.add(record['path'], record['lines'])
+        if self.sink is not None:
+            self.sink.add(record)
+
+
+def _analyze_serial(
+    directory_path: Path,
+    supported_files: List,
+    read_order,
+    analyzer: FileAnalyzer,
+    generated_filter: Optional[GeneratedFileFilter],
+    limits: ScanLimits,
+    cache: Optional[ScanCache],
+    io_scheduler: Optional[IOScheduler],
+    governor: Optional[ResourceGovernor],
+    read_policy: Optional[ReadPolicy],
+    progress_callback: Optional[Callable[[int, int, Path], None]],
+    checkpoint: Optional[Checkpoint],
+    sink: Optional[Any],
+    stop_reason: Optional[str],
+    pool: Optional[ReaderPool] = None
+) -> Tuple[Dict[int, Dict], int, Optional[str]]:
+    """
+    Analyze files one after the other in this thread.
+    
+    Args:
+        directory_path: Root of the scan
+        supported_files: List of (path, stat result) in walk order
+        read_order: Indices into ``supported_files`` in the order to read them
+        analyzer: FileAnalyzer instance
+        generated_filter: GeneratedFileFilter or None
+        limits: ScanLimits checked before each file
+        cache: ScanCache instance or None
+        io_scheduler: IOScheduler that planned ``read_order``, or None
+        governor: ResourceGovernor or None
+        read_policy: ReadPolicy or None
+        progress_callback: Called as ``callback(done, total, path)`` after each file
+        checkpoint: Checkpoint journal or None; files it replays from an
+            interrupted run do not count against ``limits.max_files``
+        sink: Receiver of every finished record, or None
+        stop_reason: Reason the walk already stopped for, or None
+        pool: Unused; present so both strategies share a signature
+        
+    Returns:
+        Tuple of (records by index into ``supported_files``, number of files
+        analyzed, stop reason or None)
+    """
+    records = {}
+    files_done = 0
+    files_replayed = 0
+    
+    for position, index in enumerate(read_order):
+        stop_reason = stop_reason or limits.stop_reason(files_done - files_replayed)
+        if stop_reason is not None:
+            break
+        files_done += 1
+        file_path, st = supported_files[index]
+        relative_path = str(file_path.relative_to(directory_path))
+        
         try:
-            file_stats = analyzer.analyze_lines(file_path)
-            language = analyzer.get_file_language(file_path)
-            
-            file_result = {
-                'path': str(file_path.relative_to(directory_path)),
-                'language': language,
-                'lines': file_stats
-            }
-            file_results.append(file_result)
+            record = checkpoint.replay(relative_path, st) if checkpoint is not None else None
+            if record is not None:
+                files_replayed += 1
+            else:
+                if governor is not None:
+                    governor.relieve_memory()
+                if io_scheduler is not None:
+                    io_scheduler.before_read(position)
+                record = _analyze_file(analyzer, file_path, relative_path, st, cache, generated_filter,
+                                       governor, read_policy)
+                if io_scheduler is not None:
+                    io_scheduler.after_read(position)
+                # Failed files are not journaled, so a resumed scan tries them again
+                if checkpoint is not None and 'error' not in record:
+                    checkpoint.record(record, st)
             
-            # Update totals
-            for key in total_stats:
-                total_stats[key] += file_stats[key]
-                
         except Exception as e:
-            # Skip files that can't be read
+            record = _error_record(relative_path, ReadError(classify_error(e), describe_error(e), 1))
+        
+        records[index] = record
+        if sink is not None:
+            sink.add(record)
+        if progress_callback is not None:
+            progress_callback(files_done, len(supported_files), file_path)
+    
+    return records, files_done, stop_reason
+
+
+def _analyze_pooled(
+    directory_path: Path,
+    supported_files: List,
+    read_order,
+    analyzer: FileAnalyzer,
+    generated_filter: Optional[GeneratedFileFilter],
+    limits: ScanLimits,
+    cache: Optional[ScanCache],
+    io_scheduler: Optional[IOScheduler],
+    governor: Optional[ResourceGovernor],
+    read_policy: Optional[ReadPolicy],
+    progress_callback: Optional[Callable[[int, int, Path], None]],
+    checkpoint: Optional[Checkpoint],
+    sink: Optional[Any],
+    stop_reason: Optional[str],
+    pool: ReaderPool
+) -> Tuple[Dict[int, Dict], int, Optional[str]]:
+    """
+    Analyze files in a ReaderPool.
+    
+    Cache lookups, checkpoint records and progress reports stay in this
+    thread; only the reading and classification of cache misses is handed
+    to the pool, in chunks of ``CHUNK_SIZE`` files and with at most
+    ``pool.window`` chunks in flight. Above the governor's memory cap, queued
+    chunks are finished before the next one is handed out. Arguments and
+    return value are the same as for ``_analyze_serial``.
+    """
+    records = {}
+    files_done = 0
+    files_replayed = 0
+    files_reported = 0
+    pending = deque()
+    chunk = []
+    
+    def report(file_path: Path) -> None:
+        nonlocal files_reported
+        files_reported += 1
+        if progress_callback is not None:
+            progress_callback(files_reported, len(supported_files), file_path)
+    
+    def collect() -> None:
+        entries, future = pending.popleft()
+        for (position, index, relative_path, cache_key), read in zip(entries, future.result()):
+            file_path, st = supported_files[index]
+            if io_scheduler is not None:
+                io_scheduler.after_read(position)
+            if isinstance(read, ReadError):
+                record = _error_record(relative_path, read)
+            else:
+                if cache is not None:
+                    cache.put_file(cache_key, st, *read)
+                record = _make_record(analyzer, file_path, relative_path, *read)
+                if checkpoint is not None:
+                    checkpoint.record(record, st)
+            records[index] = record
+            if sink is not None:
+                sink.add(record)
+            report(file_path)
+    
+    def drain() -> bool:
+        if not pending:
+            return False
+        collect()
+        return True
+    
+    def submit() -> None:
+        if governor is not None:
+            governor.relieve_memory(drain)
+        tasks = [(supported_files[index][0], relative_path, supported_files[index][1].st_size)
+                 for _, index, relative_path, _ in chunk]
+        pending.append((list(chunk), pool.submit(tasks)))
+        chunk.clear()
+        while len(pending) > pool.window:
+            collect()
+    
+    for position, index in enumerate(read_order):
+        stop_reason = stop_reason or limits.stop_reason(files_done - files_replayed)
+        if stop_reason is not None:
+            break
+        files_done += 1
+        file_path, st = supported_files[index]
+        relative_path = str(file_path.relative_to(directory_path))
+        
+        record = checkpoint.replay(relative_path, st) if checkpoint is not None else None
+        cache_key = None
+        if record is not None:
+            files_replayed += 1
+        elif cache is not None:
+            cache_key = _cache_key(analyzer, file_path, generated_filter)
+            cached = cache.get_file(cache_key, st)
+            if cached is not None:
+                record = _make_record(analyzer, file_path, relative_path, *cached)
+                if checkpoint is not None:
+                    checkpoint.record(record, st)
+        if record is not None:
+            records[index] = record
+            if sink is not None:
+                sink.add(record)
+            report(file_path)
             continue
+        
+        if governor is not None:
+            governor.before_read(st.st_size)
+        if io_scheduler is not None:
+            io_scheduler.before_read(position)
+        chunk.append((position, index, relative_path, cache_key))
+        if len(chunk) == CHUNK_SIZE:
+            submit()
+    
+    if chunk:
+        submit()
+    while pending:
+        collect()
+    return records, files_done, stop_reason
+
+
+def _estimate_directory(
+    directory_path: Path,
+    supported_files: List,
+    analyzer: FileAnalyzer,
+    walker: Walker,
+    sample: StratifiedSample,
+    cache: Optional[ScanCache],
+    generated_filter: Optional[GeneratedFileFilter],
+    governor: Optional[ResourceGovernor],
+    read_policy: Optional[ReadPolicy],
+    progress_callback: Optional[Callable[[int, int, Path], None]]
+) -> Dict:
+    """
+    Analyze a stratified sample of the enumerated files and extrapolate totals.
+    
+    Args:
+        directory_path: Root of the scan
+        supported_files: List of (path, stat result) of all supported files
+        analyzer: FileAnalyzer instance
+        walker: Walker that enumerated the files
+        sample: StratifiedSample, emptied and filled with this scan's files
+        cache: ScanCache instance or None
+        generated_filter: GeneratedFileFilter or None
+        governor: ResourceGovernor or None
+        read_policy: ReadPolicy or None
+        progress_callback: Called as ``callback(done, total, path)`` after each sampled file
+        
+    Returns:
+        Analysis result with estimated 'summary' and 'languages', the sampled
+        'files' and an 'estimate' section
+    """
+    sample.reset()
+    for file_path, st in supported_files:
+        sample.add(analyzer.get_file_language(file_path), st.st_size, (file_path, st))
+    
+    file_results = []
+    skipped = []
+    errors = []
+    generated_files = []
+    chosen = sample.chosen()
+    for files_done, (key, size, (file_path, st)) in enumerate(chosen, 1):
+        relative_path = str(file_path.relative_to(directory_path))
+        lines = None
+        try:
+            if governor is not None:
+                governor.relieve_memory()
+            record = _analyze_file(analyzer, file_path, relative_path, st, cache, generated_filter,
+                                   governor, read_policy)
+            if 'error' in record:
+                # Unreadable files count as not counted, as in a full scan
+                errors.append(record)
+            elif 'reason' in record:
+                skipped.append(record)
+            elif 'kind' in record:
+                generated_files.append(record)
+            else:
+                file_results.append(record)
+                lines = record['lines']
+        except Exception as e:
+            errors.append(_error_record(relative_path, ReadError(classify_error(e), describe_error(e), 1)))
+        finally:
+            if progress_callback is not None:
+                progress_callback(files_done, len(chosen), file_path)
+        sample.observe(key, size, lines)
+    
+    estimate = sample.estimate()
+    result = {
+        'summary': estimate['summary'],
+        'languages': estimate['languages'],
+        'files': file_results,
+        'skipped': skipped,
+        'errors': errors,
+        'estimate': estimate['estimate']
+    }
+    if generated_filter is not None:
+        result['generated'] = generated_files
+    result['walk'] = walker.stats
+    if cache is not None:
+        result['cache'] = dict(cache.stats)
+    if governor is not None:
+        result['governor'] = dict(governor.stats)
+    return result
+
+
+def _analyze_file(
+    analyzer: FileAnalyzer,
+    file_path: Path,
+    relative_path: str,
+    st: os.stat_result,
+    cache: Optional[ScanCache],
+    generated_filter: Optional[GeneratedFileFilter] = None,
+    governor: Optional[ResourceGovernor] = None,
+    read_policy: Optional[ReadPolicy] = None
+) -> Dict:
+    """
+    Analyze one file, going through the scan cache when one is given.
+    
+    Args:
+        analyzer: FileAnalyzer instance
+        file_path: Path to the file
+        relative_path: Path reported in the results
+        st: Stat result of the file from the walker
+        cache: ScanCache instance or None
+        generated_filter: GeneratedFileFilter diverting generated files, or None
+        governor: ResourceGovernor charged for files that are actually read, or None
+        read_policy: ReadPolicy the read goes through, or None to raise read errors
+        
+    Returns:
+        Per-file result with 'path', 'language', 'encoding', 'lines' and
+        optionally 'metrics', a
+        skip record with 'path' and 'reason' for content that is not counted,
+        a record with 'path', 'kind' and (when counted) 'lines' for a
+        generated, minified or vendored file, or an error record with 'path',
+        'error', 'detail' and 'attempts' for a file that could not be read
+    """
+    cached = None
+    if cache is not None:
+        cache_key = _cache_key(analyzer, file_path, generated_filter)
+        cached = cache.get_file(cache_key, st)
+    if cached is not None:
+        file_stats, encoding, kind = cached
+    else:
+        if governor is not None:
+            governor.before_read(st.st_size)
+        if read_policy is None:
+            read = _classify_file(analyzer, file_path,
+                                  _read_file(analyzer, file_path, relative_path, st.st_size, generated_filter))
+        else:
+            read = read_policy.call(_read_file, analyzer, file_path, relative_path, st.st_size, generated_filter,
+                                    process=partial(_classify_file, analyzer, file_path))
+            if isinstance(read, ReadError):
+                return _error_record(relative_path, read)
+        file_stats, encoding, kind = read
+        if cache is not None:
+            cache.put_file(cache_key, st, file_stats, encoding, kind)
+    return _make_record(analyzer, file_path, relative_path, file_stats, encoding, kind)
+
+
+def _cache_key(analyzer: FileAnalyzer, file_path: Path,
+               generated_filter: Optional[GeneratedFileFilter]) -> str:
+    """Key of a file in the scan cache."""
+    cache_key = os.path.abspath(file_path)
+    # Entries differ with these options, so they must not be shared across them
+    if generated_filter is not None:
+        cache_key += '\0' + generated_filter.mode
+    if analyzer.extra_metrics:
+        cache_key += '\0metrics'
+    classifier = analyzer.get_classifier(file_path)
+    if classifier is not None:
+        cache_key += f"\0{classifier.language}:{classifier.version}"
+    return cache_key
+
+
+def _read_file(analyzer: FileAnalyzer, file_path: Path, relative_path: str, size: int,
+               generated_filter: Optional[GeneratedFileFilter]) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Read one file for ``_classify_file``; safe to call from worker threads and processes.
+    
+    Returns:
+        Same as ``GeneratedFileFilter.read_file``
+    """
+    if generated_filter is not None:
+        return generated_filter.read_file(file_path, relative_path, size)
+    return read_content(file_path, size), None
+
+
+def _classify_file(analyzer: FileAnalyzer, file_path: Path, content: Tuple[Optional[bytes], Optional[str]]
+                   ) -> Tuple[Optional[Dict[str, int]], Optional[str], Optional[str]]:
+    """
+    Classify the content returned by ``_read_file``.
+    
+    Returns:
+        Tuple of (line counts, or None if they are not counted; detected
+        encoding, or None if the file was not read; kind of a generated,
+        minified or vendored file, or None). Generated files only get a
+        'total' count, taken on the text transcoded to UTF-8.
+    """
+    data, kind = content
+    if kind is not None:
+        if data is None:
+            return None, None, kind
+        text, encoding = to_utf8(data)
+        if text is None:
+            return None, encoding, kind
+        return {'total': count_newlines(text)}, encoding, kind
+    if data is None:
+        return None, BINARY, None
+    file_stats, encoding = analyzer.inspect_content(data, file_path)
+    return file_stats, encoding, None
+
+
+def _make_record(analyzer: FileAnalyzer, file_path: Path, relative_path: str,
+                 file_stats: Optional[Dict[str, int]], encoding: Optional[str], kind: Optional[str]) -> Dict:
+    """Turn the result of ``_classify_file`` into a per-file, skip or generated record."""
+    if kind is not None:
+        record = {'path': relative_path, 'kind': kind}
+        if file_stats is not None:
+            record['lines'] = file_stats['total']
+        return record
+    
+    if file_stats is None:
+        return {'path': relative_path, 'reason': encoding}
+    
+    record = {
+        'path': relative_path,
+        'language': analyzer.get_file_language(file_path),
+        'encoding': encoding,
+        'lines': file_stats
+    }
+    if 'metrics' in file_stats:
+        record['lines'] = {key: value for key, value in file_stats.items() if key != 'metrics'}
+        record['metrics'] = file_stats['metrics']
+    return record
+
+
+def _error_record(relative_path: str, error: ReadError) -> Dict:
+    """Record of a file that could not be read, as listed in the 'errors' section."""
+    return {'path': relative_path, 'error': error.reason, 'detail': error.detail, 'attempts': error.attempts}
+
+
+def _build_result(file_results: List[Dict]) -> Dict:
+    """
+    Build the standard result dictionary from per-file results.
+    
+    Args:
+        file_results: List of per-file dictionaries with 'path', 'language' and 'lines'
+        
+    Returns:
+        Dictionary with 'summary', 'languages' and 'files' sections
+    """
+    total_stats = {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+    for file_result in file_results:
+        for key in total_stats:
+            total_stats[key] += file_result['lines'][key]
     
     # Create summary
     summary = {
@@ -0,0 +1,135 @@
+"""
+Cheap encoding detection for source files.
+
+Only the first block of a file is inspected. Files in ASCII-compatible
+encodings are passed through untouched so they stay on the byte fast path;
+only UTF-16 and UTF-32 files are transcoded to UTF-8.
+"""
+
+import codecs
+from pathlib import Path
+from typing import Optional, Tuple
+
+from .iosched import advise_sequential
+
+
+# Number of leading bytes inspected when sniffing
+SNIFF_SIZE = 4096
+
+# Longer BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+BINARY = 'binary'
+
+
+def _zero_ratio(block: bytes, offset: int, stride: int) -> float:
+    """Fraction of NUL bytes at positions ``offset``, ``offset + stride``, ..."""
+    sample = block[offset::stride]
+    if not sample:
+        return 0.0
+    return sample.count(0) / len(sample)
+
+
+def sniff_encoding(data: bytes) -> Tuple[str, int]:
+    """
+    Detect the encoding of a file from its first block.
+
+    BOMs are trusted. Without a BOM, a block free of NUL bytes is taken as
+    UTF-8; otherwise the position of the NUL bytes tells BOM-less UTF-16 and
+    UTF-32 text (mostly ASCII code points) apart from binary data.
+
+    Args:
+        data: File content, or at least its first ``SNIFF_SIZE`` bytes
+
+    Returns:
+        Tuple of (encoding name or ``BINARY``, length of the BOM to skip)
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding, len(bom)
+
+    block = data[:SNIFF_SIZE]
+    if b'\0' not in block:
+        return 'utf-8', 0
+
+    if len(block) >= 4 and len(block) % 4 == 0:
+        if _zero_ratio(block, 0, 4) < 0.1 and min(_zero_ratio(block, i, 4) for i in (1, 2, 3)) > 0.9:
+            return 'utf-32-le', 0
+        if _zero_ratio(block, 3, 4) < 0.1 and min(_zero_ratio(block, i, 4) for i in (0, 1, 2)) > 0.9:
+            return 'utf-32-be', 0
+
+    if len(block) >= 2:
+        even, odd = _zero_ratio(block, 0, 2), _zero_ratio(block, 1, 2)
+        if even < 0.1 and odd > 0.7:
+            return 'utf-16-le', 0
+        if odd < 0.1 and even > 0.7:
+            return 'utf-16-be', 0
+
+    return BINARY, 0
+
+
+def to_utf8(data: bytes) -> Tuple[Optional[bytes], str]:
+    """
+    Convert file content to UTF-8 bytes for counting.
+
+    Args:
+        data: Raw file content
+
+    Returns:
+        Tuple of (UTF-8 bytes, or None for binary content, detected encoding)
+    """
+    encoding, bom_length = sniff_encoding(data)
+    if encoding == BINARY:
+        return None, encoding
+    if encoding == 'utf-8':
+        return data, encoding
+    if encoding == 'utf-8-sig':
+        return data[bom_length:], encoding
+    text = data[bom_length:].decode(encoding, errors='ignore')
+    return text.encode('utf-8'), encoding
+
+
+def read_content(file_path: Path, size: Optional[int] = None) -> Optional[bytes]:
+    """
+    Read the raw content of a file.
+
+    Binary files are recognised from their first block and not read any further.
+
+    Args:
+        file_path: Path to the file
+        size: File size in bytes, if known; large files are read with
+            sequential readahead
+
+    Returns:
+        Content of the file, or None for binary content
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+        if sniff_encoding(head)[0] == BINARY:
+            return None
+        if size is not None:
+            advise_sequential(f.fileno(), size)
+        return head + f.read()
+
+
+def read_source(file_path: Path, size: Optional[int] = None) -> Tuple[Optional[bytes], str]:
+    """
+    Read a file as UTF-8 bytes for counting.
+
+    Args:
+        file_path: Path to the file
+        size: File size in bytes, if known (see ``read_content``)
+
+    Returns:
+        Tuple of (UTF-8 bytes, or None for binary content, detected encoding)
+    """
+    data = read_content(file_path, size)
+    if data is None:
+        return None, BINARY
+    return to_utf8(data)
@@ -2,13 +2,31 @@
 File analyzer module for detecting file types and parsing lines.
 """
 
+import io
 import os
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Tuple, Set
+from typing import BinaryIO, Dict, FrozenSet, Iterable, List, Optional, Tuple, Set
+
+from . import _speedups
+from .encoding import read_source, to_utf8
+from .plugins import check_classifier, check_counts, installed_classifiers
+from .streaming import count_stream
+
+
+# Line endings that mark trailing whitespace (the last line may have no newline)
+_TRAILING_WHITESPACE = (' \n', '\t\n', ' ', '\t')
 
 
 class FileAnalyzer:
-    """Analyzes files to detect programming languages and parse line types."""
+    """
+    Analyzes files to detect programming languages and parse line types.
+    
+    An analyzer is immutable once created and keeps no state between calls,
+    so one instance can be shared by any number of threads (and pickled to
+    worker processes, classifier plugins included). ``COMMENT_PATTERNS`` is
+    read-only by convention.
+    """
     
     # File extensions mapped to their comment patterns
     COMMENT_PATTERNS = {
@@ -49,16 +67,71 @@ class FileAnalyzer:
         '.txt': {'single': None, 'multi_start': None, 'multi_end': None},
     }
     
-    def __init__(self, include_extensions: Set[str] = None, exclude_patterns: Set[str] = None):
+    def __init__(self, include_extensions: Set[str] = None, exclude_patterns: Set[str] = None,
+                 extra_metrics: bool = False, classifiers: Optional[Iterable] = None):
         """
         Initialize the file analyzer.
         
         Args:
             include_extensions: Set of file extensions to include (e.g., {'.py', '.js'})
             exclude_patterns: Set of patterns to exclude (e.g., {'.git', 'node_modules'})
+            extra_metrics: Whether line counts also carry a 'metrics' dictionary
+                gathered in the same pass (see ``_count_line_types``), plus the
+                content size in 'bytes'
+            classifiers: Classifier plugins for further languages, which take
+                precedence over ``COMMENT_PATTERNS`` for their extensions
+                (default: the installed ones, see ``plugins.installed_classifiers``;
+                pass an empty tuple for none)
         """
-        self.include_extensions = include_extensions or set(self.COMMENT_PATTERNS.keys())
-        self.exclude_patterns = exclude_patterns or {'.git', '__pycache__', 'node_modules', '.pytest_cache'}
+        if classifiers is None:
+            classifiers = installed_classifiers()
+        self._classifiers = {}
+        for classifier in classifiers:
+            check_classifier(classifier)
+            for extension in classifier.extensions:
+                self._classifiers[extension.lower()] = classifier
+        
+        self._include_extensions = frozenset(
+            include_extensions or self.COMMENT_PATTERNS.keys() | self._classifiers.keys()
+        )
+        self._exclude_patterns = frozenset(exclude_patterns or {'.git', '__pycache__', 'node_modules', '.pytest_cache'})
+        self._excluded_lower = tuple(pattern.lower() for pattern in self._exclude_patterns)
+        self._extra_metrics = extra_metrics
+    
+    @property
+    def include_extensions(self) -> FrozenSet[str]:
+        """File extensions analyzed by this analyzer."""
+        return self._include_extensions
+    
+    @include_extensions.setter
+    def include_extensions(self, extensions: Iterable[str]) -> None:
+        # A frozen copy, so threads sharing the analyzer never see it change in place
+        self._include_extensions = frozenset(extensions)
+    
+    @property
+    def exclude_patterns(self) -> FrozenSet[str]:
+        """Patterns excluding files and directories whose path contains them."""
+        return self._exclude_patterns
+    
+    @exclude_patterns.setter
+    def exclude_patterns(self, patterns: Iterable[str]) -> None:
+        patterns = frozenset(patterns)
+        self._excluded_lower = tuple(pattern.lower() for pattern in patterns)
+        self._exclude_patterns = patterns
+    
+    @property
+    def extra_metrics(self) -> bool:
+        """Whether line counts carry a 'metrics' dictionary."""
+        return self._extra_metrics
+    
+    @property
+    def classifiers(self) -> Tuple:
+        """Classifier plugins used by this analyzer."""
+        return tuple(dict.fromkeys(self._classifiers.values()))
+    
+    def get_classifier(self, file_path: Path):
+        """Get the classifier plugin handling a file, or None for the built-in patterns."""
+        return self._classifiers.get(file_path.suffix.lower())
     
     def is_supported_file(self, file_path: Path) -> bool:
         """Check if the file should be analyzed."""
@@ -67,12 +140,15 @@ class FileAnalyzer:
             return False
         
         # Check if file path contains excluded patterns
-        file_str = str(file_path).lower()
-        for pattern in self.exclude_patterns:
-            if pattern.lower() in file_str:
-                return False
-        
-        return True
+        return not self.is_excluded_path(file_path)
+    
+    def is_excluded_path(self, path: Path) -> bool:
+        """Check if a file or directory path contains one of the excluded patterns."""
+        path_str = str(path).lower()
+        for pattern in self._excluded_lower:
+            if pattern in path_str:
+                return True
+        return False
     
     def get_comment_patterns(self, file_path: Path) -> Dict[str, str]:
         """Get comment patterns for a specific file type."""
@@ -93,21 +169,142 @@ class FileAnalyzer:
             return {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
         
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
+            counts, _ = self.analyze_file(file_path)
         except Exception:
             return {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
         
-        patterns = self.get_comment_patterns(file_path)
-        return self._count_line_types(lines, patterns)
+        if counts is None:
+            return {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+        return counts
+    
+    def analyze_file(self, file_path: Path, size: Optional[int] = None) -> Tuple[Optional[Dict[str, int]], str]:
+        """
+        Detect the encoding of a file and count its lines.
+        
+        Unlike ``analyze_lines``, read errors are raised to the caller.
+        
+        Args:
+            file_path: Path to the file to analyze
+            size: File size in bytes, if known (see ``read_source``)
+            
+        Returns:
+            Tuple of (line counts, or None for binary content, detected encoding)
+        """
+        data, encoding = read_source(file_path, size)
+        if data is None:
+            return None, encoding
+        return self._count_content(data, file_path), encoding
+    
+    def analyze_stream(self, stream: BinaryIO, file_path: Path) -> Tuple[Optional[Dict[str, int]], str]:
+        """
+        Detect the encoding of a binary stream and count its lines as they are read.
+        
+        Memory use does not grow with the size of the content, except for
+        languages handled by a classifier plugin: plugins classify a whole
+        buffer, so their content is read in full first.
+        
+        Args:
+            stream: Binary stream, such as ``sys.stdin.buffer``
+            file_path: Path (or name) of the file the content belongs to
+            
+        Returns:
+            Tuple of (line counts, or None for binary content, detected encoding)
+        """
+        if self.get_classifier(file_path) is not None:
+            return self.inspect_content(stream.read(), file_path)
+        return count_stream(stream, self.get_comment_patterns(file_path), self.extra_metrics)
+    
+    def analyze_content(self, data: bytes, file_path: Path) -> Dict[str, int]:
+        """
+        Count different types of lines in raw file content.
+        
+        The content does not have to come from the filesystem; ``file_path``
+        is only used to pick the comment patterns for the file type. Binary
+        content counts as an empty file.
+        
+        Args:
+            data: Raw bytes of the file
+            file_path: Path (or name) of the file the content belongs to
+            
+        Returns:
+            Dictionary with line counts: {'total': int, 'code': int, 'comments': int, 'blank': int}
+        """
+        counts, _ = self.inspect_content(data, file_path)
+        if counts is None:
+            return {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+        return counts
+    
+    def inspect_content(self, data: bytes, file_path: Path) -> Tuple[Optional[Dict[str, int]], str]:
+        """
+        Detect the encoding of raw file content and count its lines.
+        
+        ASCII-compatible content is counted as is; UTF-16/32 content is
+        transcoded to UTF-8 first.
+        
+        Args:
+            data: Raw bytes of the file
+            file_path: Path (or name) of the file the content belongs to
+            
+        Returns:
+            Tuple of (line counts, or None for binary content, detected encoding)
+        """
+        data, encoding = to_utf8(data)
+        if data is None:
+            return None, encoding
+        return self._count_content(data, file_path), encoding
+    
+    def _count_content(self, data: bytes, file_path: Path) -> Dict[str, int]:
+        """Count the lines of UTF-8 content with the file's classifier plugin or comment patterns."""
+        classifier = self._classifiers.get(file_path.suffix.lower())
+        if classifier is None:
+            return self._count_utf8(data, self.get_comment_patterns(file_path))
+        
+        counts = dict(check_counts(classifier, classifier.count(data)))
+        if self.extra_metrics:
+            # Metrics do not depend on the comment rules, so the built-in pass gathers them
+            lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+            counts['metrics'] = self._count_line_types(lines, {}, True)['metrics']
+            counts['metrics']['bytes'] = len(data)
+        return counts
+    
+    def _count_utf8(self, data: bytes, patterns: Dict[str, str]) -> Dict[str, int]:
+        """
+        Count different types of lines in UTF-8 content.
+        
+        Large buffers go through the vectorised kernel when NumPy is installed.
+        
+        Args:
+            data: UTF-8 encoded content
+            patterns: Comment patterns for the file type
+            
+        Returns:
+            Dictionary with line counts
+        """
+        min_size = _speedups.MIN_METRICS_KERNEL_SIZE if self.extra_metrics else _speedups.MIN_KERNEL_SIZE
+        if _speedups.HAVE_NUMPY and len(data) >= min_size:
+            counts = _speedups.count_line_types(data, patterns, self.extra_metrics)
+            if counts is not None:
+                return counts
+        
+        text = data.decode('utf-8', errors='ignore')
+        lines = io.StringIO(text, newline=None).readlines()
+        counts = self._count_line_types(lines, patterns, self.extra_metrics)
+        if self.extra_metrics:
+            counts['metrics']['bytes'] = len(data)
+        return counts
     
-    def _count_line_types(self, lines: List[str], patterns: Dict[str, str]) -> Dict[str, int]:
+    def _count_line_types(self, lines: List[str], patterns: Dict[str, str],
+                          metrics: bool = False) -> Dict[str, int]:
         """
         Count different types of lines in a file.
         
         Args:
             lines: List of lines from the file
             patterns: Comment patterns for the file type
+            metrics: Whether to also gather a 'metrics' dictionary with
+                'longest_line', 'average_line_length' (in characters, without
+                line endings), 'max_indent' (leading whitespace characters of
+                the most indented non-blank line) and 'trailing_whitespace_lines'
             
         Returns:
             Dictionary with line counts
@@ -116,6 +313,7 @@ class FileAnalyzer:
         blank_lines = 0
         comment_lines = 0
         code_lines = 0
+        max_indent = 0
         
         in_multiline_comment = False
         multiline_start = patterns.get('multi_start')
@@ -130,6 +328,11 @@ class FileAnalyzer:
                 blank_lines += 1
                 continue
             
+            # Leading plus trailing whitespace plus line ending bounds the
+            # indentation, so lstrip() only runs when it could set a new maximum
+            if metrics and len(line) - len(stripped_line) > max_indent:
+                max_indent = max(max_indent, len(line) - len(line.lstrip()))
+            
             # Handle multiline comments
             if multiline_start and multiline_start in stripped_line:
                 if multiline_end and multiline_end in stripped_line:
@@ -155,16 +358,32 @@ class FileAnalyzer:
             # Everything else is code
             code_lines += 1
         
-        return {
+        counts = {
             'total': total_lines,
             'code': code_lines,
             'comments': comment_lines,
             'blank': blank_lines
         }
+        if metrics:
+            # The remaining metrics are single C-level passes over the lines
+            unterminated = total_lines > 0 and not lines[-1].endswith('\n')
+            longest = max(map(len, lines), default=1) - 1
+            if unterminated:
+                longest = max(longest, len(lines[-1]))
+            characters = sum(map(len, lines)) - (total_lines - unterminated)
+            counts['metrics'] = {
+                'longest_line': longest,
+                'average_line_length': round(characters / total_lines, 2) if total_lines else 0.0,
+                'max_indent': max_indent,
+                'trailing_whitespace_lines': sum(map(str.endswith, lines, repeat(_TRAILING_WHITESPACE)))
+            }
+        return counts
     
     def get_file_language(self, file_path: Path) -> str:
         """Get the programming language name for a file."""
         extension = file_path.suffix.lower()
+        if extension in self._classifiers:
+            return self._classifiers[extension].language
         language_map = {
             '.py': 'Python',
             '.js': 'JavaScript',
@@ -201,4 +420,25 @@ class FileAnalyzer:
             '.md': 'Markdown',
             '.txt': 'Text'
         }
-        return language_map.get(extension, 'Unknown') 
\ No newline at end of file
+        return language_map.get(extension, 'Unknown') 
+    
+    def language_extension(self, language: str) -> str:
+        """
+        Get the file extension of a language.
+        
+        Args:
+            language: Language name (case-insensitive, e.g. 'Python') or
+                extension without the dot (e.g. 'py')
+            
+        Returns:
+            Extension with the leading dot, the first in sorted order if the
+            language has several
+            
+        Raises:
+            ValueError: If no analyzed extension has that name or language
+        """
+        wanted = language.lower()
+        for extension in sorted(self.include_extensions):
+            if wanted in (extension[1:], self.get_file_language(Path('file' + extension)).lower()):
+                return extension
+        raise ValueError(f"unknown language {language!r}")
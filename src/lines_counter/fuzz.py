@@ -0,0 +1,321 @@
+"""
+Differential testing of line classification engines.
+
+Every faster way of classifying lines (the vectorised kernel, the size-based
+dispatcher, ...) must give exactly the counts of the reference classifier,
+``FileAnalyzer._count_line_types`` over universal-newline text lines. This
+module generates random and adversarial sources for every entry of
+``FileAnalyzer.COMMENT_PATTERNS``, runs each registered engine against the
+reference and shrinks any disagreement to a minimal counterexample.
+
+Engines are callables ``engine(data, patterns, metrics)`` returning line
+counts, or None when they decline a buffer (the caller then falls back to
+the reference). New engines are added with ``register_engine``.
+"""
+
+import io
+import random
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import _speedups
+from .file_analyzer import FileAnalyzer
+from .streaming import count_chunks
+
+
+Engine = Callable[[bytes, Dict[str, str], bool], Optional[Dict]]
+
+ENGINES: Dict[str, Engine] = {}
+
+# Offsets at which chunked readers split their input; delimiters are placed
+# across them on purpose
+CHUNK_BOUNDARIES = (4096, 8 * 1024, 16 * 1024, 64 * 1024)
+
+# Chunk size of the odd-sized streaming engine and the largest input it accepts
+SMALL_CHUNK = 13
+SMALL_CHUNK_LIMIT = 16 * 1024
+
+# Length of a generated huge line
+HUGE_LINE = 200 * 1024
+
+# Most pieces the character-level shrinking pass splits an input into
+MAX_SHRINK_GRANULARITY = 512
+
+# Result of an engine that raised
+_RAISED = object()
+
+
+def register_engine(name: str, engine: Engine) -> None:
+    """
+    Add an engine to be checked against the reference.
+
+    Args:
+        name: Unique engine name
+        engine: Callable ``engine(data, patterns, metrics)`` returning the same
+            dictionary as the reference, or None to decline the buffer
+    """
+    ENGINES[name] = engine
+
+
+def reference_counts(data: bytes, patterns: Dict[str, str], metrics: bool = False) -> Dict:
+    """
+    Classify a buffer with the reference implementation.
+
+    Args:
+        data: UTF-8 content
+        patterns: Comment patterns for the file type
+        metrics: Whether to include the 'metrics' dictionary
+
+    Returns:
+        Dictionary with line counts
+    """
+    lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+    counts = FileAnalyzer()._count_line_types(lines, patterns, metrics)
+    if metrics:
+        counts['metrics']['bytes'] = len(data)
+    return counts
+
+
+def _dispatch_engine(data: bytes, patterns: Dict[str, str], metrics: bool) -> Dict:
+    """What FileAnalyzer does with a decoded file, including its choice of kernel by size."""
+    return FileAnalyzer(extra_metrics=metrics)._count_utf8(data, patterns)
+
+
+def _chunks(data: bytes, size: int) -> Iterable[bytes]:
+    """Split a buffer into chunks of ``size`` bytes."""
+    return (data[start:start + size] for start in range(0, len(data), size))
+
+
+def _streaming_engine(data: bytes, patterns: Dict[str, str], metrics: bool) -> Dict:
+    """Streaming classifier fed in chunks that end at every offset of ``CHUNK_BOUNDARIES``."""
+    return count_chunks(_chunks(data, CHUNK_BOUNDARIES[0]), patterns, metrics)
+
+
+def _small_chunk_engine(data: bytes, patterns: Dict[str, str], metrics: bool) -> Optional[Dict]:
+    """Streaming classifier fed in tiny odd-sized chunks, splitting CRLF pairs and characters."""
+    if len(data) > SMALL_CHUNK_LIMIT:
+        return None
+    return count_chunks(_chunks(data, SMALL_CHUNK), patterns, metrics)
+
+
+if _speedups.HAVE_NUMPY:
+    register_engine('vectorised', _speedups.count_line_types)
+register_engine('dispatch', _dispatch_engine)
+register_engine('streaming', _streaming_engine)
+register_engine('streaming-small', _small_chunk_engine)
+
+
+_FILLER = ('x = 1', 'call(a, b)', 'value', '   ', '\t', '', '\x0c', ' ', '"str"', "'c'")
+_NON_ASCII_FILLER = _FILLER + ('é = "ü"', '\u2028', '\u3000', '\u00a0x', '\U0001f600')
+_NEWLINES = ('\n', '\n', '\n', '\r\n', '\r')
+
+
+def _delimiters(patterns: Dict[str, str]) -> List[str]:
+    """The comment delimiters of a file type, plus fragments of them."""
+    delimiters = [d for d in (patterns.get('single'), patterns.get('multi_start'), patterns.get('multi_end')) if d]
+    fragments = [d[:cut] for d in delimiters for cut in range(1, len(d))]
+    return delimiters + fragments
+
+
+def _random_line(rng: random.Random, delimiters: List[str], filler: tuple) -> str:
+    """A line mixing code, whitespace and (partial) delimiters."""
+    parts = []
+    for _ in range(rng.randint(0, 4)):
+        if delimiters and rng.random() < 0.5:
+            parts.append(rng.choice(delimiters))
+        else:
+            parts.append(rng.choice(filler))
+        if rng.random() < 0.3:
+            parts.append(rng.choice((' ', '\t', '  ')))
+    return ''.join(parts)
+
+
+def _join(rng: random.Random, lines: List[str], newlines: Iterable[str]) -> str:
+    """Join lines with the given endings, with or without a final one."""
+    newlines = tuple(newlines)
+    text = ''.join(line + rng.choice(newlines) for line in lines)
+    if lines and rng.random() < 0.4:
+        text = text[:-1] if not text.endswith('\r\n') else text[:-2]
+    return text
+
+
+def generate_source(rng: random.Random, patterns: Dict[str, str]) -> bytes:
+    """
+    Generate one random or adversarial source for a file type.
+
+    Args:
+        rng: Random number generator
+        patterns: Comment patterns of the file type
+
+    Returns:
+        UTF-8 encoded content
+    """
+    delimiters = _delimiters(patterns)
+    start, end, single = patterns.get('multi_start'), patterns.get('multi_end'), patterns.get('single')
+    # Most cases stay in what the fast engines accept, so they are exercised
+    # rather than declining
+    plain = rng.random() < 0.7
+    filler = _FILLER if plain else _NON_ASCII_FILLER
+    lines = [_random_line(rng, delimiters, filler) for _ in range(rng.randint(0, 40))]
+    newlines = ('\n',) if plain else _NEWLINES
+    strategy = rng.randrange(6)
+
+    if strategy == 1 and start:
+        # Unterminated block comment, possibly opened on the last line
+        lines.insert(rng.randint(0, len(lines)), rng.choice(('', 'x = 1 ')) + start)
+    elif strategy == 2 and start and end:
+        # Block comments opened and closed on the same, adjacent or distant lines
+        at = rng.randint(0, len(lines))
+        lines[at:at] = [start, end + ' trailing', start + ' x ' + end, end]
+    elif strategy == 3:
+        # Delimiters straddling chunk boundaries
+        boundary = rng.choice(CHUNK_BOUNDARIES)
+        delimiter = rng.choice(delimiters or ['#'])
+        shift = rng.randint(0, len(delimiter))
+        padding = 'y' * (boundary - shift - 1)
+        lines = [padding + ' ' + delimiter + ' tail'] + lines
+    elif strategy == 4:
+        # One huge line between regular ones
+        lines.insert(rng.randint(0, len(lines)), (single or 'x') + 'z' * rng.randint(1, HUGE_LINE))
+    elif strategy == 5:
+        # Only whitespace and line endings
+        lines = [rng.choice(('', ' ', '\t', '\x0c', '\x0b')) for _ in range(rng.randint(0, 20))]
+    return _join(rng, lines, newlines).encode('utf-8')
+
+
+def _iter_lines(data: bytes) -> Iterable[bytes]:
+    """Yield the lines of a buffer, keeping '\\n', '\\r\\n' and '\\r' endings."""
+    start = 0
+    index = 0
+    size = len(data)
+    while index < size:
+        byte = data[index]
+        if byte == 10 or byte == 13:
+            if byte == 13 and index + 1 < size and data[index + 1] == 10:
+                index += 1
+            yield data[start:index + 1]
+            start = index + 1
+        index += 1
+    if start < size:
+        yield data[start:]
+
+
+def _ddmin(items: List, still_fails: Callable[[List], bool], max_granularity: Optional[int] = None) -> List:
+    """
+    Delta debugging: remove pieces of a list as long as it still fails.
+
+    With ``max_granularity`` the list is never split into more pieces, which
+    bounds the work on long inputs at the cost of 1-minimality.
+    """
+    granularity = 2
+    while len(items) >= 2:
+        size = max(1, len(items) // granularity)
+        reduced = False
+        for offset in range(0, len(items), size):
+            complement = items[:offset] + items[offset + size:]
+            if complement and still_fails(complement):
+                items = complement
+                granularity = max(granularity - 1, 2)
+                reduced = True
+                break
+        if not reduced:
+            if size == 1 or granularity == max_granularity:
+                break
+            granularity = min(granularity * 2, len(items), max_granularity or len(items))
+    return items
+
+
+def shrink(data: bytes, still_fails: Callable[[bytes], bool]) -> bytes:
+    """
+    Shrink a failing input to a minimal counterexample.
+
+    Lines are removed first, then bytes within the remaining content.
+
+    Args:
+        data: Input for which ``still_fails`` is True
+        still_fails: Predicate telling whether a candidate still shows the failure
+
+    Returns:
+        A smaller input (possibly ``data`` itself) that still fails
+    """
+    lines = _ddmin(list(_iter_lines(data)), lambda candidate: still_fails(b''.join(candidate)))
+    data = b''.join(lines)
+    characters = data.decode('utf-8', errors='surrogateescape')
+    characters = _ddmin(list(characters),
+                        lambda candidate: still_fails(''.join(candidate).encode('utf-8', errors='surrogateescape')),
+                        MAX_SHRINK_GRANULARITY)
+    return ''.join(characters).encode('utf-8', errors='surrogateescape')
+
+
+def check(engine: Engine, data: bytes, patterns: Dict[str, str], metrics: bool) -> Optional[Dict]:
+    """
+    Compare one engine with the reference on one input.
+
+    Returns:
+        None if the engine agrees or declines, otherwise a dictionary with the
+        'expected' and 'actual' results (or the 'error' raised)
+    """
+    expected = reference_counts(data, patterns, metrics)
+    try:
+        actual = engine(data, patterns, metrics)
+    except Exception as e:
+        return {'expected': expected, 'error': f"{type(e).__name__}: {e}"}
+    if actual is None or actual == expected:
+        return None
+    return {'expected': expected, 'actual': actual}
+
+
+def run_differential(iterations: int = 200, seed: int = 0, engines: Optional[Dict[str, Engine]] = None,
+                     extensions: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Check engines against the reference on generated inputs.
+
+    Args:
+        iterations: Inputs generated per file type
+        seed: Seed of the generator, so runs are reproducible
+        engines: Engines to check by name (default: all registered ones)
+        extensions: File types to generate (default: every COMMENT_PATTERNS entry)
+
+    Returns:
+        Dictionary with 'cases' (inputs checked), 'declined' (per engine, inputs
+        it left to the reference) and 'failures', one per engine and file type
+        with the shrunk 'input', 'metrics' flag, 'expected' and 'actual' or
+        'error'
+    """
+    engines = ENGINES if engines is None else engines
+    extensions = sorted(FileAnalyzer.COMMENT_PATTERNS) if extensions is None else list(extensions)
+    rng = random.Random(seed)
+    declined = {name: 0 for name in engines}
+    failures = []
+    failed = set()
+    cases = 0
+
+    for extension in extensions:
+        patterns = FileAnalyzer.COMMENT_PATTERNS[extension]
+        for _ in range(iterations):
+            data = generate_source(rng, patterns)
+            metrics = rng.random() < 0.3
+            cases += 1
+            expected = reference_counts(data, patterns, metrics)
+            for name, engine in engines.items():
+                if (name, extension) in failed:
+                    continue
+                try:
+                    actual = engine(data, patterns, metrics)
+                except Exception:
+                    actual = _RAISED
+                if actual is None:
+                    declined[name] += 1
+                    continue
+                if actual == expected:
+                    continue
+                minimal = shrink(data, lambda candidate: check(engine, candidate, patterns, metrics) is not None)
+                failures.append({
+                    'engine': name,
+                    'extension': extension,
+                    'metrics': metrics,
+                    'input': minimal.decode('utf-8', errors='replace'),
+                    **check(engine, minimal, patterns, metrics)
+                })
+                failed.add((name, extension))
+
+    return {'cases': cases, 'declined': declined, 'failures': failures}
@@ -0,0 +1,265 @@
+"""
+Git source backend for counting lines straight from a repository's object database.
+"""
+
+import subprocess
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Set, Tuple
+
+from .core import _build_result
+from .file_analyzer import FileAnalyzer
+
+
+# Tree entry modes that hold regular file content (symlinks and submodules are skipped)
+_BLOB_MODES = {'100644', '100755'}
+
+# Blob counts memoised per GitSource; the least recently used are evicted
+# beyond this, which keeps a long history walk at a few tens of MB
+BLOB_CACHE_SIZE = 100_000
+
+
+class GitSource:
+    """Reads trees and blobs from a local git repository without checking them out."""
+
+    def __init__(self, repo_path: Path, analyzer: Optional[FileAnalyzer] = None, git: str = 'git',
+                 blob_cache_size: int = BLOB_CACHE_SIZE):
+        """
+        Initialize the git source.
+
+        Works with both regular checkouts and bare repositories.
+
+        Args:
+            repo_path: Path to the repository (work tree or bare git directory)
+            analyzer: FileAnalyzer instance (will create one if not provided)
+            git: Name or path of the git executable
+            blob_cache_size: Number of blob counts kept for unchanged blobs
+                of later revisions
+        """
+        self.repo_path = Path(repo_path)
+        self.analyzer = analyzer or FileAnalyzer()
+        self.git = git
+        self.blob_cache_size = blob_cache_size
+        self._blob_counts: 'OrderedDict[Tuple[str, str], Dict[str, int]]' = OrderedDict()
+        self._cat_file: Optional[subprocess.Popen] = None
+        self.blobs_read = 0
+
+    def __enter__(self) -> 'GitSource':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stop the background ``git cat-file`` process if it was started."""
+        if self._cat_file is not None:
+            self._cat_file.stdin.close()
+            self._cat_file.wait()
+            self._cat_file = None
+
+    def _run(self, *args: str) -> bytes:
+        """Run a git command in the repository and return its stdout."""
+        completed = subprocess.run(
+            [self.git, '-C', str(self.repo_path), *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False
+        )
+        if completed.returncode != 0:
+            message = completed.stderr.decode('utf-8', errors='replace').strip()
+            raise ValueError(f"git {args[0]} failed: {message}")
+        return completed.stdout
+
+    def resolve(self, revision: str) -> str:
+        """
+        Resolve a revision name to a full commit SHA.
+
+        Args:
+            revision: Any revision understood by git (branch, tag, SHA, HEAD~3, ...)
+
+        Returns:
+            Full commit SHA
+        """
+        return self._run('rev-parse', '--verify', '--quiet', f'{revision}^{{commit}}').decode().strip()
+
+    def list_tree(self, revision: str) -> List[Tuple[str, str]]:
+        """
+        List the regular files of a revision.
+
+        Args:
+            revision: Revision whose tree should be listed
+
+        Returns:
+            List of (path, blob_sha) tuples, paths relative to the repository root
+        """
+        output = self._run('ls-tree', '-r', '-z', '--full-tree', revision)
+        entries = []
+        for record in output.split(b'\0'):
+            if not record:
+                continue
+            meta, path = record.split(b'\t', 1)
+            mode, obj_type, sha = meta.decode().split(' ')
+            if obj_type != 'blob' or mode not in _BLOB_MODES:
+                continue
+            entries.append((path.decode('utf-8', errors='surrogateescape'), sha))
+        return entries
+
+    def list_commits(self, to_rev: str = 'HEAD', from_rev: Optional[str] = None) -> List[Tuple[str, str]]:
+        """
+        List first-parent commits in chronological order.
+
+        Args:
+            to_rev: Last revision of the range (inclusive)
+            from_rev: First revision of the range (inclusive); the whole history if not given
+
+        Returns:
+            List of (commit_sha, committer_date_iso) tuples, oldest first
+        """
+        args = ['log', '--reverse', '--first-parent', '--format=%H %cI']
+        if from_rev:
+            from_sha = self.resolve(from_rev)
+            args.append(f'{from_sha}..{to_rev}')
+        else:
+            args.append(to_rev)
+        commits = [tuple(line.split(' ', 1)) for line in self._run(*args).decode().splitlines() if line]
+        if from_rev:
+            date = self._run('show', '-s', '--format=%cI', from_sha).decode().strip()
+            commits.insert(0, (from_sha, date))
+        return commits
+
+    def diff_tree(self, old_revision: str, new_revision: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """
+        List the files that differ between two revisions.
+
+        Renames are reported as a deletion plus an addition.
+
+        Args:
+            old_revision: Revision to compare from
+            new_revision: Revision to compare to
+
+        Returns:
+            List of (path, old_blob_sha, new_blob_sha) tuples; a side is None when the
+            path is absent or not a regular file in that revision
+        """
+        output = self._run('diff-tree', '-r', '-z', '--no-renames', '--raw', old_revision, new_revision)
+        fields = output.split(b'\0')
+        changes = []
+        for i in range(0, len(fields) - 1, 2):
+            meta = fields[i].decode()
+            if not meta.startswith(':'):
+                continue
+            old_mode, new_mode, old_sha, new_sha = meta[1:].split(' ')[:4]
+            path = fields[i + 1].decode('utf-8', errors='surrogateescape')
+            changes.append((
+                path,
+                old_sha if old_mode in _BLOB_MODES else None,
+                new_sha if new_mode in _BLOB_MODES else None
+            ))
+        return changes
+
+    def read_blob(self, sha: str) -> bytes:
+        """
+        Read the content of a blob through a persistent ``git cat-file --batch`` process.
+
+        Args:
+            sha: Blob SHA
+
+        Returns:
+            Raw blob content
+        """
+        if self._cat_file is None:
+            self._cat_file = subprocess.Popen(
+                [self.git, '-C', str(self.repo_path), 'cat-file', '--batch'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE
+            )
+        proc = self._cat_file
+        proc.stdin.write(sha.encode() + b'\n')
+        proc.stdin.flush()
+        header = proc.stdout.readline().split()
+        if len(header) != 3 or header[1] != b'blob':
+            raise ValueError(f"git object {sha} is not a blob")
+        size = int(header[2])
+        data = proc.stdout.read(size)
+        proc.stdout.read(1)  # trailing newline after the object
+        self.blobs_read += 1
+        return data
+
+    def is_supported_path(self, path: str) -> bool:
+        """Check if a repository path should be analyzed."""
+        return self.analyzer.is_supported_file(PurePosixPath(path))
+
+    def count_blob(self, sha: str, path: str) -> Dict[str, int]:
+        """
+        Count lines in a blob, memoised by blob SHA for the last
+        ``blob_cache_size`` blobs used.
+
+        The file extension is part of the cache key because the same content
+        is classified differently depending on its comment patterns.
+
+        Args:
+            sha: Blob SHA
+            path: Repository path the blob appears under
+
+        Returns:
+            Dictionary with line counts
+        """
+        pure_path = PurePosixPath(path)
+        key = (sha, pure_path.suffix.lower())
+        counts = self._blob_counts.get(key)
+        if counts is not None:
+            self._blob_counts.move_to_end(key)
+            return counts
+        counts = self.analyzer.analyze_content(self.read_blob(sha), pure_path)
+        self._blob_counts[key] = counts
+        if len(self._blob_counts) > self.blob_cache_size:
+            self._blob_counts.popitem(last=False)
+        return counts
+
+    def file_result(self, path: str, sha: str) -> Dict:
+        """Create the per-file result entry for a blob."""
+        return {
+            'path': path,
+            'language': self.analyzer.get_file_language(PurePosixPath(path)),
+            'lines': dict(self.count_blob(sha, path))
+        }
+
+    def analyze_revision(self, revision: str = 'HEAD') -> Dict:
+        """
+        Analyze all supported files of a revision.
+
+        Args:
+            revision: Revision to analyze
+
+        Returns:
+            Dictionary with analysis results, in the same shape as ``analyze_directory``
+        """
+        file_results = [
+            self.file_result(path, sha)
+            for path, sha in self.list_tree(revision)
+            if self.is_supported_path(path)
+        ]
+        return _build_result(file_results)
+
+
+def analyze_revision(
+    repo_path: Path,
+    revision: str = 'HEAD',
+    include_extensions: Optional[Set[str]] = None,
+    exclude_patterns: Optional[Set[str]] = None
+) -> Dict:
+    """
+    Analyze a revision of a git repository without checking it out.
+
+    Args:
+        repo_path: Path to the repository (work tree or bare git directory)
+        revision: Revision to analyze
+        include_extensions: Set of file extensions to include
+        exclude_patterns: Set of patterns to exclude
+
+    Returns:
+        Dictionary with analysis results
+    """
+    analyzer = FileAnalyzer(include_extensions, exclude_patterns)
+    with GitSource(repo_path, analyzer) as source:
+        return source.analyze_revision(revision)
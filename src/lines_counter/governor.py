@@ -0,0 +1,285 @@
+"""
+Resource governance for scans sharing a host with other services.
+
+A ResourceGovernor can limit the read bandwidth of a scan with a token
+bucket, apply backpressure when the resident set size of the process grows
+past a soft cap, and lower the CPU and I/O scheduling priority of the scan to
+idle. Every time it holds a scan back, it counts a throttling event in its
+``stats``, which end up in the 'governor' section of the result.
+
+Above the memory cap queued work is finished first, garbage is collected
+(at most once per ``MEMORY_CHECK_INTERVAL``) and the walker or reader that
+asked is paused, for up to ``memory_pause`` seconds each time the RSS goes
+above the cap, so pool workers and other scans in the process can finish and
+release memory before more work is handed out.
+
+Priorities are lowered with ``SCHED_IDLE`` (or the lowest nice value where
+that is not available) and the Linux ``ioprio_set`` system call. They apply
+to the calling thread and to the workers it starts afterwards, and cannot be
+raised again by an unprivileged process. The RSS is read from
+``/proc/self/statm``; where it is not available the memory cap is inactive.
+"""
+
+import ctypes
+import gc
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+# ioprio_set(2) system call numbers by machine
+_IOPRIO_SET = {
+    'x86_64': 251,
+    'i386': 289,
+    'i686': 289,
+    'aarch64': 30,
+    'riscv64': 30,
+    'ppc64le': 273,
+    's390x': 282,
+}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_CLASS_SHIFT = 13
+
+# Lowest CPU priority as a nice value
+IDLE_NICE = 19
+
+# The RSS is read, and garbage collected under memory pressure, at most this often (seconds)
+MEMORY_CHECK_INTERVAL = 0.05
+
+# Longest pause each time the RSS goes above the soft cap (seconds)
+MEMORY_PAUSE = 1.0
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None if it cannot be read."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _lower_cpu_priority() -> bool:
+    """Put the calling thread in the idle scheduling class, or at the lowest nice value."""
+    if hasattr(os, 'sched_setscheduler') and hasattr(os, 'SCHED_IDLE'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+            return True
+        except OSError:
+            pass
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, IDLE_NICE)
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+def _lower_io_priority() -> bool:
+    """Put the calling thread in the idle I/O scheduling class (Linux only)."""
+    number = _IOPRIO_SET.get(platform.machine())
+    if number is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        priority = _IOPRIO_CLASS_IDLE << _IOPRIO_CLASS_SHIFT
+        return libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, priority) == 0
+    except (OSError, AttributeError):
+        return False
+
+
+class TokenBucket:
+    """Token bucket letting through ``rate`` units per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate: Units added per second
+            capacity: Most units stored for a burst (default: one second's worth)
+            clock: Monotonic clock in seconds
+            sleep: Function waiting for a number of seconds
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float) -> float:
+        """
+        Take units out of the bucket, waiting until they are covered.
+
+        Requests larger than the capacity are let through once the bucket
+        has been refilled for them, so a huge file delays the reads after it
+        instead of blocking forever.
+
+        Args:
+            amount: Units to take
+
+        Returns:
+            Seconds waited
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class ResourceGovernor:
+    """Keeps the read bandwidth, memory use and scheduling priority of scans in check."""
+
+    def __init__(self, max_read_rate: Optional[float] = None, memory_limit: Optional[int] = None,
+                 idle: bool = False, memory_pause: float = MEMORY_PAUSE,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the governor.
+
+        Args:
+            max_read_rate: Most bytes read per second, or None for no limit;
+                bursts of up to one second's worth are let through
+            memory_limit: Soft cap on the resident set size in bytes, or None.
+                Above it the scan stops handing out work until queued work is
+                done, garbage has been collected and the RSS is back under the
+                cap or ``memory_pause`` has passed; it never fails the scan.
+            idle: Whether scans run with idle CPU and I/O priority
+            memory_pause: Longest pause in seconds each time the RSS goes above the cap
+            clock: Monotonic clock in seconds
+            sleep: Function waiting for a number of seconds
+        """
+        if max_read_rate is not None and max_read_rate <= 0:
+            raise ValueError(f"max_read_rate must be positive, got {max_read_rate}")
+        if memory_limit is not None and memory_limit <= 0:
+            raise ValueError(f"memory_limit must be positive, got {memory_limit}")
+        if memory_pause < 0:
+            raise ValueError(f"memory_pause must not be negative, got {memory_pause}")
+        self.max_read_rate = max_read_rate
+        self.memory_limit = memory_limit
+        self.idle = idle
+        self.memory_pause = memory_pause
+        self._clock = clock
+        self._sleep = sleep
+        self._bucket = TokenBucket(max_read_rate) if max_read_rate is not None else None
+        self._checked_at: Optional[float] = None
+        self._collected_at: Optional[float] = None
+        self._over_limit = False
+        self._pause_left = 0.0
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict:
+        """Counters reported in the 'governor' section."""
+        return {
+            'bytes_read': 0,
+            'read_waits': 0,
+            'read_wait_seconds': 0.0,
+            'memory_waits': 0,
+            'memory_wait_seconds': 0.0,
+            'peak_rss': 0,
+            'idle_cpu': False,
+            'idle_io': False,
+        }
+
+    def lower_priority(self) -> None:
+        """
+        Lower the priority of the calling thread if idle mode is on.
+
+        Called before worker threads or processes are started, so they
+        inherit it.
+        """
+        if self.idle:
+            self.stats['idle_cpu'] = _lower_cpu_priority()
+            self.stats['idle_io'] = _lower_io_priority()
+
+    def begin_scan(self) -> None:
+        """Reset the counters at the start of a scan, keeping the priority flags."""
+        stats = self._empty_stats()
+        stats['idle_cpu'] = self.stats['idle_cpu']
+        stats['idle_io'] = self.stats['idle_io']
+        self.stats = stats
+        self._checked_at = None
+        self._collected_at = None
+        self._over_limit = False
+        self._pause_left = 0.0
+
+    def before_read(self, size: int) -> None:
+        """
+        Account for a file about to be read, waiting if the bandwidth is used up.
+
+        Args:
+            size: Size of the file in bytes
+        """
+        self.stats['bytes_read'] += size
+        if self._bucket is None or size <= 0:
+            return
+        waited = self._bucket.consume(size)
+        if waited > 0:
+            self.stats['read_waits'] += 1
+            self.stats['read_wait_seconds'] += waited
+
+    def over_memory_limit(self) -> bool:
+        """
+        Whether the RSS is above the soft cap, checked at most every ``MEMORY_CHECK_INTERVAL``.
+
+        Going from under to over the cap counts one event in 'memory_waits'.
+        """
+        if self.memory_limit is None:
+            return False
+        now = self._clock()
+        if self._checked_at is None or now - self._checked_at >= MEMORY_CHECK_INTERVAL:
+            self._checked_at = now
+            rss = current_rss()
+            if rss is not None:
+                self.stats['peak_rss'] = max(self.stats['peak_rss'], rss)
+                over_limit = rss > self.memory_limit
+                if over_limit and not self._over_limit:
+                    self.stats['memory_waits'] += 1
+                    self._pause_left = self.memory_pause
+                self._over_limit = over_limit
+        return self._over_limit
+
+    def relieve_memory(self, drain: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Apply backpressure while the RSS is above the soft cap.
+
+        Queued work is finished first by calling ``drain`` until it returns
+        False. If the RSS is still above the cap, garbage is collected (at
+        most once per check interval) and the caller is paused until the RSS
+        is back under the cap, for at most ``memory_pause`` seconds per event;
+        after that the scan continues, since the cap is soft.
+
+        Args:
+            drain: Finishes one piece of queued work and returns whether there
+                was any, or None if nothing is queued
+        """
+        if not self.over_memory_limit():
+            return
+        while drain is not None and drain():
+            if not self.over_memory_limit():
+                return
+        now = self._clock()
+        if self._collected_at is None or now - self._collected_at >= MEMORY_CHECK_INTERVAL:
+            self._collected_at = now
+            gc.collect()
+        while self._pause_left > 0 and self.over_memory_limit():
+            pause = min(MEMORY_CHECK_INTERVAL, self._pause_left)
+            self._sleep(pause)
+            self._pause_left -= pause
+            self.stats['memory_wait_seconds'] += pause
@@ -0,0 +1,171 @@
+"""
+Cheap detection of generated, minified and vendored files.
+
+Files are classified from their path and size first, then from their first
+block, so flagged files are never classified line by line. They are either
+skipped, without reading more than their first block, or counted with a
+newline-only pass.
+"""
+
+from pathlib import Path, PurePath
+from typing import Optional, Tuple
+
+from .encoding import BINARY, SNIFF_SIZE, sniff_encoding
+from .iosched import advise_sequential
+
+
+# Kinds of flagged files
+GENERATED = 'generated'
+MINIFIED = 'minified'
+VENDORED = 'vendored'
+KINDS = frozenset({GENERATED, MINIFIED, VENDORED})
+
+# What to do with flagged files
+MODES = ('skip', 'count')
+
+# Directory names holding third-party code. 'extern' and 'external' are left
+# out: projects use them as often for their own code (bindings, integrations)
+VENDOR_DIRS = frozenset({
+    'vendor', 'vendors', 'third_party', 'third-party', 'thirdparty', 'bower_components',
+})
+
+LOCKFILE_NAMES = frozenset({
+    'package-lock.json', 'npm-shrinkwrap.json', 'pnpm-lock.yaml', 'yarn.lock',
+    'composer.lock', 'poetry.lock', 'pipfile.lock', 'cargo.lock', 'gemfile.lock',
+})
+
+MINIFIED_SUFFIXES = ('.min.js', '-min.js', '.min.css', '-min.css')
+
+GENERATED_SUFFIXES = (
+    '_pb2.py', '_pb2_grpc.py', '.pb.go', '.pb.cc', '.pb.h',
+    '.generated.cs', '.designer.cs', '.g.dart', '.bundle.js',
+)
+
+# JSON files this large are data dumps rather than hand-written configuration
+LARGE_DATA_SIZE = 1024 * 1024
+
+# Markers looked for in the first lines of a file
+GENERATED_MARKERS = (
+    b'@generated', b'do not edit', b'generated by', b'autogenerated',
+    b'auto-generated', b'automatically generated',
+)
+MARKER_LINES = 5
+
+# Average line length above which a first block counts as minified
+MINIFIED_LINE_LENGTH = 300
+MINIFIED_MIN_BLOCK = 1024
+
+
+def classify_path(relative_path: str, size: int) -> Optional[str]:
+    """
+    Classify a file from its path and size alone.
+
+    Args:
+        relative_path: Path of the file relative to the scanned root
+        size: File size in bytes
+
+    Returns:
+        VENDORED, MINIFIED or GENERATED, or None if nothing is known yet
+    """
+    path = PurePath(relative_path.lower())
+    if any(part in VENDOR_DIRS for part in path.parts[:-1]):
+        return VENDORED
+    name = path.name
+    if name.endswith(MINIFIED_SUFFIXES):
+        return MINIFIED
+    if name in LOCKFILE_NAMES or name.endswith(GENERATED_SUFFIXES):
+        return GENERATED
+    if path.suffix == '.json' and size > LARGE_DATA_SIZE:
+        return GENERATED
+    return None
+
+
+def classify_head(head: bytes, size: int) -> Optional[str]:
+    """
+    Classify a file from its first block.
+
+    Args:
+        head: First ``SNIFF_SIZE`` bytes of the file
+        size: File size in bytes
+
+    Returns:
+        GENERATED for files with a "generated" marker in their first lines,
+        MINIFIED for files with very long lines, or None for regular files
+    """
+    top = b'\n'.join(head.split(b'\n', MARKER_LINES)[:MARKER_LINES]).lower()
+    if any(marker in top for marker in GENERATED_MARKERS):
+        return GENERATED
+
+    if len(head) >= MINIFIED_MIN_BLOCK:
+        newlines = head.count(b'\n')
+        if newlines == 0 and size > len(head):
+            return MINIFIED
+        if len(head) / (newlines + 1) > MINIFIED_LINE_LENGTH:
+            return MINIFIED
+    return None
+
+
+def count_newlines(data: bytes) -> int:
+    """
+    Count lines without classifying them.
+
+    Args:
+        data: Content in an ASCII-compatible encoding; UTF-16 and UTF-32
+            content has to be transcoded first (see ``encoding.to_utf8``)
+
+    Returns:
+        Number of lines, counting a final line without a newline
+    """
+    lines = data.count(b'\n')
+    if data and not data.endswith(b'\n'):
+        lines += 1
+    return lines
+
+
+class GeneratedFileFilter:
+    """Reads files for analysis, diverting generated, minified and vendored ones."""
+
+    def __init__(self, mode: str = 'skip'):
+        """
+        Initialize the filter.
+
+        Args:
+            mode: 'skip' to leave flagged files out, or 'count' to count their
+                lines with a newline-only pass
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown mode for generated files: {mode}")
+        self.mode = mode
+
+    def read_file(self, file_path: Path, relative_path: str, size: int) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Read a file, unless it is binary or flagged and skipped.
+
+        Args:
+            file_path: Path to the file
+            relative_path: Path of the file relative to the scanned root
+            size: File size in bytes
+
+        Returns:
+            Tuple of (content, or None for binary content and skipped flagged
+            files; the kind of a flagged file (see ``KINDS``), or None). A
+            binary file flagged by its path is returned without content in
+            both modes, so its lines are never counted.
+        """
+        kind = classify_path(relative_path, size)
+        if kind is not None and self.mode == 'skip':
+            return None, kind
+
+        with open(file_path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+            if sniff_encoding(head)[0] == BINARY:
+                return None, kind
+            if kind is None:
+                kind = classify_head(head, size)
+                if kind is not None and self.mode == 'skip':
+                    return None, kind
+            advise_sequential(f.fileno(), size)
+            return head + f.read(), kind
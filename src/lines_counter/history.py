@@ -0,0 +1,210 @@
+"""
+Historical trend mode: line-count time series across a range of commits.
+"""
+
+import json
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from .file_analyzer import FileAnalyzer
+from .git_source import GitSource
+
+
+class HistoryState:
+    """Running line counts of one revision, updated incrementally from tree diffs."""
+
+    def __init__(self, source: GitSource):
+        """
+        Initialize an empty state.
+
+        Args:
+            source: GitSource used to read and count blobs
+        """
+        self.source = source
+        self.files: Dict[str, Tuple[str, str, Dict[str, int]]] = {}
+        self.totals = {'total': 0, 'code': 0, 'comments': 0, 'blank': 0}
+        self.languages: Dict[str, Dict[str, int]] = {}
+
+    def _add(self, path: str, sha: str) -> None:
+        """Add a blob to the running totals."""
+        counts = self.source.count_blob(sha, path)
+        language = self.source.analyzer.get_file_language(PurePosixPath(path))
+        self.files[path] = (sha, language, counts)
+        self._apply(language, counts, 1)
+
+    def _remove(self, path: str) -> None:
+        """Remove a previously added path from the running totals."""
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        _, language, counts = entry
+        self._apply(language, counts, -1)
+
+    def _apply(self, language: str, counts: Dict[str, int], sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) one file's counts."""
+        for key in self.totals:
+            self.totals[key] += sign * counts[key]
+
+        stats = self.languages.get(language)
+        if stats is None:
+            stats = self.languages[language] = {
+                'files': 0,
+                'total_lines': 0,
+                'code_lines': 0,
+                'comment_lines': 0,
+                'blank_lines': 0
+            }
+        stats['files'] += sign
+        stats['total_lines'] += sign * counts['total']
+        stats['code_lines'] += sign * counts['code']
+        stats['comment_lines'] += sign * counts['comments']
+        stats['blank_lines'] += sign * counts['blank']
+        if stats['files'] == 0:
+            del self.languages[language]
+
+    def load(self, revision: str) -> None:
+        """
+        Reset the state to a full listing of a revision.
+
+        Args:
+            revision: Revision to load
+        """
+        self.files.clear()
+        self.languages.clear()
+        for key in self.totals:
+            self.totals[key] = 0
+        for path, sha in self.source.list_tree(revision):
+            if self.source.is_supported_path(path):
+                self._add(path, sha)
+
+    def advance(self, old_revision: str, new_revision: str) -> None:
+        """
+        Move the state from one revision to another, touching only changed blobs.
+
+        Args:
+            old_revision: Revision the state currently reflects
+            new_revision: Revision to move to
+        """
+        for path, _old_sha, new_sha in self.source.diff_tree(old_revision, new_revision):
+            if not self.source.is_supported_path(path):
+                continue
+            self._remove(path)
+            if new_sha is not None:
+                self._add(path, new_sha)
+
+    def snapshot(self) -> Dict:
+        """Return the summary and per-language totals of the current revision."""
+        return {
+            'summary': {
+                'total_files': len(self.files),
+                'total_lines': self.totals['total'],
+                'code_lines': self.totals['code'],
+                'comment_lines': self.totals['comments'],
+                'blank_lines': self.totals['blank']
+            },
+            'languages': {lang: dict(stats) for lang, stats in sorted(self.languages.items())}
+        }
+
+
+def iter_history(
+    repo_path: Path,
+    from_rev: Optional[str] = None,
+    to_rev: str = 'HEAD',
+    step: int = 1,
+    include_extensions: Optional[Set[str]] = None,
+    exclude_patterns: Optional[Set[str]] = None,
+    resume_after: Optional[str] = None
+) -> Iterator[Dict]:
+    """
+    Yield one row of line counts per sampled commit, oldest first.
+
+    The first commit is counted from its full tree; every following commit is
+    computed as a delta from the previous row, so only changed blobs are read.
+
+    Args:
+        repo_path: Path to the repository (work tree or bare git directory)
+        from_rev: First revision of the range (inclusive); the whole history if not given
+        to_rev: Last revision of the range (inclusive)
+        step: Emit every Nth first-parent commit
+        include_extensions: Set of file extensions to include
+        exclude_patterns: Set of patterns to exclude
+        resume_after: Commit SHA of the last row already produced; rows up to and
+            including it are skipped
+
+    Returns:
+        Iterator of dictionaries with 'commit', 'date', 'summary' and 'languages'
+    """
+    if step < 1:
+        raise ValueError("step must be at least 1")
+
+    analyzer = FileAnalyzer(include_extensions, exclude_patterns)
+    with GitSource(repo_path, analyzer) as source:
+        commits = source.list_commits(to_rev, from_rev)[::step]
+
+        if resume_after is not None:
+            shas = [sha for sha, _ in commits]
+            if resume_after not in shas:
+                raise ValueError(f"commit {resume_after} is not part of the requested history")
+            done = shas.index(resume_after) + 1
+            commits = commits[done:]
+            previous = resume_after
+        else:
+            previous = None
+
+        state = HistoryState(source)
+        if previous is not None and commits:
+            state.load(previous)
+
+        for sha, date in commits:
+            if previous is None:
+                state.load(sha)
+            else:
+                state.advance(previous, sha)
+            previous = sha
+            yield {'commit': sha, 'date': date, **state.snapshot()}
+
+
+def prepare_resume(output_path: Path) -> Optional[str]:
+    """
+    Prepare a JSON Lines history file for resuming an interrupted run.
+
+    A trailing partial row left by the interrupted run is truncated away.
+
+    Args:
+        output_path: Path to the history file
+
+    Returns:
+        Commit SHA of the last complete row, or None if there is none
+    """
+    if not output_path.exists():
+        return None
+
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete != len(data):
+            f.truncate(complete)
+
+    lines = data[:complete].splitlines()
+    if not lines:
+        return None
+    return json.loads(lines[-1])['commit']
+
+
+def write_history(rows: Iterator[Dict], stream: TextIO) -> int:
+    """
+    Stream history rows as JSON Lines, flushing after each row.
+
+    Args:
+        rows: Rows produced by ``iter_history``
+        stream: Text stream to write to
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        stream.flush()
+        written += 1
+    return written
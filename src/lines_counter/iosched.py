@@ -0,0 +1,137 @@
+"""
+Disk-friendly ordering of file reads and kernel readahead hints.
+
+Files are read in ``(st_dev, st_ino)`` order, which on most Unix file systems
+follows on-disk allocation closely enough to turn random seeks into mostly
+forward sweeps. A window of files ahead of the reader is announced to the
+kernel with ``POSIX_FADV_WILLNEED`` so their pages are fetched while earlier
+files are being classified; optionally, pages of finished files are dropped
+again with ``POSIX_FADV_DONTNEED``. The hints are skipped where
+``os.posix_fadvise`` is not available.
+
+Readahead behaviour (``POSIX_FADV_SEQUENTIAL``) belongs to an open file
+description rather than to the file, so it is requested by the readers on the
+descriptor they read from, with ``advise_sequential``.
+"""
+
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+
+HAVE_FADVISE = hasattr(os, 'posix_fadvise')
+
+# Files larger than this are only prefetched up to this many bytes; the rest
+# is left to sequential readahead
+PREFETCH_BYTES = 1024 * 1024
+
+
+def _advise(path: Path, offset: int, length: int, advice: int) -> bool:
+    """Give the kernel one hint about a file; failures are ignored."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def advise_sequential(fd: int, size: int) -> bool:
+    """
+    Ask for aggressive readahead on a descriptor about to be read to the end.
+
+    Only files larger than ``PREFETCH_BYTES`` get the hint, as smaller ones are
+    prefetched whole; failures are ignored.
+
+    Args:
+        fd: Descriptor the file is read from
+        size: File size in bytes
+
+    Returns:
+        Whether the hint was given
+    """
+    if not HAVE_FADVISE or size <= PREFETCH_BYTES:
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return True
+    except OSError:
+        return False
+
+
+class IOScheduler:
+    """Orders file reads by inode and keeps kernel readahead a few files ahead."""
+
+    def __init__(self, prefetch: int = 32, drop_behind: bool = False):
+        """
+        Initialize the scheduler.
+
+        Args:
+            prefetch: Number of files to announce ahead of the reader (0 disables
+                prefetching)
+            drop_behind: Whether to drop the pages of each file from the page
+                cache once it has been read, so a scan does not evict the cache
+                of other processes on the host
+        """
+        self.prefetch = prefetch
+        self.drop_behind = drop_behind
+        self._files: Sequence[Tuple[Path, os.stat_result]] = ()
+        self._order: List[int] = []
+        self._next = 0
+        self.stats = {'prefetched': 0, 'dropped': 0}
+
+    def order(self, files: Sequence[Tuple[Path, os.stat_result]]) -> List[int]:
+        """
+        Plan the read order of a list of files.
+
+        Args:
+            files: List of (path, stat result) in walk order
+
+        Returns:
+            Indices into ``files`` sorted by device and inode number; the
+            statistics are reset for the new plan
+        """
+        self._files = files
+        self._order = sorted(range(len(files)), key=lambda i: (files[i][1].st_dev, files[i][1].st_ino))
+        self._next = 0
+        self.stats = {'prefetched': 0, 'dropped': 0}
+        return self._order
+
+    def before_read(self, position: int) -> None:
+        """
+        Called before reading the file at ``position`` of the planned order.
+
+        Announces the files up to ``prefetch`` positions ahead that have not
+        been announced yet.
+
+        Args:
+            position: Position in the list returned by ``order()``
+        """
+        if not HAVE_FADVISE or self.prefetch <= 0:
+            return
+        limit = min(len(self._order), position + 1 + self.prefetch)
+        self._next = max(self._next, position)
+        while self._next < limit:
+            path, st = self._files[self._order[self._next]]
+            length = 0 if st.st_size <= PREFETCH_BYTES else PREFETCH_BYTES
+            if _advise(path, 0, length, os.POSIX_FADV_WILLNEED):
+                self.stats['prefetched'] += 1
+            self._next += 1
+
+    def after_read(self, position: int) -> None:
+        """
+        Called after the file at ``position`` of the planned order was read.
+
+        Args:
+            position: Position in the list returned by ``order()``
+        """
+        if not HAVE_FADVISE or not self.drop_behind:
+            return
+        path, _ = self._files[self._order[position]]
+        if _advise(path, 0, 0, os.POSIX_FADV_DONTNEED):
+            self.stats['dropped'] += 1
@@ -0,0 +1,287 @@
+"""
+Prometheus / OpenMetrics exporter serving line counts from background scans.
+
+Scrapes are answered from the snapshot of the last finished scan and never
+trigger a scan themselves.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .cache import ScanCache
+from .core import analyze_directory
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Shortest interval between scheduled rescans (seconds)
+MIN_INTERVAL = 1.0
+
+# Result keys exported as the 'kind' label of the line gauges
+_LINE_KINDS = (
+    ('total', 'total_lines'),
+    ('code', 'code_lines'),
+    ('comment', 'comment_lines'),
+    ('blank', 'blank_lines'),
+)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the OpenMetrics text format."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(results: Optional[Dict], scan_info: Dict) -> str:
+    """
+    Render analysis results and scan statistics in OpenMetrics text format.
+
+    Args:
+        results: Analysis results of the last scan, or None if no scan finished yet
+        scan_info: Dictionary with 'scans', 'duration_seconds', 'finished_at'
+            and 'cache_hit_ratio' of the last scan, and optionally the number
+            of failed scans as 'scan_errors'
+
+    Returns:
+        Exposition text ending with ``# EOF``
+    """
+    lines: List[str] = [
+        '# TYPE lines_counter_up gauge',
+        '# HELP lines_counter_up Whether a scan has finished and metrics are available.',
+        f'lines_counter_up {1 if results is not None else 0}',
+        '# TYPE lines_counter_scans counter',
+        '# HELP lines_counter_scans Number of finished scans.',
+        f"lines_counter_scans_total {scan_info['scans']}",
+        '# TYPE lines_counter_scan_errors counter',
+        '# HELP lines_counter_scan_errors Number of scans that failed; the previous metrics are kept.',
+        f"lines_counter_scan_errors_total {scan_info.get('scan_errors', 0)}",
+    ]
+
+    if results is not None:
+        summary = results['summary']
+        files = summary['total_files']
+        duration = scan_info['duration_seconds']
+        lines += [
+            '# TYPE lines_counter_files gauge',
+            '# HELP lines_counter_files Number of analyzed files.',
+            f'lines_counter_files {files}',
+            '# TYPE lines_counter_lines gauge',
+            '# HELP lines_counter_lines Number of lines by kind.',
+        ]
+        lines += [f'lines_counter_lines{{kind="{kind}"}} {summary[key]}' for kind, key in _LINE_KINDS]
+
+        lines += [
+            '# TYPE lines_counter_language_files gauge',
+            '# HELP lines_counter_language_files Number of analyzed files by language.',
+        ]
+        for language, stats in sorted(results['languages'].items()):
+            lines.append(f'lines_counter_language_files{{language="{_escape(language)}"}} {stats["files"]}')
+        lines += [
+            '# TYPE lines_counter_language_lines gauge',
+            '# HELP lines_counter_language_lines Number of lines by language and kind.',
+        ]
+        for language, stats in sorted(results['languages'].items()):
+            for kind, key in _LINE_KINDS:
+                lines.append(
+                    f'lines_counter_language_lines{{language="{_escape(language)}",kind="{kind}"}} {stats[key]}'
+                )
+
+        lines += [
+            '# TYPE lines_counter_scan_duration_seconds gauge',
+            '# UNIT lines_counter_scan_duration_seconds seconds',
+            '# HELP lines_counter_scan_duration_seconds Duration of the last scan.',
+            f'lines_counter_scan_duration_seconds {duration:.6f}',
+            '# TYPE lines_counter_scan_files_per_second gauge',
+            '# HELP lines_counter_scan_files_per_second Throughput of the last scan.',
+            f'lines_counter_scan_files_per_second {files / duration if duration > 0 else 0:.3f}',
+            '# TYPE lines_counter_last_scan_timestamp_seconds gauge',
+            '# UNIT lines_counter_last_scan_timestamp_seconds seconds',
+            '# HELP lines_counter_last_scan_timestamp_seconds Unix time the last scan finished.',
+            f"lines_counter_last_scan_timestamp_seconds {scan_info['finished_at']:.3f}",
+        ]
+        if scan_info.get('cache_hit_ratio') is not None:
+            lines += [
+                '# TYPE lines_counter_cache_hit_ratio gauge',
+                '# HELP lines_counter_cache_hit_ratio Fraction of files served from the cache in the last scan.',
+                f"lines_counter_cache_hit_ratio {scan_info['cache_hit_ratio']:.6f}",
+            ]
+        governor = results.get('governor')
+        if governor is not None:
+            lines += [
+                '# TYPE lines_counter_read_throttle_waits gauge',
+                '# HELP lines_counter_read_throttle_waits Reads delayed by the bandwidth limit in the last scan.',
+                f"lines_counter_read_throttle_waits {governor['read_waits']}",
+                '# TYPE lines_counter_read_throttle_seconds gauge',
+                '# UNIT lines_counter_read_throttle_seconds seconds',
+                '# HELP lines_counter_read_throttle_seconds Time spent waiting for the bandwidth limit in the last scan.',
+                f"lines_counter_read_throttle_seconds {governor['read_wait_seconds']:.6f}",
+                '# TYPE lines_counter_memory_backpressure_events gauge',
+                '# HELP lines_counter_memory_backpressure_events Times the last scan held back work above the memory cap.',
+                f"lines_counter_memory_backpressure_events {governor['memory_waits']}",
+                '# TYPE lines_counter_memory_pause_seconds gauge',
+                '# UNIT lines_counter_memory_pause_seconds seconds',
+                '# HELP lines_counter_memory_pause_seconds Time the last scan was paused above the memory cap.',
+                f"lines_counter_memory_pause_seconds {governor['memory_wait_seconds']:.6f}",
+                '# TYPE lines_counter_peak_rss_bytes gauge',
+                '# UNIT lines_counter_peak_rss_bytes bytes',
+                '# HELP lines_counter_peak_rss_bytes Highest resident set size seen by the memory cap in the last scan.',
+                f"lines_counter_peak_rss_bytes {governor['peak_rss']}",
+            ]
+
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsExporter:
+    """Rescans a directory in the background and keeps the rendered metrics of the last scan."""
+
+    def __init__(
+        self,
+        directory_path: Path,
+        interval: float = 300.0,
+        watch: bool = False,
+        poll_interval: float = 5.0,
+        cache: Optional[ScanCache] = None,
+        **scan_options
+    ):
+        """
+        Initialize the exporter.
+
+        Args:
+            directory_path: Directory to analyze
+            interval: Seconds between scheduled rescans, at least ``MIN_INTERVAL``
+            watch: Whether to also rescan as soon as a directory changes (files
+                added, removed or renamed)
+            poll_interval: Seconds between change checks when watching
+            cache: ScanCache kept warm across rescans (a memory-only one by default)
+            **scan_options: Further keyword arguments for ``analyze_directory``
+
+        Raises:
+            ValueError: If the interval is shorter than ``MIN_INTERVAL``
+        """
+        if interval < MIN_INTERVAL:
+            raise ValueError(f"interval must be at least {MIN_INTERVAL:g}s, got {interval}")
+        self.directory_path = Path(directory_path)
+        self.interval = interval
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self.cache = cache if cache is not None else ScanCache()
+        self.scan_options = scan_options
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._scan_info = {'scans': 0, 'scan_errors': 0, 'duration_seconds': 0.0, 'finished_at': 0.0,
+                           'cache_hit_ratio': None}
+        self._results: Optional[Dict] = None
+        self._snapshot = render_metrics(None, self._scan_info)
+        # Description of the exception of the last failed scan, if any
+        self.last_error: Optional[str] = None
+
+    @property
+    def snapshot(self) -> str:
+        """Rendered metrics of the last finished scan."""
+        with self._lock:
+            return self._snapshot
+
+    def scan_once(self) -> Dict:
+        """
+        Run one scan and publish its metrics.
+
+        Returns:
+            Analysis results of the scan
+        """
+        started = time.monotonic()
+        results = analyze_directory(self.directory_path, cache=self.cache, **self.scan_options)
+        duration = time.monotonic() - started
+
+        cache_stats = results.get('cache')
+        hit_ratio = None
+        if cache_stats:
+            lookups = cache_stats['file_hits'] + cache_stats['file_misses']
+            hit_ratio = cache_stats['file_hits'] / lookups if lookups else 0.0
+
+        with self._lock:
+            self._scan_info = {
+                'scans': self._scan_info['scans'] + 1,
+                'scan_errors': self._scan_info['scan_errors'],
+                'duration_seconds': duration,
+                'finished_at': time.time(),
+                'cache_hit_ratio': hit_ratio,
+            }
+            self._results = results
+            self._snapshot = render_metrics(results, self._scan_info)
+        return results
+
+    def _scan_failed(self, error: Exception) -> None:
+        """Count a failed scan; the metrics of the last finished scan are kept."""
+        with self._lock:
+            self._scan_info['scan_errors'] += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            self._snapshot = render_metrics(self._results, self._scan_info)
+
+    def _wait_for_next_scan(self) -> None:
+        """Sleep until the schedule is due, a watched directory changes or the exporter stops."""
+        deadline = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            step = min(remaining, self.poll_interval) if self.watch else remaining
+            if self._stop.wait(step):
+                return
+            if self.watch and self.cache.directories_changed():
+                return
+
+    def _run(self) -> None:
+        """Background loop: scan, then wait for the next trigger."""
+        while not self._stop.is_set():
+            try:
+                self.scan_once()
+            except Exception as e:
+                self._scan_failed(e)
+            self._wait_for_next_scan()
+
+    def start(self) -> None:
+        """Start rescanning in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='lines-counter-metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def make_server(self, host: str = '127.0.0.1', port: int = 9464) -> ThreadingHTTPServer:
+        """
+        Create an HTTP server that answers scrapes from the current snapshot.
+
+        Args:
+            host: Interface to bind to
+            port: Port to listen on (0 picks a free port)
+
+        Returns:
+            Server ready for ``serve_forever()``
+        """
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.snapshot.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((host, port), MetricsHandler)
@@ -0,0 +1,242 @@
+"""
+Line counts per code owner, from a CODEOWNERS file.
+
+The rules are parsed and compiled once. Owners are resolved per directory
+rather than per file: for each directory the index of the last rule that
+covers it as a whole (``/docs/``, ``apps/``, ``/src/**``) is inherited from
+its parent, and only the later rules that could still match a single file
+in it (``*.js``, ``/docs/*``) are kept, joined into one regular expression
+shared by all directories with the same candidates. Deciding a file's owners
+is then a dictionary lookup plus one match of its name. As in GitHub, the
+last matching rule wins.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+
+# Key of the files without an owner in the 'owners' section
+UNOWNED = '(unowned)'
+
+_SPLIT = re.compile(r'(?<!\\)\s+')
+
+
+class _Rule(NamedTuple):
+    """One compiled CODEOWNERS line."""
+
+    owners: Tuple[str, ...]
+    # Matches a directory path whose files all belong to the rule, or None
+    covers: Optional[Pattern]
+    # Matches the directory path, with a trailing '/' unless it is the root, of
+    # a single file the rule can match (None for any)
+    directory: Optional[Pattern]
+    # Matches the name of a single file the rule can match, or None if it only names directories
+    name: Optional[Pattern]
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a CODEOWNERS glob into a regular expression over '/'-separated paths."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+
+def _compile_rule(pattern: str, owners: Tuple[str, ...]) -> _Rule:
+    """
+    Compile one pattern.
+
+    A pattern starting with or containing '/' is relative to the root,
+    otherwise it matches at any depth. A pattern naming a directory covers
+    everything below it, except that ``dir/*`` only matches the files
+    directly in ``dir``. A trailing '/' or '/**' restricts it to directories.
+    """
+    anchored = pattern.startswith('/')
+    body = pattern[1:] if anchored else pattern
+    directories_only = False
+    if body.endswith('/**'):
+        body = body[:-3]
+        directories_only = True
+    elif body.endswith('/'):
+        body = body.rstrip('/')
+        directories_only = True
+    if not body:
+        # '/' or '/**': the whole repository
+        return _Rule(owners, re.compile('.*'), None, None)
+
+    anchored = anchored or '/' in body
+    prefix = '' if anchored else '(?:.*/)?'
+    directory_part, _, last = body.rpartition('/')
+    files_only = last == '*' and bool(directory_part)
+    covers = None if files_only else re.compile(prefix + _glob_to_regex(body))
+    if directories_only:
+        return _Rule(owners, covers, None, None)
+
+    if directory_part:
+        directory = re.compile(_glob_to_regex(directory_part + '/'))
+    else:
+        directory = re.compile('') if anchored else None
+    return _Rule(owners, covers, directory, re.compile(_glob_to_regex(last)))
+
+
+class CodeOwners:
+    """Compiled CODEOWNERS rules with memoised per-directory resolution."""
+
+    def __init__(self, text: str):
+        """
+        Parse CODEOWNERS content.
+
+        Blank lines, comments and GitLab section headers are ignored; a rule
+        without owners makes matching files unowned.
+
+        Args:
+            text: Content of a CODEOWNERS file
+        """
+        self._rules: List[_Rule] = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#') or line.startswith(('[', '^[')):
+                continue
+            fields = _SPLIT.split(line)
+            owners = []
+            for field in fields[1:]:
+                if field.startswith('#'):
+                    break
+                owners.append(field)
+            pattern = fields[0].replace('\\ ', ' ').replace('\\#', '#')
+            self._rules.append(_compile_rule(pattern, tuple(owners)))
+        self._directories: Dict[str, Tuple[int, Optional[Pattern], Tuple[int, ...]]] = {}
+        self._matchers: Dict[Tuple[int, ...], Pattern] = {}
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'CodeOwners':
+        """Parse a CODEOWNERS file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.read())
+
+    def __len__(self) -> int:
+        """Number of rules."""
+        return len(self._rules)
+
+    def owners_of(self, relative_path: str) -> Tuple[str, ...]:
+        """
+        Get the owners of a file.
+
+        Args:
+            relative_path: File path relative to the repository root
+
+        Returns:
+            Owners of the last matching rule, or an empty tuple if none matches
+        """
+        directory, _, name = relative_path.replace(os.sep, '/').rpartition('/')
+        cover, matcher, candidates = self._resolve_directory(directory)
+        if matcher is not None:
+            match = matcher.fullmatch(name)
+            if match is not None:
+                return self._rules[candidates[match.lastindex - 1]].owners
+        return self._rules[cover].owners if cover >= 0 else ()
+
+    def _resolve_directory(self, directory: str) -> Tuple[int, Optional[Pattern], Tuple[int, ...]]:
+        """
+        Get the last rule covering a directory and the later rules that may match its files.
+
+        Returns:
+            Tuple of (index of the covering rule or -1, pattern matching the
+            file names of the candidate rules or None, indexes of the candidate
+            rules, last first, in the order of the pattern's groups)
+        """
+        resolved = self._directories.get(directory)
+        if resolved is not None:
+            return resolved
+
+        cover = self._resolve_directory(directory.rpartition('/')[0])[0] if directory else -1
+        for index in range(len(self._rules) - 1, cover, -1):
+            covers = self._rules[index].covers
+            if covers is not None and covers.fullmatch(directory):
+                cover = index
+                break
+        prefix = directory + '/' if directory else ''
+        candidates = tuple(
+            index for index in range(len(self._rules) - 1, cover, -1)
+            if self._rules[index].name is not None
+            and (self._rules[index].directory is None or self._rules[index].directory.fullmatch(prefix))
+        )
+        matcher = None
+        if candidates:
+            matcher = self._matchers.get(candidates)
+            if matcher is None:
+                # Alternatives are tried in order, so the first group that matches is the last rule
+                matcher = re.compile('|'.join(f'({self._rules[index].name.pattern})' for index in candidates))
+                self._matchers[candidates] = matcher
+        resolved = (cover, matcher, candidates)
+        self._directories[directory] = resolved
+        return resolved
+
+
+class OwnerRollup:
+    """Accumulates line counts per code owner as files finish."""
+
+    def __init__(self, codeowners: CodeOwners):
+        """
+        Initialize the rollup.
+
+        Args:
+            codeowners: Rules deciding the owners of each file
+        """
+        self.codeowners = codeowners
+        self._owners: Dict[str, Dict[str, int]] = {}
+
+    def add(self, relative_path: str, lines: Dict[str, int]) -> None:
+        """
+        Add one file's counts to each of its owners.
+
+        Args:
+            relative_path: File path relative to the repository root
+            lines: Line counts of the file
+        """
+        for owner in self.codeowners.owners_of(relative_path) or (UNOWNED,):
+            totals = self._owners.get(owner)
+            if totals is None:
+                totals = self._owners[owner] = {
+                    'files': 0,
+                    'total_lines': 0,
+                    'code_lines': 0,
+                    'comment_lines': 0,
+                    'blank_lines': 0
+                }
+            totals['files'] += 1
+            totals['total_lines'] += lines['total']
+            totals['code_lines'] += lines['code']
+            totals['comment_lines'] += lines['comments']
+            totals['blank_lines'] += lines['blank']
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        """
+        Export the totals as the 'owners' result section.
+
+        Returns:
+            Dictionary mapping each owner, and ``UNOWNED``, to totals shaped
+            like a 'languages' entry. A file with several owners counts fully
+            for each of them.
+        """
+        return {owner: self._owners[owner] for owner in sorted(self._owners)}
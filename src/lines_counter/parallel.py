@@ -0,0 +1,150 @@
+"""
+Execution backends for reading and classifying files in parallel.
+
+Workers only read and classify files (classifying in the worker itself, not
+under the read deadline of the ReadPolicy); the scan loop stays in the calling
+thread, which owns the cache, the checkpoint and the result order, so every
+backend produces the same result. Files are handed out in chunks to keep the
+per-task overhead of process pools low.
+
+On free-threaded CPython builds (3.13t and later, GIL disabled) threads run
+the classifier in parallel; with a GIL only processes do, so the 'auto'
+backend picks threads or processes accordingly.
+"""
+
+import os
+import sys
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from .readpolicy import ReadError, ReadPolicy
+
+
+BACKENDS = ('auto', 'serial', 'thread', 'process')
+
+# Files per task handed to a worker
+CHUNK_SIZE = 16
+
+# Chunks in flight per worker, bounding how far reading runs ahead of the scan loop
+CHUNKS_PER_WORKER = 4
+
+# (path, relative path, size) of a file to read
+FileTask = Tuple[Path, str, int]
+
+# (line counts or None, encoding, kind of a generated file or None), or a
+# ReadError if the file could not be read
+ReadResult = Union[Tuple[Optional[Dict[str, int]], Optional[str], Optional[str]], ReadError]
+
+
+def gil_enabled() -> bool:
+    """Whether the running interpreter has the GIL enabled."""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def resolve_backend(backend: str, workers: Optional[int]) -> Tuple[str, int]:
+    """
+    Decide which backend and how many workers a scan uses.
+
+    Args:
+        backend: One of ``BACKENDS``; 'auto' uses threads on free-threaded
+            builds, processes otherwise, and no pool for a single worker
+        workers: Number of workers, or None for the number of CPUs
+
+    Returns:
+        Tuple of ('serial', 'thread' or 'process', number of workers)
+
+    Raises:
+        ValueError: If the backend is unknown or workers is not positive
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be positive, got {workers}")
+    if backend == 'auto':
+        if workers == 1:
+            backend = 'serial'
+        else:
+            backend = 'process' if gil_enabled() else 'thread'
+    return backend, workers
+
+
+def _read_chunk(read_file: Callable, classify_file: Callable, analyzer, generated_filter,
+                read_policy: ReadPolicy, chunk: List[FileTask]) -> List[ReadResult]:
+    """Read and classify the files of one chunk; files that cannot be read give a ReadError."""
+    return [read_policy.call(read_file, analyzer, file_path, relative_path, size, generated_filter,
+                             process=partial(classify_file, analyzer, file_path))
+            for file_path, relative_path, size in chunk]
+
+
+# Per-process state of process pool workers, set by _init_worker
+_worker_reader: Optional[Callable[[List[FileTask]], List[ReadResult]]] = None
+
+
+def _init_worker(read_file: Callable, classify_file: Callable, analyzer, generated_filter,
+                 read_policy: ReadPolicy) -> None:
+    """Receive the analyzer configuration once per worker process."""
+    global _worker_reader
+    _worker_reader = partial(_read_chunk, read_file, classify_file, analyzer, generated_filter, read_policy)
+
+
+def _read_chunk_in_worker(chunk: List[FileTask]) -> List[ReadResult]:
+    """Task run by process pool workers."""
+    return _worker_reader(chunk)
+
+
+class ReaderPool:
+    """Pool of threads or processes reading and classifying chunks of files."""
+
+    def __init__(self, backend: str, workers: int, read_file: Callable, classify_file: Callable, analyzer,
+                 generated_filter=None, read_policy: Optional[ReadPolicy] = None):
+        """
+        Start the pool.
+
+        Args:
+            backend: 'thread' or 'process'
+            workers: Number of workers
+            read_file: Module-level function called as ``read_file(analyzer,
+                file_path, relative_path, size, generated_filter)``, under the
+                read deadline
+            classify_file: Module-level function called as
+                ``classify_file(analyzer, file_path, content)`` with what
+                ``read_file`` returned
+            analyzer: FileAnalyzer shared by (threads) or copied to (processes)
+                the workers
+            generated_filter: GeneratedFileFilter or None
+            read_policy: ReadPolicy applied by the workers to every file (default:
+                no deadline, retries of transient errors)
+        """
+        if read_policy is None:
+            read_policy = ReadPolicy()
+        self.workers = workers
+        self.window = workers * CHUNKS_PER_WORKER
+        if backend == 'thread':
+            self._executor: Executor = ThreadPoolExecutor(workers)
+            self._task = partial(_read_chunk, read_file, classify_file, analyzer, generated_filter, read_policy)
+        elif backend == 'process':
+            self._executor = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                                 initargs=(read_file, classify_file, analyzer, generated_filter,
+                                                           read_policy))
+            self._task = _read_chunk_in_worker
+        else:
+            raise ValueError(f"not a pool backend: {backend}")
+
+    def submit(self, chunk: List[FileTask]) -> Future:
+        """Queue a chunk; the future's result has one ReadResult per file."""
+        return self._executor.submit(self._task, chunk)
+
+    def close(self) -> None:
+        """Stop the workers once the queued chunks are done."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'ReaderPool':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
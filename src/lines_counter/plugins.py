@@ -0,0 +1,197 @@
+"""
+Language classifiers contributed by other packages.
+
+Some languages have comment rules that one ``COMMENT_PATTERNS`` entry cannot
+describe: several single-line markers, several kinds of block comments,
+nested template comments. Packages add classifiers for them under the
+``lines_counter.classifiers`` entry point group, for example in their
+``pyproject.toml``::
+
+    [project.entry-points."lines_counter.classifiers"]
+    jinja = "mypackage.lines:JinjaClassifier"
+
+The entry point names a Classifier subclass, or any callable returning a
+classifier. A subclass that does not implement ``count`` cannot be
+instantiated, so it is reported when the plugin is loaded. A classifier is
+called once per file with the whole content, not once per line, and takes
+precedence over the built-in patterns for its extensions.
+
+Classifiers are shared by the threads of a thread pool and sent once to each
+process of a process pool together with the FileAnalyzer, so they must be
+stateless and picklable (instances of module-level classes).
+"""
+
+import io
+import warnings
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+
+ENTRY_POINT_GROUP = 'lines_counter.classifiers'
+
+_COUNT_KEYS = ('total', 'code', 'comments', 'blank')
+
+
+class Classifier(ABC):
+    """Base class of language classifiers."""
+
+    # Language name reported for the files
+    language: str = ''
+    # File extensions handled, with the leading dot
+    extensions: Tuple[str, ...] = ()
+    # Changing it invalidates results of this classifier in scan caches
+    version: str = ''
+
+    @abstractmethod
+    def count(self, data: bytes) -> Dict[str, int]:
+        """
+        Classify the lines of one file.
+
+        Args:
+            data: Whole content of the file, UTF-8 encoded
+
+        Returns:
+            Dictionary with 'total', 'code', 'comments' and 'blank' line counts
+        """
+
+    @staticmethod
+    def split_lines(data: bytes) -> List[str]:
+        """Split content into lines the way the built-in classifier does (universal newlines)."""
+        return io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+
+
+class MarkerClassifier(Classifier):
+    """
+    Classifier for any number of single-line markers and block comment pairs.
+
+    A line is a comment if it starts with a single-line marker, opens or
+    closes a block comment, or lies within one. With ``nested`` block
+    comments of the same kind nest, as in many template languages.
+    """
+
+    def __init__(self, language: str, extensions: Sequence[str], single: Sequence[str] = (),
+                 blocks: Sequence[Tuple[str, str]] = (), nested: bool = False, version: str = ''):
+        """
+        Initialize the classifier.
+
+        Args:
+            language: Language name reported for the files
+            extensions: File extensions handled
+            single: Markers starting a comment that runs to the end of the line
+            blocks: (start, end) pairs of block comment delimiters
+            nested: Whether block comments nest
+            version: Cache-invalidating version of the rules
+        """
+        self.language = language
+        self.extensions = tuple(extensions)
+        self.single = tuple(single)
+        self.blocks = tuple(blocks)
+        self.nested = nested
+        self.version = version
+
+    def count(self, data: bytes) -> Dict[str, int]:
+        """Classify the lines of one file (see ``Classifier.count``)."""
+        lines = self.split_lines(data)
+        blank = comments = 0
+        # Block comment currently open and its nesting depth
+        open_block = None
+        depth = 0
+
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                blank += 1
+                continue
+
+            if open_block is not None:
+                start, end = open_block
+                if self.nested:
+                    depth += stripped.count(start) - stripped.count(end)
+                elif end in stripped:
+                    depth = 0
+                if depth <= 0:
+                    open_block = None
+                comments += 1
+                continue
+
+            for start, end in self.blocks:
+                if start in stripped:
+                    after = stripped[stripped.index(start) + len(start):]
+                    if self.nested:
+                        depth = 1 + after.count(start) - after.count(end)
+                    else:
+                        depth = 0 if end in after else 1
+                    if depth > 0:
+                        open_block = (start, end)
+                    comments += 1
+                    break
+            else:
+                if stripped.startswith(self.single):
+                    comments += 1
+
+        total = len(lines)
+        code = total - blank - comments
+        return {'total': total, 'code': code, 'comments': comments, 'blank': blank}
+
+
+def _entry_points() -> Sequence:
+    """Entry points of the classifier group."""
+    from importlib import metadata
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return entry_points.select(group=ENTRY_POINT_GROUP)
+    return entry_points.get(ENTRY_POINT_GROUP, ())
+
+
+def check_classifier(classifier) -> None:
+    """
+    Check that an object can serve as a classifier.
+
+    Raises:
+        TypeError: If it lacks a language, extensions or a count method
+    """
+    if not isinstance(getattr(classifier, 'language', None), str) or not classifier.language:
+        raise TypeError(f"{classifier!r} has no language name")
+    extensions = getattr(classifier, 'extensions', ())
+    if not extensions or not all(isinstance(ext, str) and ext.startswith('.') for ext in extensions):
+        raise TypeError(f"{classifier!r} needs extensions starting with '.'")
+    if not callable(getattr(classifier, 'count', None)):
+        raise TypeError(f"{classifier!r} has no count() method")
+
+
+def check_counts(classifier, counts: Dict[str, int]) -> Dict[str, int]:
+    """
+    Check the result of a classifier.
+
+    Raises:
+        ValueError: If a line count is missing
+    """
+    missing = [key for key in _COUNT_KEYS if key not in counts]
+    if missing:
+        raise ValueError(f"classifier for {classifier.language} returned no {', '.join(missing)} count")
+    return counts
+
+
+@lru_cache(maxsize=None)
+def installed_classifiers() -> Tuple[Classifier, ...]:
+    """
+    Load the classifiers registered under ``ENTRY_POINT_GROUP``.
+
+    Plugins that fail to load are skipped with a warning, so a broken plugin
+    does not break scans. The result is cached for the life of the process.
+
+    Returns:
+        Tuple of classifier instances, in entry point order
+    """
+    classifiers = []
+    for entry_point in _entry_points():
+        try:
+            classifier = entry_point.load()()
+            check_classifier(classifier)
+        except Exception as e:
+            warnings.warn(f"ignoring classifier plugin {entry_point.name!r}: {e}", RuntimeWarning)
+            continue
+        classifiers.append(classifier)
+    return tuple(classifiers)
@@ -0,0 +1,122 @@
+"""
+Progress reporting, scan limits and cooperative cancellation.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+
+class CancellationToken:
+    """Thread-safe flag used to ask a running scan to stop at the next file."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._event.is_set()
+
+
+class ScanLimits:
+    """Decides when a scan has to stop early."""
+
+    def __init__(
+        self,
+        time_budget: Optional[float] = None,
+        max_files: Optional[int] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        """
+        Initialize the limits; the time budget starts counting immediately.
+
+        Args:
+            time_budget: Maximum scan duration in seconds
+            max_files: Maximum number of files to analyze
+            cancel_token: Token that can cancel the scan from another thread
+        """
+        self.time_budget = time_budget
+        self.max_files = max_files
+        self.cancel_token = cancel_token
+        self.deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+    def stop_reason(self, files_done: int) -> Optional[str]:
+        """
+        Check whether the scan has to stop before analyzing another file.
+
+        Args:
+            files_done: Number of files analyzed so far
+
+        Returns:
+            'cancelled', 'time_budget' or 'max_files', or None to continue
+        """
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            return 'cancelled'
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return 'time_budget'
+        if self.max_files is not None and files_done >= self.max_files:
+            return 'max_files'
+        return None
+
+
+def _format_duration(seconds: float) -> str:
+    """Format a duration as H:MM:SS."""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressBar:
+    """Progress callback that renders a single-line bar with files/s and ETA."""
+
+    def __init__(self, stream: TextIO = None, width: int = 30, interval: float = 0.1):
+        """
+        Initialize the progress bar.
+
+        Args:
+            stream: Text stream to draw on (default: stderr)
+            width: Width of the bar in characters
+            interval: Minimum number of seconds between redraws
+        """
+        self.stream = stream or sys.stderr
+        self.width = width
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last_draw = 0.0
+        self._last_state = None
+        self._finished = False
+
+    def __call__(self, done: int, total: int, path: Optional[Path] = None) -> None:
+        """Report that ``done`` of ``total`` files have been analyzed."""
+        now = time.monotonic()
+        self._last_state = (done, total)
+        if done < total and now - self._last_draw < self.interval:
+            return
+        self._last_draw = now
+
+        elapsed = max(now - self.started, 1e-9)
+        rate = done / elapsed
+        filled = self.width * done // total if total else self.width
+        bar = '#' * filled + ' ' * (self.width - filled)
+        eta = _format_duration((total - done) / rate) if rate > 0 else '?'
+        self.stream.write(f"\r[{bar}] {done}/{total} files  {rate:.1f} files/s  ETA {eta}")
+        if done >= total:
+            self.stream.write('\n')
+            self._finished = True
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Draw the final state and finish the line if the scan stopped early."""
+        if not self._finished:
+            if self._last_state is not None:
+                self._last_draw = 0.0
+                self(*self._last_state)
+            self.stream.write('\n')
+            self.stream.flush()
+            self._finished = True
@@ -0,0 +1,211 @@
+"""
+Deadlines, retries and error classification for file reads.
+
+A read that fails is not silently dropped: it becomes a ReadError with one of
+the ``REASONS`` and ends up in the 'errors' section of the result. Transient
+errors (EIO, EAGAIN, stale NFS handles, ...) are retried a bounded number of
+times with exponential backoff.
+
+A blocking ``read(2)`` cannot be interrupted from Python, so with a deadline
+each read runs in a helper daemon thread of the calling thread (the scan
+thread, or a pool worker) which waits for it at most ``timeout`` seconds. A
+helper stuck in a hung read is abandoned and replaced; it exits on its own if
+the read ever returns. The rest of the scan is never held up by it. Only the
+read is timed: the content is classified afterwards in the calling thread, so
+a large file that is slow to classify is not reported as a timeout.
+"""
+
+import errno
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+
+# Reasons reported for files that could not be read
+REASONS = ('permission', 'timeout', 'decode', 'vanished', 'io', 'error')
+
+# Further attempts after a transient error
+DEFAULT_RETRIES = 2
+
+# errno values worth another attempt
+TRANSIENT_ERRNOS = frozenset(
+    getattr(errno, name) for name in ('EIO', 'EAGAIN', 'EBUSY', 'EINTR', 'ESTALE')
+    if hasattr(errno, name)
+)
+
+_VANISHED_ERRNOS = frozenset(
+    getattr(errno, name) for name in ('ENOENT', 'ENOTDIR', 'ESTALE') if hasattr(errno, name)
+)
+
+
+class ReadTimeout(TimeoutError):
+    """A read did not finish before its deadline."""
+
+
+class ReadError(NamedTuple):
+    """A file that could not be read, after all attempts."""
+
+    reason: str
+    detail: str
+    attempts: int
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Map an exception raised while reading a file to one of ``REASONS``.
+
+    Args:
+        error: The exception
+
+    Returns:
+        'permission', 'timeout', 'decode', 'vanished', 'io' or 'error'
+    """
+    if isinstance(error, UnicodeError):
+        return 'decode'
+    if isinstance(error, TimeoutError):
+        return 'timeout'
+    if isinstance(error, PermissionError):
+        return 'permission'
+    if isinstance(error, OSError):
+        return 'vanished' if error.errno in _VANISHED_ERRNOS else 'io'
+    return 'error'
+
+
+def describe_error(error: BaseException) -> str:
+    """Short description of an exception for an error record."""
+    return f"{type(error).__name__}: {error}"
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Whether another attempt might succeed; timed-out reads are never retried."""
+    return isinstance(error, OSError) and not isinstance(error, TimeoutError) and error.errno in TRANSIENT_ERRNOS
+
+
+class _Helper:
+    """Daemon thread running the reads of one calling thread."""
+
+    def __init__(self):
+        self.requests: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name='lines-counter-read', daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            call, outcome, done = request
+            try:
+                outcome.append((True, call()))
+            except BaseException as e:
+                outcome.append((False, e))
+            done.set()
+
+    def call(self, call: Callable[[], Any], timeout: float) -> Any:
+        """Run ``call`` in the helper thread; raises ReadTimeout if it takes too long."""
+        outcome = []
+        done = threading.Event()
+        self.requests.put((call, outcome, done))
+        if not done.wait(timeout):
+            raise ReadTimeout(f"read did not finish within {timeout:g}s")
+        ok, value = outcome[0]
+        if ok:
+            return value
+        raise value
+
+    def stop(self) -> None:
+        """Let the thread exit once its current read, if any, returns."""
+        self.requests.put(None)
+
+
+class ReadPolicy:
+    """Per-file read deadline and retries of transient errors."""
+
+    def __init__(self, timeout: Optional[float] = None, retries: int = DEFAULT_RETRIES, backoff: float = 0.05):
+        """
+        Initialize the policy.
+
+        Args:
+            timeout: Seconds one attempt to read a file may take, or None to
+                wait as long as it takes
+            retries: Further attempts after a transient error
+            backoff: Seconds before the first retry, doubled for every further one
+
+        Raises:
+            ValueError: If timeout is not positive or retries is negative
+        """
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"timeout must be positive, got {timeout}")
+        if retries < 0:
+            raise ValueError(f"retries must not be negative, got {retries}")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._helpers: Dict[int, _Helper] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict:
+        # Helper threads stay in the process that started them
+        return {'timeout': self.timeout, 'retries': self.retries, 'backoff': self.backoff}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(**state)
+
+    def _attempt(self, call: Callable[[], Any]) -> Any:
+        """Run one attempt, in a helper thread if there is a deadline."""
+        if self.timeout is None:
+            return call()
+        ident = threading.get_ident()
+        with self._lock:
+            helper = self._helpers.get(ident)
+            if helper is None:
+                helper = self._helpers[ident] = _Helper()
+        try:
+            return helper.call(call, self.timeout)
+        except ReadTimeout:
+            # The helper is stuck in the read; the next attempt gets a new one
+            with self._lock:
+                del self._helpers[ident]
+            helper.stop()
+            raise
+
+    def call(self, read: Callable[..., Any], *args, process: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Call ``read(*args)`` under the policy.
+
+        Args:
+            read: Function reading one file
+            *args: Its arguments
+            process: Function applied to what ``read`` returns, in the calling
+                thread and without a deadline, e.g. to classify the content
+
+        Returns:
+            What ``read`` (or ``process``) returns, or a ReadError if every
+            attempt failed or ``process`` raised an exception
+        """
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                content = self._attempt(lambda: read(*args))
+                break
+            except Exception as e:
+                if attempts <= self.retries and _is_transient(e):
+                    time.sleep(self.backoff * 2 ** (attempts - 1))
+                    continue
+                return ReadError(classify_error(e), describe_error(e), attempts)
+        if process is None:
+            return content
+        try:
+            return process(content)
+        except Exception as e:
+            return ReadError(classify_error(e), describe_error(e), attempts)
+
+    def close(self) -> None:
+        """Stop the helper threads; ones stuck in a read exit when it returns."""
+        with self._lock:
+            helpers = list(self._helpers.values())
+            self._helpers.clear()
+        for helper in helpers:
+            helper.stop()
@@ -0,0 +1,334 @@
+"""
+SQLite output of analysis results and queries against it.
+
+A result database has one row per counted file, per language and per
+directory (with totals for everything below it), indexed by path, language
+and line counts, so questions such as "Go files over 5k lines under
+services/" are answered with an index range scan instead of loading a JSON
+document. Result sections without a table of their own ('summary', 'skipped',
+'walk', ...) are kept as JSON in the 'meta' table.
+
+Paths are stored with '/' separators and relative to the scanned root; the
+root itself is the directory '.'.
+"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+# File rows inserted per transaction
+BATCH_SIZE = 1000
+
+_METRIC_COLUMNS = ('bytes', 'longest_line', 'average_line_length', 'max_indent', 'trailing_whitespace_lines')
+_TOTAL_COLUMNS = ('files', 'total_lines', 'code_lines', 'comment_lines', 'blank_lines')
+
+_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE files (
+    path TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    language TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    code INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    blank INTEGER NOT NULL,
+    bytes INTEGER,
+    longest_line INTEGER,
+    average_line_length REAL,
+    max_indent INTEGER,
+    trailing_whitespace_lines INTEGER
+);
+CREATE TABLE languages (
+    language TEXT PRIMARY KEY,
+    files INTEGER NOT NULL,
+    total_lines INTEGER NOT NULL,
+    code_lines INTEGER NOT NULL,
+    comment_lines INTEGER NOT NULL,
+    blank_lines INTEGER NOT NULL
+);
+CREATE TABLE directories (
+    path TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    files INTEGER NOT NULL,
+    total_lines INTEGER NOT NULL,
+    code_lines INTEGER NOT NULL,
+    comment_lines INTEGER NOT NULL,
+    blank_lines INTEGER NOT NULL
+);
+"""
+
+# Created after the bulk load, which is faster than maintaining them row by row
+_INDEXES = """
+CREATE UNIQUE INDEX files_path ON files (path);
+CREATE INDEX files_directory ON files (directory);
+CREATE INDEX files_language_total ON files (language, total);
+CREATE INDEX files_language_code ON files (language, code);
+CREATE INDEX files_total ON files (total);
+CREATE INDEX files_code ON files (code);
+CREATE INDEX directories_depth ON directories (depth);
+"""
+
+
+def _prefix_range(under: str) -> Dict[str, str]:
+    """Bounds of the paths below a directory, usable by the path index."""
+    prefix = under.strip('/') + '/'
+    # '0' is the character after '/', so [prefix, end) holds exactly the paths under it
+    return {'prefix': prefix, 'prefix_end': prefix[:-1] + '0'}
+
+
+class SqliteWriter:
+    """Writes the records of a scan to a new result database as they are produced."""
+
+    def __init__(self, path: Path, batch_size: int = BATCH_SIZE):
+        """
+        Create the database in a temporary file next to ``path``.
+
+        An existing file at ``path`` is only replaced by ``finish``, so it
+        survives a scan that fails or is cancelled.
+
+        Args:
+            path: Database file path
+            batch_size: File rows inserted per transaction
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+        self._conn = sqlite3.connect(self._tmp_path)
+        # A fresh output file is rewritten from scratch on failure, so durability
+        # of every transaction is not needed
+        self._conn.execute('PRAGMA journal_mode = OFF')
+        self._conn.execute('PRAGMA synchronous = OFF')
+        self._conn.executescript(_SCHEMA)
+        self._rows: List[tuple] = []
+        self._directories: Dict[str, List[int]] = {}
+
+    def add(self, record: Dict) -> None:
+        """
+        Add the record of one file; skip and generated records are ignored.
+
+        Args:
+            record: Per-file record as found in a result's 'files' section
+        """
+        if 'language' not in record:
+            return
+        path = record['path'].replace(os.sep, '/')
+        directory = path.rpartition('/')[0] or '.'
+        lines = record['lines']
+        metrics = record.get('metrics', {})
+        self._rows.append((
+            path, directory, record['language'], record['encoding'],
+            lines['total'], lines['code'], lines['comments'], lines['blank'],
+            *(metrics.get(key) for key in _METRIC_COLUMNS)
+        ))
+
+        # Totals of the file's own directory; ancestors are added up in finish()
+        totals = self._directories.get(directory)
+        if totals is None:
+            self._directories[directory] = [1, lines['total'], lines['code'], lines['comments'], lines['blank']]
+        else:
+            totals[0] += 1
+            totals[1] += lines['total']
+            totals[2] += lines['code']
+            totals[3] += lines['comments']
+            totals[4] += lines['blank']
+
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Insert the buffered file rows in one transaction."""
+        placeholders = ', '.join('?' * (8 + len(_METRIC_COLUMNS)))
+        with self._conn:
+            self._conn.executemany(f'INSERT INTO files VALUES ({placeholders})', self._rows)
+        self._rows.clear()
+
+    def finish(self, results: Dict) -> None:
+        """
+        Write the remaining rows, the per-language and per-directory totals and
+        the other result sections, build the indexes, close the database and
+        move it into place.
+
+        Args:
+            results: Result of the scan whose records were added
+        """
+        self._flush()
+        directories: Dict[str, List[int]] = {}
+        for directory, counts in self._directories.items():
+            ancestor = directory
+            while True:
+                totals = directories.setdefault(ancestor, [0, 0, 0, 0, 0])
+                for slot, count in enumerate(counts):
+                    totals[slot] += count
+                if ancestor == '.':
+                    break
+                ancestor = ancestor.rpartition('/')[0] or '.'
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO languages VALUES (?, ?, ?, ?, ?, ?)',
+                [(language, *(stats[key] for key in _TOTAL_COLUMNS))
+                 for language, stats in results['languages'].items()]
+            )
+            self._conn.executemany(
+                'INSERT INTO directories VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(path, 0 if path == '.' else path.count('/') + 1, *totals)
+                 for path, totals in directories.items()]
+            )
+            self._conn.executemany(
+                'INSERT INTO meta VALUES (?, ?)',
+                [(key, json.dumps(value, ensure_ascii=False))
+                 for key, value in results.items() if key not in ('files', 'languages')]
+            )
+            self._conn.executescript(_INDEXES)
+        self._conn.execute('ANALYZE')
+        self._conn.close()
+        os.replace(self._tmp_path, self.path)
+
+    def close(self) -> None:
+        """Discard the unfinished database, e.g. after a failed scan, keeping any previous one."""
+        self._conn.close()
+        if self._tmp_path.exists():
+            self._tmp_path.unlink()
+
+
+def write_results_to_sqlite(results: Dict, output_path: Path) -> None:
+    """
+    Save analysis results to a result database.
+
+    Args:
+        results: Analysis results dictionary
+        output_path: Path to save the database to
+    """
+    writer = SqliteWriter(output_path)
+    for record in results['files']:
+        writer.add(record)
+    writer.finish(results)
+
+
+def open_results(path: Path) -> sqlite3.Connection:
+    """
+    Open a result database read-only.
+
+    Args:
+        path: Database file path
+
+    Returns:
+        Connection whose rows can be turned into dictionaries
+
+    Raises:
+        FileNotFoundError: If the database does not exist
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"result database not found: {path}")
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _files_query(language: Optional[str], under: Optional[str], min_lines: Optional[int],
+                 limit: Optional[int], **_) -> tuple:
+    """Files filtered by language, directory and size, largest first."""
+    conditions, params = [], {}
+    if language is not None:
+        conditions.append('language = :language')
+        params['language'] = language
+    if under:
+        conditions.append('path >= :prefix AND path < :prefix_end')
+        params.update(_prefix_range(under))
+    if min_lines is not None:
+        conditions.append('total >= :min_lines')
+        params['min_lines'] = min_lines
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    params['limit'] = -1 if limit is None else limit
+    return (f'SELECT path, language, encoding, total, code, comments, blank FROM files {where} '
+            f'ORDER BY total DESC, path LIMIT :limit', params)
+
+
+def _directories_query(under: Optional[str], depth: Optional[int], limit: Optional[int], **_) -> tuple:
+    """Directory totals with their comment ratio, in path order."""
+    conditions, params = [], {}
+    if under:
+        conditions.append('(path = :under OR (path >= :prefix AND path < :prefix_end))')
+        params.update(_prefix_range(under), under=under.strip('/'))
+    if depth is not None:
+        conditions.append('depth <= :depth')
+        params['depth'] = depth
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    params['limit'] = -1 if limit is None else limit
+    return ('SELECT path, depth, files, total_lines, code_lines, comment_lines, blank_lines, '
+            'ROUND(CAST(comment_lines AS REAL) / MAX(code_lines + comment_lines, 1), 4) AS comment_ratio '
+            f'FROM directories {where} ORDER BY path LIMIT :limit', params)
+
+
+def _languages_query(limit: Optional[int], **_) -> tuple:
+    """Language totals, most code first."""
+    return ('SELECT * FROM languages ORDER BY code_lines DESC, language LIMIT :limit',
+            {'limit': -1 if limit is None else limit})
+
+
+def _summary_query(**_) -> tuple:
+    """The 'summary' section of the result."""
+    return ("SELECT key, value FROM meta WHERE key = 'summary'", {})
+
+
+# Named queries of the ``query`` command; each builds (sql, parameters) from the options
+CANNED_QUERIES = {
+    'summary': _summary_query,
+    'languages': _languages_query,
+    'files': _files_query,
+    'directories': _directories_query,
+}
+
+
+def run_query(conn: sqlite3.Connection, name: str, language: Optional[str] = None,
+              under: Optional[str] = None, min_lines: Optional[int] = None,
+              depth: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Run one of the ``CANNED_QUERIES``.
+
+    Args:
+        conn: Connection returned by ``open_results``
+        name: Query name
+        language: Only files of this language ('files')
+        under: Only files or directories below this directory ('files', 'directories')
+        min_lines: Only files with at least this many lines ('files')
+        depth: Only directories up to this depth ('directories')
+        limit: Maximum number of rows
+
+    Returns:
+        List of rows as dictionaries; 'summary' returns one row with the summary
+
+    Raises:
+        ValueError: If the query name is unknown
+    """
+    if name not in CANNED_QUERIES:
+        raise ValueError(f"unknown query: {name}")
+    sql, params = CANNED_QUERIES[name](language=language, under=under, min_lines=min_lines,
+                                       depth=depth, limit=limit)
+    rows = run_sql(conn, sql, params)
+    if name == 'summary':
+        return [json.loads(row['value']) for row in rows]
+    return rows
+
+
+def run_sql(conn: sqlite3.Connection, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Run an ad-hoc query.
+
+    Args:
+        conn: Connection returned by ``open_results`` (read-only)
+        sql: SQL statement
+        params: Named parameters of the statement
+
+    Returns:
+        List of rows as dictionaries
+    """
+    return [dict(row) for row in conn.execute(sql, params or {})]
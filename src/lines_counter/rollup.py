@@ -0,0 +1,106 @@
+"""
+Per-directory hierarchical rollups of line counts.
+"""
+
+from pathlib import PurePath
+from typing import Dict, List, Optional
+
+
+# Order of the values stored for each directory
+ROLLUP_COLUMNS = ['files', 'total_lines', 'code_lines', 'comment_lines', 'blank_lines']
+
+# Key of the directory being analyzed
+ROOT = '.'
+
+
+def _directory_key(parts) -> str:
+    """Join directory parts into a rollup key using forward slashes."""
+    return '/'.join(parts) if parts else ROOT
+
+
+class DirectoryRollup:
+    """Accumulates line counts for every directory up to a given depth as files finish."""
+
+    def __init__(self, depth: int):
+        """
+        Initialize the rollup.
+
+        Args:
+            depth: Number of directory levels below the root to aggregate
+                (0 only aggregates the root itself)
+        """
+        if depth < 0:
+            raise ValueError("rollup depth must not be negative")
+        self.depth = depth
+        self._directories: Dict[str, List[int]] = {}
+
+    def add(self, relative_path: str, lines: Dict[str, int]) -> None:
+        """
+        Add one file's counts to all of its ancestor directories.
+
+        Args:
+            relative_path: File path relative to the analyzed directory
+            lines: Line counts of the file
+        """
+        parts = PurePath(relative_path).parts[:-1]
+        values = (1, lines['total'], lines['code'], lines['comments'], lines['blank'])
+        for level in range(min(self.depth, len(parts)) + 1):
+            key = _directory_key(parts[:level])
+            totals = self._directories.get(key)
+            if totals is None:
+                self._directories[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    totals[i] += value
+
+    def to_dict(self) -> Dict:
+        """
+        Export the rollup as the compact 'tree' result section.
+
+        Returns:
+            Dictionary with 'depth', 'columns' and 'directories', where each
+            directory maps to a list of values in ``ROLLUP_COLUMNS`` order
+        """
+        return {
+            'depth': self.depth,
+            'columns': list(ROLLUP_COLUMNS),
+            'directories': {key: self._directories[key] for key in sorted(self._directories)}
+        }
+
+
+def get_directory_totals(results: Dict, directory: str) -> Optional[Dict[str, int]]:
+    """
+    Get the totals of all files under a directory.
+
+    Directories covered by the 'tree' section are answered with a single
+    lookup; deeper directories fall back to summing the 'files' entries.
+
+    Args:
+        results: Analysis results dictionary
+        directory: Directory relative to the analyzed root, e.g. 'services/payments'
+
+    Returns:
+        Dictionary with 'files', 'total_lines', 'code_lines', 'comment_lines' and
+        'blank_lines', or None if no file lives under the directory
+    """
+    parts = PurePath(directory).parts
+    if parts == ('.',):
+        parts = ()
+    key = _directory_key(parts)
+
+    tree = results.get('tree')
+    if tree is not None and len(parts) <= tree['depth']:
+        values = tree['directories'].get(key)
+        if values is None:
+            return None
+        return dict(zip(tree['columns'], values))
+
+    rollup = DirectoryRollup(len(parts))
+    for file_result in results.get('files', []):
+        file_parts = PurePath(file_result['path']).parts
+        if len(file_parts) > len(parts) and file_parts[:len(parts)] == parts:
+            rollup.add(file_result['path'], file_result['lines'])
+    values = rollup.to_dict()['directories'].get(key)
+    if values is None:
+        return None
+    return dict(zip(ROLLUP_COLUMNS, values))
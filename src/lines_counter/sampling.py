@@ -0,0 +1,200 @@
+"""
+Stratified sampling estimates of line counts.
+
+Files are enumerated with their sizes, grouped into strata by language and
+size bucket, and only a random sample of each stratum is analyzed. Totals
+are extrapolated per stratum with a ratio estimator that uses file size as
+the auxiliary variable (lines are roughly proportional to bytes), and
+combined into estimates with normal-approximation confidence intervals.
+"""
+
+import math
+import random
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Upper bounds (exclusive) of the size buckets in bytes; larger files fall in a last bucket
+SIZE_BUCKETS = (1024, 8 * 1024, 64 * 1024, 512 * 1024)
+
+# Every stratum is sampled at least this often so its variance can be estimated
+MIN_STRATUM_SAMPLE = 2
+
+# Estimated metrics: (summary key, language key, per-file line count key)
+_METRICS = (
+    ('total_files', 'files', None),
+    ('total_lines', 'total_lines', 'total'),
+    ('code_lines', 'code_lines', 'code'),
+    ('comment_lines', 'comment_lines', 'comments'),
+    ('blank_lines', 'blank_lines', 'blank'),
+)
+
+
+def size_bucket(size: int) -> int:
+    """Index of the size bucket of a file."""
+    for index, bound in enumerate(SIZE_BUCKETS):
+        if size < bound:
+            return index
+    return len(SIZE_BUCKETS)
+
+
+class _Stratum:
+    """Population and sample of one (language, size bucket) stratum."""
+
+    def __init__(self):
+        self.population: List[Tuple[int, Any]] = []
+        self.observations: List[Tuple[int, Dict[str, int]]] = []
+
+    def estimate(self, key: Optional[str]) -> Tuple[float, float]:
+        """
+        Estimate the stratum total of one metric.
+
+        Args:
+            key: Line count key, or None to estimate the number of counted files
+
+        Returns:
+            Tuple of (estimated total, variance of the estimate)
+        """
+        population = len(self.population)
+        sampled = len(self.observations)
+        if sampled == 0:
+            return 0.0, 0.0
+
+        sizes = [size for size, _ in self.observations]
+        values = [(lines[key] if key is not None else 1) if lines is not None else 0
+                  for _, lines in self.observations]
+        if key is not None and sum(sizes) > 0:
+            # Ratio estimator: lines per byte in the sample times bytes in the stratum
+            ratio = sum(values) / sum(sizes)
+            total = ratio * sum(size for size, _ in self.population)
+            residuals = [value - ratio * size for value, size in zip(values, sizes)]
+        else:
+            mean = sum(values) / sampled
+            total = mean * population
+            residuals = [value - mean for value in values]
+
+        if sampled >= population or sampled < 2:
+            return total, 0.0
+        residual_variance = sum(r * r for r in residuals) / (sampled - 1)
+        finite_population = 1 - sampled / population
+        return total, population * population * finite_population * residual_variance / sampled
+
+
+class StratifiedSample:
+    """Chooses a stratified random sample of files and extrapolates totals from it."""
+
+    def __init__(self, fraction: float, confidence: float = 0.95, seed: Optional[int] = None):
+        """
+        Initialize the sample plan.
+
+        Args:
+            fraction: Fraction of the files of each stratum to analyze, in (0, 1]
+            confidence: Confidence level of the reported intervals
+            seed: Seed for reproducible samples
+
+        Raises:
+            ValueError: If fraction or confidence is out of range
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(f"sample fraction must be in (0, 1], got {fraction}")
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+        self.fraction = fraction
+        self.confidence = confidence
+        self._random = random.Random(seed)
+        self._strata: Dict[Tuple[str, int], _Stratum] = {}
+
+    def reset(self) -> None:
+        """Forget the population and observations of a previous scan, keeping the random state."""
+        self._strata = {}
+
+    def add(self, language: str, size: int, item: Any) -> None:
+        """
+        Add an enumerated file to the population.
+
+        Args:
+            language: Language of the file
+            size: File size in bytes
+            item: Caller's handle for the file, returned by ``chosen()``
+        """
+        key = (language, size_bucket(size))
+        self._strata.setdefault(key, _Stratum()).population.append((size, item))
+
+    def chosen(self) -> List[Tuple[Tuple[str, int], int, Any]]:
+        """
+        Draw the sample.
+
+        Returns:
+            List of (stratum key, size, item) to analyze and pass to ``observe()``
+        """
+        sample = []
+        for key, stratum in sorted(self._strata.items()):
+            population = len(stratum.population)
+            wanted = min(population, max(MIN_STRATUM_SAMPLE, math.ceil(self.fraction * population)))
+            for size, item in self._random.sample(stratum.population, wanted):
+                sample.append((key, size, item))
+        return sample
+
+    def observe(self, key: Tuple[str, int], size: int, lines: Optional[Dict[str, int]]) -> None:
+        """
+        Record the result of a sampled file.
+
+        Args:
+            key: Stratum key returned by ``chosen()``
+            size: File size returned by ``chosen()``
+            lines: Line counts, or None for a file that was not counted (e.g. binary)
+        """
+        self._strata[key].observations.append((size, lines))
+
+    def estimate(self) -> Dict:
+        """
+        Extrapolate totals from the observed sample.
+
+        Returns:
+            Dictionary with 'summary' and 'languages' in the shape of an analysis
+            result (rounded estimates), and 'estimate' with the sample sizes and
+            the confidence interval ``[low, high]`` of every estimated value
+        """
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+
+        def interval(total: float, variance: float) -> List[int]:
+            margin = z * math.sqrt(variance)
+            return [max(0, math.floor(total - margin)), math.ceil(total + margin)]
+
+        summary, summary_intervals = {}, {}
+        languages: Dict[str, Dict[str, int]] = {}
+        language_intervals: Dict[str, Dict[str, List[int]]] = {}
+        for summary_key, language_key, line_key in _METRICS:
+            grand_total = grand_variance = 0.0
+            per_language: Dict[str, List[float]] = {}
+            for (language, _), stratum in self._strata.items():
+                total, variance = stratum.estimate(line_key)
+                grand_total += total
+                grand_variance += variance
+                accumulated = per_language.setdefault(language, [0.0, 0.0])
+                accumulated[0] += total
+                accumulated[1] += variance
+            summary[summary_key] = round(grand_total)
+            summary_intervals[summary_key] = interval(grand_total, grand_variance)
+            for language, (total, variance) in per_language.items():
+                languages.setdefault(language, {})[language_key] = round(total)
+                language_intervals.setdefault(language, {})[language_key] = interval(total, variance)
+
+        # Languages whose sampled files were all skipped have no estimated files
+        for language in [name for name, stats in languages.items() if stats['files'] == 0]:
+            del languages[language]
+            del language_intervals[language]
+
+        return {
+            'summary': summary,
+            'languages': languages,
+            'estimate': {
+                'fraction': self.fraction,
+                'confidence': self.confidence,
+                'files_enumerated': sum(len(s.population) for s in self._strata.values()),
+                'files_sampled': sum(len(s.observations) for s in self._strata.values()),
+                'strata': len(self._strata),
+                'summary': summary_intervals,
+                'languages': language_intervals,
+            },
+        }
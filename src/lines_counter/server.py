@@ -0,0 +1,337 @@
+"""
+Resident analysis server and its client.
+
+The server keeps a ScanCache warm across requests for each of the
+``MAX_ROOTS`` most recently scanned roots and coalesces concurrent identical
+requests into a single scan; scans of different roots run concurrently. It
+speaks JSON over HTTP, without authentication, so it only listens on the
+loopback interface unless the directories clients may scan are restricted
+with ``allowed_roots``. Results have the same shape as ``analyze_directory``.
+"""
+
+import ipaddress
+import json
+import os
+import socket
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .cache import ScanCache
+from .core import analyze_directory
+
+
+# Options a client may forward to ``analyze_directory``
+FORWARDED_OPTIONS = (
+    'include_extensions',
+    'exclude_patterns',
+    'recursive',
+    'follow_symlinks',
+    'one_file_system',
+    'dedup_inodes',
+    'rollup_depth',
+    'generated',
+    'extra_metrics',
+)
+
+# Options holding sets, sent as sorted lists
+_SET_OPTIONS = ('include_extensions', 'exclude_patterns')
+
+ENV_VAR = 'LINES_COUNTER_SERVER'
+
+# Roots whose caches are kept; the least recently scanned are dropped beyond this
+MAX_ROOTS = 64
+
+
+def default_state_file() -> Path:
+    """Location where a running server advertises its address."""
+    base = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'lines-counter' / 'server.json'
+
+
+def _normalise_request(path: str, options: Dict) -> Tuple[str, Dict]:
+    """Validate a request and turn it into a canonical (path, options) pair."""
+    unknown = set(options) - set(FORWARDED_OPTIONS)
+    if unknown:
+        raise ValueError(f"unsupported options: {', '.join(sorted(unknown))}")
+    normalised = {}
+    for key, value in options.items():
+        if key in _SET_OPTIONS and value is not None:
+            value = sorted(value)
+        normalised[key] = value
+    return os.path.abspath(path), normalised
+
+
+def is_loopback(host: str) -> bool:
+    """Whether every address a host name or address resolves to is a loopback address."""
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None)}
+    except (OSError, UnicodeError):
+        return False
+    return bool(addresses) and all(ipaddress.ip_address(address.split('%')[0]).is_loopback
+                                   for address in addresses)
+
+
+class AnalysisServer:
+    """Runs scans for clients, sharing caches and coalescing identical requests."""
+
+    def __init__(self, allowed_roots: Optional[Iterable[Path]] = None, max_roots: int = MAX_ROOTS):
+        """
+        Initialize the server state.
+
+        Args:
+            allowed_roots: Directories clients may scan, with everything below
+                them, or None to allow any directory; required to listen on
+                other interfaces than loopback
+            max_roots: Number of root directories whose caches are kept
+        """
+        self.allowed_roots = None
+        if allowed_roots is not None:
+            self.allowed_roots = tuple(os.path.realpath(root) for root in allowed_roots)
+        self.max_roots = max_roots
+        # Scans of the same root are serialised because they share its cache
+        self._roots: 'OrderedDict[str, Tuple[threading.Lock, ScanCache]]' = OrderedDict()
+        self._inflight_lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.stats = {'requests': 0, 'scans': 0, 'coalesced': 0}
+
+    def cache_for(self, path: str) -> ScanCache:
+        """In-memory ScanCache kept for a root directory."""
+        return self._root_state(os.path.abspath(path))[1]
+
+    def _root_state(self, path: str) -> Tuple[threading.Lock, ScanCache]:
+        """Lock and cache of a normalised root path, created on first use."""
+        with self._inflight_lock:
+            state = self._roots.get(path)
+            if state is not None:
+                self._roots.move_to_end(path)
+                return state
+            state = self._roots[path] = (threading.Lock(), ScanCache())
+            if len(self._roots) > self.max_roots:
+                self._roots.popitem(last=False)
+            return state
+
+    def is_allowed(self, path: str) -> bool:
+        """Whether clients may scan a directory."""
+        if self.allowed_roots is None:
+            return True
+        path = os.path.realpath(path)
+        return any(os.path.commonpath([root, path]) == root for root in self.allowed_roots)
+
+    def analyze(self, path: str, options: Optional[Dict] = None) -> Dict:
+        """
+        Analyze a directory, joining an identical scan that is already running.
+
+        Args:
+            path: Directory to analyze
+            options: Keyword arguments for ``analyze_directory`` (see ``FORWARDED_OPTIONS``)
+
+        Returns:
+            Dictionary with analysis results
+
+        Raises:
+            ValueError: If the path is not a directory or an option is not supported
+            PermissionError: If the path is outside the allowed roots
+        """
+        path, options = _normalise_request(path, options or {})
+        if not self.is_allowed(path):
+            raise PermissionError(f"not under an allowed root: {path}")
+        if not os.path.isdir(path):
+            raise ValueError(f"not a directory: {path}")
+        key = json.dumps([path, options], sort_keys=True)
+
+        with self._inflight_lock:
+            self.stats['requests'] += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats['coalesced'] += 1
+
+        if owner:
+            try:
+                future.set_result(self._scan(path, options))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[key]
+        return future.result()
+
+    def _scan(self, path: str, options: Dict) -> Dict:
+        """Run one scan, after any other scan of the same root."""
+        kwargs = dict(options)
+        for key in _SET_OPTIONS:
+            if kwargs.get(key) is not None:
+                kwargs[key] = set(kwargs[key])
+        lock, cache = self._root_state(path)
+        with lock:
+            with self._inflight_lock:
+                self.stats['scans'] += 1
+            results = analyze_directory(Path(path), cache=cache, **kwargs)
+        results.pop('cache', None)
+        return results
+
+    def make_http_server(self, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+        """
+        Create the HTTP front end.
+
+        ``GET /health`` reports liveness and statistics; ``POST /analyze`` takes
+        ``{"path": ..., "options": {...}}`` and returns the analysis results.
+
+        Args:
+            host: Interface to bind to
+            port: Port to listen on (0 picks a free port)
+
+        Returns:
+            Server ready for ``serve_forever()``
+
+        Raises:
+            ValueError: If the host is not a loopback address and no allowed
+                roots are set
+        """
+        if self.allowed_roots is None and not is_loopback(host):
+            raise ValueError(f"refusing to serve on non-loopback host {host} without allowed roots")
+        server_state = self
+
+        class AnalysisHandler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path != '/health':
+                    self.send_error(404)
+                    return
+                self._send_json(200, {'status': 'ok', 'pid': os.getpid(), **server_state.stats})
+
+            def do_POST(self):
+                if self.path != '/analyze':
+                    self.send_error(404)
+                    return
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                    request = json.loads(self.rfile.read(length))
+                    results = server_state.analyze(request['path'], request.get('options'))
+                except PermissionError as e:
+                    self._send_json(403, {'error': str(e)})
+                    return
+                except (KeyError, ValueError, TypeError) as e:
+                    self._send_json(400, {'error': str(e)})
+                    return
+                except Exception as e:
+                    self._send_json(500, {'error': str(e)})
+                    return
+                self._send_json(200, results)
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((host, port), AnalysisHandler)
+
+
+def write_state_file(state_file: Path, host: str, port: int) -> None:
+    """Advertise a running server so clients can find it."""
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'host': host, 'port': port, 'pid': os.getpid()}, f)
+    os.replace(tmp_path, state_file)
+
+
+class AnalysisClient:
+    """Client for a running AnalysisServer."""
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = None):
+        """
+        Initialize the client.
+
+        Args:
+            host: Server host
+            port: Server port
+            timeout: Socket timeout in seconds for analysis requests
+        """
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def ping(self, timeout: float = 0.5) -> bool:
+        """Check whether the server is answering."""
+        try:
+            with urllib.request.urlopen(self.base_url + '/health', timeout=timeout) as response:
+                return json.load(response).get('status') == 'ok'
+        except (OSError, ValueError):
+            return False
+
+    def analyze(self, path: Path, **options) -> Dict:
+        """
+        Analyze a directory on the server.
+
+        Args:
+            path: Directory to analyze
+            **options: Keyword arguments for ``analyze_directory`` (see ``FORWARDED_OPTIONS``)
+
+        Returns:
+            Dictionary with analysis results
+
+        Raises:
+            RuntimeError: If the server rejects the request
+        """
+        _, options = _normalise_request(str(path), options)
+        body = json.dumps({'path': os.path.abspath(path), 'options': options}).encode('utf-8')
+        request = urllib.request.Request(
+            self.base_url + '/analyze',
+            data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            message = json.load(e).get('error', str(e))
+            raise RuntimeError(f"analysis server error: {message}") from None
+
+
+def find_server(state_file: Optional[Path] = None) -> Optional[AnalysisClient]:
+    """
+    Find a running analysis server.
+
+    The ``LINES_COUNTER_SERVER`` environment variable (``host:port``) takes
+    precedence over the state file written by ``lines-counter serve``. A state
+    file owned by another user is ignored, since whoever wrote it would
+    answer the requests.
+
+    Args:
+        state_file: State file to read (default: ``default_state_file()``)
+
+    Returns:
+        Client for the server, or None if no server is answering or its
+        address is malformed
+    """
+    address = os.environ.get(ENV_VAR)
+    if address:
+        host, _, port = address.rpartition(':')
+        try:
+            client = AnalysisClient(host or '127.0.0.1', int(port))
+        except ValueError:
+            return None
+    else:
+        state_file = state_file or default_state_file()
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                if hasattr(os, 'getuid') and os.fstat(f.fileno()).st_uid != os.getuid():
+                    return None
+                state = json.load(f)
+            client = AnalysisClient(state['host'], int(state['port']))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    return client if client.ping() else None
@@ -0,0 +1,275 @@
+"""
+Line classification of streamed content in constant memory.
+
+``LineStream`` classifies text chunk by chunk as it arrives, with the same
+rules as ``FileAnalyzer._count_line_types``. ``count_chunks`` and
+``count_stream`` decode bytes incrementally and translate '\\r\\n' and '\\r'
+line endings the way the whole-buffer path does, also when a multi-byte
+character or a '\\r\\n' pair is split between two chunks.
+
+Only the current, unfinished line is kept. A line longer than ``LONG_LINE``
+characters is reduced to what its classification needs (leading whitespace,
+its first characters, whether it contains a comment delimiter, its last
+character), so memory stays bounded by the chunk size however long the input
+or its lines are.
+"""
+
+import codecs
+import io
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from .encoding import BINARY, SNIFF_SIZE, sniff_encoding
+
+
+# Bytes read from a stream at a time
+READ_CHUNK = 64 * 1024
+
+# Lines longer than this many characters are summarised instead of kept
+LONG_LINE = 64 * 1024
+
+
+class _LongLine:
+    """What the classification needs to know about a line too long to keep."""
+
+    def __init__(self, delimiters: Tuple[str, ...], head_length: int):
+        self.delimiters = delimiters
+        self.head_length = head_length
+        self.overlap = max((len(d) for d in delimiters), default=1) - 1
+        self.found = set()
+        self.length = 0
+        self.indent = 0
+        self.nonblank = False
+        self.head = ''
+        self.tail = ''
+        self.last = ''
+
+    def add(self, piece: str) -> None:
+        """Fold the next piece of the line into the summary."""
+        if not piece:
+            return
+        self.length += len(piece)
+        if not self.nonblank:
+            rest = piece.lstrip()
+            self.indent += len(piece) - len(rest)
+            if rest:
+                self.nonblank = True
+                self.head = rest[:self.head_length]
+        elif len(self.head) < self.head_length:
+            self.head += piece[:self.head_length - len(self.head)]
+
+        # Delimiters may straddle pieces, so the end of the previous one is searched too
+        window = self.tail + piece
+        for delimiter in self.delimiters:
+            if delimiter not in self.found and delimiter in window:
+                self.found.add(delimiter)
+        self.tail = window[-self.overlap:] if self.overlap else ''
+        self.last = piece[-1]
+
+
+class LineStream:
+    """Incremental line classifier over text with '\\n' line endings."""
+
+    def __init__(self, patterns: Dict[str, str], metrics: bool = False):
+        """
+        Initialize the classifier.
+
+        Args:
+            patterns: Comment patterns for the file type
+            metrics: Whether ``finish`` also returns a 'metrics' dictionary
+        """
+        self.start = patterns.get('multi_start')
+        self.end = patterns.get('multi_end')
+        self.single = patterns.get('single')
+        self.metrics = metrics
+        self.delimiters = tuple(d for d in (self.start, self.end) if d)
+        # Summarising a long line relies on delimiters not starting or ending with
+        # whitespace, so that finding them in the line or in the stripped line agree
+        edges_clean = all(d == d.strip() for d in self.delimiters + ((self.single,) if self.single else ()))
+        self.long_line = LONG_LINE if edges_clean else None
+
+        self.total = self.blank = self.comments = self.code = 0
+        self.in_multiline_comment = False
+        self.longest = self.characters = self.max_indent = self.trailing = 0
+        self._pending: List[str] = []
+        self._pending_length = 0
+        self._long: Optional[_LongLine] = None
+
+    def feed(self, text: str) -> None:
+        """
+        Classify the complete lines of the next piece of text.
+
+        Args:
+            text: Text whose line endings are already translated to '\\n'
+        """
+        if not text:
+            return
+        parts = text.split('\n')
+        if len(parts) == 1:
+            self._extend(text)
+            return
+        self._extend(parts[0])
+        self._end_line()
+        for line in parts[1:-1]:
+            self._classify_text(line)
+        self._extend(parts[-1])
+
+    def finish(self, size: Optional[int] = None) -> Dict:
+        """
+        Classify the last line if it has no line ending and return the counts.
+
+        Args:
+            size: Content size in bytes reported as metrics 'bytes'
+
+        Returns:
+            Dictionary with line counts, as from ``_count_line_types``
+        """
+        if self._pending_length or self._long is not None:
+            self._end_line()
+        counts = {'total': self.total, 'code': self.code, 'comments': self.comments, 'blank': self.blank}
+        if self.metrics:
+            counts['metrics'] = {
+                'longest_line': self.longest,
+                'average_line_length': round(self.characters / self.total, 2) if self.total else 0.0,
+                'max_indent': self.max_indent,
+                'trailing_whitespace_lines': self.trailing
+            }
+            if size is not None:
+                counts['metrics']['bytes'] = size
+        return counts
+
+    def _extend(self, piece: str) -> None:
+        """Add text to the unfinished line."""
+        if self._long is not None:
+            self._long.add(piece)
+            return
+        self._pending.append(piece)
+        self._pending_length += len(piece)
+        if self.long_line is not None and self._pending_length > self.long_line:
+            head_length = len(self.single) if self.single else 0
+            self._long = _LongLine(self.delimiters, head_length)
+            self._long.add(''.join(self._pending))
+            self._pending.clear()
+            self._pending_length = 0
+
+    def _end_line(self) -> None:
+        """Classify the unfinished line now that it is complete."""
+        if self._long is not None:
+            line = self._long
+            self._long = None
+            found = line.found
+            self._add_line(not line.nonblank, self.start in found, self.end in found,
+                           bool(self.single) and line.head.startswith(self.single),
+                           line.length, line.indent, line.last in (' ', '\t'))
+            return
+        line = ''.join(self._pending)
+        self._pending.clear()
+        self._pending_length = 0
+        self._classify_text(line)
+
+    def _classify_text(self, line: str) -> None:
+        """Classify one line given without its line ending."""
+        stripped = line.strip()
+        self._add_line(
+            not stripped,
+            bool(self.start) and self.start in stripped,
+            bool(self.end) and self.end in stripped,
+            bool(self.single) and stripped.startswith(self.single),
+            len(line),
+            len(line) - len(line.lstrip()) if self.metrics and stripped else 0,
+            line.endswith((' ', '\t'))
+        )
+
+    def _add_line(self, blank: bool, has_start: bool, has_end: bool, single: bool,
+                  length: int, indent: int, trailing: bool) -> None:
+        """Count one line from the properties the rules look at."""
+        self.total += 1
+        if self.metrics:
+            self.longest = max(self.longest, length)
+            self.characters += length
+            self.trailing += trailing
+            if not blank:
+                self.max_indent = max(self.max_indent, indent)
+
+        if blank:
+            self.blank += 1
+        elif has_start:
+            if not has_end:
+                self.in_multiline_comment = True
+            self.comments += 1
+        elif self.in_multiline_comment:
+            self.comments += 1
+            if has_end:
+                self.in_multiline_comment = False
+        elif single:
+            self.comments += 1
+        else:
+            self.code += 1
+
+
+def count_chunks(chunks: Iterable[bytes], patterns: Dict[str, str], metrics: bool = False,
+                 encoding: str = 'utf-8') -> Dict:
+    """
+    Classify content given as a sequence of byte chunks.
+
+    Args:
+        chunks: Content without BOM, split anywhere
+        patterns: Comment patterns for the file type
+        metrics: Whether to include the 'metrics' dictionary
+        encoding: Encoding of the content; 'bytes' in the metrics is its size
+            once transcoded to UTF-8, as for the whole-buffer path
+
+    Returns:
+        Dictionary with line counts
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    newlines = io.IncrementalNewlineDecoder(None, translate=True)
+    lines = LineStream(patterns, metrics)
+    size = 0
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        size += len(chunk) if encoding == 'utf-8' else len(text.encode('utf-8'))
+        lines.feed(newlines.decode(text))
+    text = decoder.decode(b'', final=True)
+    size += 0 if encoding == 'utf-8' else len(text.encode('utf-8'))
+    lines.feed(newlines.decode(text, final=True))
+    return lines.finish(size)
+
+
+def count_stream(stream: BinaryIO, patterns: Dict[str, str], metrics: bool = False,
+                 chunk_size: int = READ_CHUNK) -> Tuple[Optional[Dict], str]:
+    """
+    Detect the encoding of a binary stream and classify its lines as they are read.
+
+    Binary content is recognised from the first block and not read any further.
+
+    Args:
+        stream: Binary stream, e.g. ``sys.stdin.buffer`` or an open file
+        patterns: Comment patterns for the file type
+        metrics: Whether to include the 'metrics' dictionary
+        chunk_size: Bytes read at a time
+
+    Returns:
+        Tuple of (line counts, or None for binary content, detected encoding)
+    """
+    # Pipes may return less than asked for, so the first block is read until full
+    head = b''
+    while len(head) < SNIFF_SIZE:
+        block = stream.read(SNIFF_SIZE - len(head))
+        if not block:
+            break
+        head += block
+
+    encoding, bom_length = sniff_encoding(head)
+    if encoding == BINARY:
+        return None, encoding
+
+    def chunks() -> Iterable[bytes]:
+        yield head[bom_length:]
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    codec = 'utf-8' if encoding == 'utf-8-sig' else encoding
+    return count_chunks(chunks(), patterns, metrics, codec), encoding
@@ -207,9 +207,12 @@ def get_language_stats(results: Dict) -> Dict[str, Dict]:
         results: Analysis results dictionary
         
     Returns:
-        Dictionary with language statistics
+        Dictionary with language statistics; if the files carry extra metrics
+        (``extra_metrics=True``), each language also gets a 'metrics'
+        dictionary aggregating them
     """
     languages = results.get('languages', {})
+    language_metrics = _aggregate_metrics(results.get('files', []))
     stats = {}
     
     for lang, lang_data in languages.items():
@@ -230,5 +233,52 @@ def get_language_stats(results: Dict) -> Dict[str, Dict]:
                 'blank_percentage': 0.0,
                 'avg_lines_per_file': 0.0
             }
+        if lang in language_metrics:
+            stats[lang]['metrics'] = language_metrics[lang]
     
-    return stats 
\ No newline at end of file
+    return stats
+
+
+def _aggregate_metrics(files: List[Dict]) -> Dict[str, Dict]:
+    """
+    Aggregate the extra per-file metrics by language.
+    
+    Sizes and trailing-whitespace lines are summed, maxima are kept and the
+    average line length is weighted by the number of lines of each file.
+    
+    Args:
+        files: Per-file results
+        
+    Returns:
+        Dictionary mapping languages to aggregated metrics
+    """
+    aggregated = {}
+    characters = {}
+    lines = {}
+    for file_result in files:
+        metrics = file_result.get('metrics')
+        if metrics is None:
+            continue
+        lang = file_result['language']
+        if lang not in aggregated:
+            aggregated[lang] = {
+                'bytes': 0,
+                'longest_line': 0,
+                'average_line_length': 0.0,
+                'max_indent': 0,
+                'trailing_whitespace_lines': 0
+            }
+            characters[lang] = 0.0
+            lines[lang] = 0
+        lang_metrics = aggregated[lang]
+        lang_metrics['bytes'] += metrics['bytes']
+        lang_metrics['longest_line'] = max(lang_metrics['longest_line'], metrics['longest_line'])
+        lang_metrics['max_indent'] = max(lang_metrics['max_indent'], metrics['max_indent'])
+        lang_metrics['trailing_whitespace_lines'] += metrics['trailing_whitespace_lines']
+        characters[lang] += metrics['average_line_length'] * file_result['lines']['total']
+        lines[lang] += file_result['lines']['total']
+    
+    for lang, lang_metrics in aggregated.items():
+        if lines[lang]:
+            lang_metrics['average_line_length'] = round(characters[lang] / lines[lang], 2)
+    return aggregated
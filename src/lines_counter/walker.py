@@ -0,0 +1,172 @@
+"""
+Directory walker with symlink loop protection and hard-link / bind-mount deduplication.
+"""
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from .cache import DIRECTORY, FILE, OTHER, ScanCache
+
+
+class Walker:
+    """Enumerates the files below a directory, visiting each physical entry at most once."""
+
+    def __init__(
+        self,
+        recursive: bool = True,
+        follow_symlinks: bool = False,
+        one_file_system: bool = False,
+        dedup_inodes: bool = False,
+        exclude_dir: Optional[Callable[[Path], bool]] = None,
+        cache: Optional[ScanCache] = None
+    ):
+        """
+        Initialize the walker.
+
+        Directory symlinks that point back at one of their own ancestors are
+        never followed, whatever the options.
+
+        Args:
+            recursive: Whether to descend into subdirectories
+            follow_symlinks: Whether to follow symlinks to files and directories
+            one_file_system: Whether to stay on the file system of the root directory
+            dedup_inodes: Whether to visit each (st_dev, st_ino) only once, so files
+                reachable through hard links, bind mounts or symlinks are counted once
+            exclude_dir: Predicate telling whether a directory should be pruned
+            cache: Cache of directory listings; directories whose mtime has not
+                changed since they were cached are not listed again
+        """
+        self.recursive = recursive
+        self.follow_symlinks = follow_symlinks
+        self.one_file_system = one_file_system
+        self.dedup_inodes = dedup_inodes
+        self.exclude_dir = exclude_dir
+        self.cache = cache
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, int]:
+        """Create zeroed walk counters."""
+        return {
+            'directories': 0,
+            'files': 0,
+            'skipped_symlinks': 0,
+            'skipped_symlink_loops': 0,
+            'skipped_other_filesystem': 0,
+            'skipped_duplicates': 0,
+            'unreadable_directories': 0
+        }
+
+    def _list_directory(self, directory: Path) -> List[Tuple[str, bool, str]]:
+        """
+        List a directory, reusing the cached listing when its mtime is unchanged.
+
+        Args:
+            directory: Directory to list
+
+        Returns:
+            List of (name, is_symlink, kind) tuples sorted by name
+        """
+        if self.cache is not None:
+            key = os.path.abspath(directory)
+            mtime_ns = os.stat(directory).st_mtime_ns
+            entries = self.cache.get_listing(key, mtime_ns)
+            if entries is not None:
+                return entries
+
+        entries = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        kind = DIRECTORY
+                    elif entry.is_file():
+                        kind = FILE
+                    else:
+                        kind = OTHER
+                    entries.append((entry.name, entry.is_symlink(), kind))
+                except OSError:
+                    continue
+        entries.sort()
+
+        if self.cache is not None:
+            self.cache.put_listing(key, mtime_ns, entries)
+        return entries
+
+    def walk(self, root: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+        """
+        Yield the regular files below ``root`` in a deterministic order.
+
+        Args:
+            root: Directory to walk
+
+        Returns:
+            Iterator of (path, stat_result) tuples; paths are ``root`` joined with
+            the names found below it
+        """
+        self.stats = self._empty_stats()
+        root_stat = root.stat()
+        root_key = (root_stat.st_dev, root_stat.st_ino)
+        seen_dirs: Set[Tuple[int, int]] = {root_key}
+        seen_files: Set[Tuple[int, int]] = set()
+
+        # Each pending directory carries the keys of its ancestors for loop detection
+        stack = [(root, (root_key,))]
+        while stack:
+            directory, ancestors = stack.pop()
+            self.stats['directories'] += 1
+            try:
+                entries = self._list_directory(directory)
+            except OSError:
+                self.stats['unreadable_directories'] += 1
+                continue
+
+            subdirs = []
+            for name, is_symlink, kind in entries:
+                if kind == OTHER:
+                    continue
+                if is_symlink and not self.follow_symlinks:
+                    self.stats['skipped_symlinks'] += 1
+                    continue
+                if kind == DIRECTORY and not self.recursive:
+                    continue
+
+                path = directory / name
+                try:
+                    if kind == DIRECTORY:
+                        if self.exclude_dir is not None and self.exclude_dir(path):
+                            continue
+                        st = os.stat(path)
+                        key = (st.st_dev, st.st_ino)
+                        if self.one_file_system and st.st_dev != root_stat.st_dev:
+                            self.stats['skipped_other_filesystem'] += 1
+                        elif key in ancestors:
+                            self.stats['skipped_symlink_loops'] += 1
+                        elif self.dedup_inodes and key in seen_dirs:
+                            self.stats['skipped_duplicates'] += 1
+                        else:
+                            seen_dirs.add(key)
+                            subdirs.append((path, ancestors + (key,)))
+                        continue
+
+                    st = os.stat(path)
+                except OSError:
+                    # Entry vanished or became unreadable while walking
+                    continue
+
+                if self.one_file_system and st.st_dev != root_stat.st_dev:
+                    self.stats['skipped_other_filesystem'] += 1
+                    continue
+                if self.dedup_inodes:
+                    key = (st.st_dev, st.st_ino)
+                    if key in seen_files:
+                        self.stats['skipped_duplicates'] += 1
+                        continue
+                    seen_files.add(key)
+
+                self.stats['files'] += 1
+                yield path, st
+
+            # Reverse so that subdirectories are visited in name order
+            stack.extend(reversed(subdirs))
@@ -0,0 +1,110 @@
+"""
+Tests for the scan cache.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directory
+
+
+def age_tree(root: Path, seconds: float = 60) -> None:
+    """Move every mtime below root into the past so it is outside the racy window."""
+    past = time.time() - seconds
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            os.utime(os.path.join(dirpath, name), (past, past))
+        os.utime(dirpath, (past, past))
+
+
+def without_cache_section(results: dict) -> dict:
+    """Drop the cache statistics so results of different runs can be compared."""
+    return {key: value for key, value in results.items() if key != 'cache'}
+
+
+class TestScanCache:
+    """Test cases for directory listing and file result caching."""
+    
+    def setup_method(self):
+        """Create a tree with two levels of directories."""
+        self.test_dir = Path(__file__).parent / "test_cache"
+        self.tree = self.test_dir / "tree"
+        (self.tree / "pkg" / "sub").mkdir(parents=True, exist_ok=True)
+        (self.tree / "main.py").write_text("# main\nx = 1\n")
+        (self.tree / "pkg" / "mod.js").write_text("// mod\nlet y;\n\n")
+        (self.tree / "pkg" / "sub" / "deep.py").write_text("z = 3\n")
+        age_tree(self.tree)
+        self.cache_file = self.test_dir / "cache.json"
+    
+    def teardown_method(self):
+        """Clean up the tree."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def scan(self) -> dict:
+        """Run one scan with a persisted cache."""
+        cache = ScanCache(self.cache_file).load()
+        results = analyze_directory(self.tree, cache=cache)
+        cache.save()
+        return results
+    
+    def test_warm_run_skips_listing_and_reading(self):
+        """A warm run hits the cache for every directory and file."""
+        cold = self.scan()
+        assert cold['cache'] == {'dir_hits': 0, 'dir_misses': 3, 'file_hits': 0, 'file_misses': 3}
+        
+        warm = self.scan()
+        assert warm['cache'] == {'dir_hits': 3, 'dir_misses': 0, 'file_hits': 3, 'file_misses': 0}
+        assert without_cache_section(warm) == without_cache_section(cold)
+    
+    def test_changed_directory_is_listed_again(self):
+        """Only directories whose mtime changed are re-listed."""
+        self.scan()
+        (self.tree / "pkg" / "new.py").write_text("n = 1\n")
+        past = time.time() - 30
+        os.utime(self.tree / "pkg" / "new.py", (past, past))
+        os.utime(self.tree / "pkg", (past, past))
+        
+        results = self.scan()
+        assert results['cache']['dir_misses'] == 1
+        assert results['cache']['file_misses'] == 1
+        assert results['summary']['total_files'] == 4
+    
+    def test_modified_file_is_read_again(self):
+        """A file with a new size or mtime is not served from the cache."""
+        self.scan()
+        (self.tree / "main.py").write_text("# main\nx = 1\ny = 2\n")
+        
+        results = self.scan()
+        assert results['cache']['file_misses'] == 1
+        assert results['languages']['Python']['code_lines'] == 3
+    
+    def test_recent_entries_are_not_cached(self):
+        """Entries modified within the racy window are always re-checked."""
+        (self.tree / "main.py").write_text("x = 1\n")
+        self.scan()
+        
+        assert self.scan()['cache']['file_misses'] == 1
+    
+    def test_deleted_entries_are_pruned(self):
+        """Entries not seen during a run are dropped when saving."""
+        self.scan()
+        shutil.rmtree(self.tree / "pkg")
+        age_tree(self.tree)
+        self.scan()
+        
+        data = json.loads(self.cache_file.read_text())
+        assert len(data['listings']) == 1
+        assert len(data['files']) == 1
+    
+    def test_incompatible_cache_is_ignored(self):
+        """A cache written with a different fingerprint is discarded."""
+        self.scan()
+        data = json.loads(self.cache_file.read_text())
+        data['fingerprint'] = 'other'
+        self.cache_file.write_text(json.dumps(data))
+        
+        assert self.scan()['cache']['file_hits'] == 0
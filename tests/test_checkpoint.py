@@ -0,0 +1,116 @@
+"""
+Tests for checkpointed, resumable scans.
+"""
+
+import json
+import shutil
+import pytest
+from pathlib import Path
+from lines_counter.checkpoint import Checkpoint
+from lines_counter.core import analyze_directory
+
+
+class TestCheckpoint:
+    """Test cases for the checkpoint journal."""
+    
+    def setup_method(self):
+        """Create a tree with text and binary files."""
+        self.test_dir = Path(__file__).parent / "test_checkpoint"
+        self.tree = self.test_dir / "tree"
+        for i in range(6):
+            package = self.tree / f"pkg{i % 2}"
+            package.mkdir(parents=True, exist_ok=True)
+            (package / f"mod{i}.py").write_text("# doc\n" + "x = 1\n" * i + "\n")
+        (self.tree / "blob.txt").write_bytes(b"\x00\x01\x02\x03" * 8)
+        self.journal = self.test_dir / "scan.journal"
+    
+    def teardown_method(self):
+        """Clean up the tree."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def test_resume_matches_uninterrupted_run(self):
+        """A scan interrupted and resumed produces the same result as one full run."""
+        expected = analyze_directory(self.tree, rollup_depth=1)
+        
+        partial = analyze_directory(self.tree, rollup_depth=1, max_files=3,
+                                    checkpoint=Checkpoint(self.journal))
+        assert partial['incomplete']['reason'] == 'max_files'
+        assert self.journal.exists()
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        resumed = analyze_directory(self.tree, rollup_depth=1, checkpoint=checkpoint)
+        
+        assert checkpoint.replayed == 3
+        assert resumed == expected
+        assert not self.journal.exists()
+    
+    def test_files_changed_since_the_journal_are_read_again(self):
+        """A file edited between the interrupted run and the resume gets fresh counts."""
+        analyze_directory(self.tree, max_files=3, checkpoint=Checkpoint(self.journal))
+        journaled = [json.loads(line)['record']['path'] for line in self.journal.read_text().splitlines()[1:]]
+        edited = next(path for path in journaled if path.endswith('.py'))
+        (self.tree / edited).write_text("# edited\n" + "y = 2\n" * 20)
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        resumed = analyze_directory(self.tree, checkpoint=checkpoint)
+        
+        assert checkpoint.replayed == 2
+        assert resumed == analyze_directory(self.tree)
+    
+    def test_replayed_files_do_not_count_against_max_files(self):
+        """A resumed scan with a file limit analyzes that many files beyond the journal."""
+        analyze_directory(self.tree, max_files=2, checkpoint=Checkpoint(self.journal))
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        resumed = analyze_directory(self.tree, max_files=2, checkpoint=checkpoint)
+        
+        assert checkpoint.replayed == 2
+        assert resumed['incomplete']['files_analyzed'] == 4
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        assert analyze_directory(self.tree, checkpoint=checkpoint) == analyze_directory(self.tree)
+        assert checkpoint.replayed == 4
+    
+    def test_journal_is_closed_when_scan_raises(self):
+        """An exception escaping the scan closes the journal and keeps it for a resume."""
+        def interrupt(done, total, path):
+            if done == 3:
+                raise KeyboardInterrupt
+        
+        checkpoint = Checkpoint(self.journal)
+        with pytest.raises(KeyboardInterrupt):
+            analyze_directory(self.tree, progress_callback=interrupt, checkpoint=checkpoint)
+        assert checkpoint._file is None
+        assert self.journal.exists()
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        assert analyze_directory(self.tree, checkpoint=checkpoint) == analyze_directory(self.tree)
+        assert checkpoint.replayed == 3
+    
+    def test_partial_trailing_record_is_ignored(self):
+        """A record cut off by a crash is dropped and its file analyzed again."""
+        analyze_directory(self.tree, max_files=4, checkpoint=Checkpoint(self.journal))
+        lines = self.journal.read_text().splitlines(keepends=True)
+        self.journal.write_text(''.join(lines[:-1]) + lines[-1][:10])
+        
+        checkpoint = Checkpoint(self.journal, resume=True)
+        resumed = analyze_directory(self.tree, checkpoint=checkpoint)
+        
+        assert checkpoint.replayed == 3
+        assert resumed == analyze_directory(self.tree)
+    
+    def test_resume_requires_same_scan(self):
+        """A journal written with other options is rejected."""
+        analyze_directory(self.tree, max_files=2, checkpoint=Checkpoint(self.journal))
+        
+        with pytest.raises(ValueError):
+            analyze_directory(self.tree, include_extensions={'.py'},
+                              checkpoint=Checkpoint(self.journal, resume=True))
+    
+    def test_resume_without_journal_starts_fresh(self):
+        """Resuming when no journal exists runs a normal scan."""
+        results = analyze_directory(self.tree, checkpoint=Checkpoint(self.journal, resume=True))
+        
+        assert results['summary']['total_files'] == 6
+        assert results['skipped'] == [{'path': 'blob.txt', 'reason': 'binary'}]
@@ -5,8 +5,10 @@ Tests for the core module.
 import json
 import pytest
 from pathlib import Path
-from lines_counter.core import analyze_directory, count_lines, save_results_to_json, load_results_from_json
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directories, analyze_directory, count_lines, save_results_to_json, load_results_from_json
 from lines_counter.file_analyzer import FileAnalyzer
+from lines_counter.utils import get_language_stats
 
 
 class TestCore:
@@ -160,6 +162,54 @@ class TestClass:
         assert summary['comment_lines'] == 0
         assert summary['blank_lines'] == 0
     
+    def test_analyze_directories(self):
+        """Each root gets its own result and the total adds them up."""
+        subdir = self.test_dir / "subdir"
+        missing = self.test_dir / "missing"
+        results = analyze_directories([self.test_dir, subdir, missing], exclude_patterns={'node_modules'})
+        
+        assert list(results['roots']) == [str(self.test_dir), str(subdir), str(missing)]
+        assert results['roots'][str(self.test_dir)] == analyze_directory(self.test_dir, exclude_patterns={'node_modules'})
+        assert results['roots'][str(subdir)] == analyze_directory(subdir, exclude_patterns={'node_modules'})
+        assert results['roots'][str(missing)]['summary']['total_files'] == 0
+        
+        root_summaries = [root['summary'] for root in results['roots'].values()]
+        for key in results['total']['summary']:
+            assert results['total']['summary'][key] == sum(summary[key] for summary in root_summaries)
+        assert results['total']['languages']['Python']['files'] == 3
+        assert 'files' not in results['total']
+    
+    def test_analyze_directories_deduplicates_roots(self):
+        """A root given twice, under any spelling, is analyzed and totalled once."""
+        other_spelling = self.test_dir / "subdir" / ".."
+        results = analyze_directories([self.test_dir, other_spelling, str(self.test_dir)],
+                                      exclude_patterns={'node_modules'})
+        
+        assert list(results['roots']) == [str(self.test_dir)]
+        assert results['total']['summary'] == results['roots'][str(self.test_dir)]['summary']
+    
+    def test_analyze_directories_shares_cache(self):
+        """All roots go through the same cache."""
+        cache = ScanCache()
+        results = analyze_directories([self.test_dir, self.test_dir / "subdir"], cache=cache)
+        
+        assert 'cache' in results['roots'][str(self.test_dir)]
+        assert len(cache._seen_files) == results['roots'][str(self.test_dir)]['summary']['total_files']
+    
+    def test_extra_metrics(self):
+        """Extra metrics appear in every file entry and are aggregated per language."""
+        results = analyze_directory(self.test_dir, extra_metrics=True)
+        
+        python_files = [f for f in results['files'] if f['language'] == 'Python']
+        assert all(set(f['lines']) == {'total', 'code', 'comments', 'blank'} for f in results['files'])
+        assert all('metrics' in f for f in results['files'])
+        
+        stats = get_language_stats(results)['Python']['metrics']
+        assert stats['bytes'] == sum(f['metrics']['bytes'] for f in python_files)
+        assert stats['longest_line'] == max(f['metrics']['longest_line'] for f in python_files)
+        assert stats['max_indent'] == 8
+        assert 'metrics' not in get_language_stats(analyze_directory(self.test_dir))['Python']
+    
     def test_count_lines(self):
         """Test single file line counting."""
         python_file = self.test_dir / "main.py"
@@ -0,0 +1,74 @@
+"""
+Tests for encoding detection.
+"""
+
+import codecs
+import shutil
+import pytest
+from pathlib import Path
+from lines_counter.core import analyze_directory
+from lines_counter.encoding import BINARY, sniff_encoding, to_utf8
+from lines_counter.file_analyzer import FileAnalyzer
+
+
+CSHARP = "// Greeting\r\nclass A\r\n{\r\n\r\n    /* body */\r\n}\r\n"
+EXPECTED = {'total': 6, 'code': 3, 'comments': 2, 'blank': 1}
+
+
+class TestEncoding:
+    """Test cases for encoding sniffing and transcoding."""
+    
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.analyzer = FileAnalyzer()
+        self.test_dir = Path(__file__).parent / "test_encodings"
+        self.test_dir.mkdir(exist_ok=True)
+    
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    @pytest.mark.parametrize('data, encoding', [
+        (CSHARP.encode('utf-8'), 'utf-8'),
+        (codecs.BOM_UTF8 + CSHARP.encode('utf-8'), 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE + CSHARP.encode('utf-16-le'), 'utf-16-le'),
+        (codecs.BOM_UTF16_BE + CSHARP.encode('utf-16-be'), 'utf-16-be'),
+        (codecs.BOM_UTF32_LE + CSHARP.encode('utf-32-le'), 'utf-32-le'),
+        (CSHARP.encode('utf-16-le'), 'utf-16-le'),
+        (CSHARP.encode('utf-16-be'), 'utf-16-be'),
+        (CSHARP.encode('utf-32-be'), 'utf-32-be'),
+    ])
+    def test_detect_and_count(self, data, encoding):
+        """Every supported encoding is detected and counted like plain UTF-8."""
+        counts, detected = self.analyzer.inspect_content(data, Path('Program.cs'))
+        
+        assert detected == encoding
+        assert counts == EXPECTED
+    
+    def test_utf8_is_passed_through(self):
+        """ASCII-compatible content is not copied or transcoded."""
+        data = CSHARP.encode('utf-8')
+        assert to_utf8(data)[0] is data
+    
+    def test_binary_detection(self):
+        """NUL bytes without a text pattern mark a file as binary."""
+        assert sniff_encoding(b'\x7fELF\x02\x01\x01\x00\x00\x00\x00\x00\x03\x00>\x00\x01\x00\x00\x00')[0] == BINARY
+        assert self.analyzer.analyze_content(b'\x00\x01\x02\x03\xff\x00\x00\x17', Path('blob.txt'))['total'] == 0
+    
+    def test_directory_reports_encodings_and_skips(self):
+        """analyze_directory reports per-file encodings and binary skips."""
+        (self.test_dir / "utf16.sql").write_bytes(
+            codecs.BOM_UTF16_LE + "-- export\r\nSELECT 1;\r\n".encode('utf-16-le')
+        )
+        (self.test_dir / "plain.py").write_text("x = 1\n")
+        (self.test_dir / "data.txt").write_bytes(bytes(range(256)) * 4)
+        
+        results = analyze_directory(self.test_dir)
+        files = {f['path']: f for f in results['files']}
+        
+        assert files['utf16.sql']['encoding'] == 'utf-16-le'
+        assert files['utf16.sql']['lines'] == {'total': 2, 'code': 1, 'comments': 1, 'blank': 0}
+        assert files['plain.py']['encoding'] == 'utf-8'
+        assert results['skipped'] == [{'path': 'data.txt', 'reason': 'binary'}]
+        assert results['summary']['total_files'] == 2
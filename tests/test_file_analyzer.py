@@ -54,6 +54,19 @@ class TestFileAnalyzer:
         assert not analyzer.is_supported_file(Path("test.java"))
         assert not analyzer.is_supported_file(Path("test.cpp"))
     
+    def test_configuration_can_be_reassigned(self):
+        """Assigning new extensions or patterns stores a frozen copy."""
+        analyzer = FileAnalyzer()
+        extensions = {'.py'}
+        analyzer.include_extensions = extensions
+        analyzer.exclude_patterns = {'Vendor'}
+        extensions.add('.js')
+        
+        assert analyzer.include_extensions == frozenset({'.py'})
+        assert not analyzer.is_supported_file(Path("test.js"))
+        assert not analyzer.is_supported_file(Path("vendor/lib.py"))
+        assert analyzer.is_supported_file(Path(".git/hooks.py"))
+    
     def test_analyze_python_file(self):
         """Test Python file analysis."""
         python_content = '''# This is a comment
@@ -183,4 +196,32 @@ function helloWorld() {
         assert result['total'] == 4
         assert result['code'] == 0
         assert result['comments'] == 0
-        assert result['blank'] == 4 
\ No newline at end of file
+        assert result['blank'] == 4 
+    
+    def test_extra_metrics(self):
+        """Extra metrics are gathered along with the line counts."""
+        content = "def f():\n    if x:  \n        return 1\n\n  \n# end\t"
+        analyzer = FileAnalyzer(extra_metrics=True)
+        
+        result = analyzer.analyze_content(content.encode(), Path('m.py'))
+        
+        assert result['total'] == 6
+        assert result['metrics'] == {
+            'longest_line': 16,
+            'average_line_length': round((8 + 11 + 16 + 0 + 2 + 6) / 6, 2),
+            'max_indent': 8,
+            'trailing_whitespace_lines': 3,
+            'bytes': len(content)
+        }
+        assert 'metrics' not in self.analyzer.analyze_content(content.encode(), Path('m.py'))
+    
+    def test_extra_metrics_crlf(self):
+        """Line endings do not count towards line lengths or trailing whitespace."""
+        analyzer = FileAnalyzer(extra_metrics=True)
+        
+        result = analyzer.analyze_content(b'ab\r\n  cd\r\n', Path('m.py'))
+        
+        assert result['metrics']['longest_line'] == 4
+        assert result['metrics']['average_line_length'] == 3.0
+        assert result['metrics']['max_indent'] == 2
+        assert result['metrics']['trailing_whitespace_lines'] == 0
@@ -0,0 +1,87 @@
+"""
+Tests for the differential fuzzing harness.
+"""
+
+import random
+
+from lines_counter import fuzz
+from lines_counter.file_analyzer import FileAnalyzer
+
+
+def _ignores_crlf(data: bytes, patterns: dict, metrics: bool) -> dict:
+    """An engine with a planted bug: '\\r\\n' counts as two line endings."""
+    return fuzz.reference_counts(data.replace(b'\r\n', b'\n\n'), patterns, metrics)
+
+
+def _declines(data: bytes, patterns: dict, metrics: bool) -> None:
+    """An engine that never handles anything."""
+    return None
+
+
+class TestFuzz:
+    """Test cases for the generators, the shrinker and the differential run."""
+
+    def test_registered_engines_agree_with_reference(self):
+        """Every available engine matches the reference on generated inputs."""
+        report = fuzz.run_differential(iterations=40, seed=1)
+
+        assert report['cases'] == 40 * len(FileAnalyzer.COMMENT_PATTERNS)
+        assert report['failures'] == []
+        assert 'dispatch' in report['declined']
+
+    def test_generator_covers_adversarial_shapes(self):
+        """Generated sources include CRLF, lone CR, huge lines and open block comments."""
+        rng = random.Random(0)
+        patterns = FileAnalyzer.COMMENT_PATTERNS['.c']
+        sources = [fuzz.generate_source(rng, patterns) for _ in range(300)]
+
+        assert any(b'\r\n' in data for data in sources)
+        assert any(b'\r' in data.replace(b'\r\n', b'') for data in sources)
+        assert any(len(data) > fuzz.CHUNK_BOUNDARIES[0] for data in sources)
+        assert any(data.rstrip().endswith(b'/*') for data in sources)
+
+    def test_broken_engine_is_caught_and_shrunk(self):
+        """A disagreement is reported once per file type with a minimal input."""
+        report = fuzz.run_differential(iterations=60, seed=0, engines={'broken': _ignores_crlf},
+                                       extensions=['.py'])
+
+        assert len(report['failures']) == 1
+        failure = report['failures'][0]
+        assert failure['engine'] == 'broken'
+        assert failure['extension'] == '.py'
+        assert failure['input'] == '\r\n'
+        assert failure['expected'] != failure['actual']
+
+    def test_raising_engine_reports_error(self):
+        """An engine that raises is a failure carrying the exception."""
+        def raises(data, patterns, metrics):
+            raise RuntimeError('boom')
+
+        report = fuzz.run_differential(iterations=5, seed=0, engines={'raises': raises}, extensions=['.js'])
+
+        assert report['failures'][0]['error'] == 'RuntimeError: boom'
+        assert len(report['failures'][0]['input']) <= 1
+
+    def test_declined_inputs_are_counted(self):
+        """Inputs an engine declines are counted, not failures."""
+        report = fuzz.run_differential(iterations=10, seed=0, engines={'lazy': _declines}, extensions=['.sql'])
+
+        assert report['declined'] == {'lazy': 10}
+        assert report['failures'] == []
+
+    def test_shrink_keeps_failing_part(self):
+        """Shrinking removes lines and characters not needed for the failure."""
+        data = b'a = 1\nb = 2\n/* open\nc = 3\n'
+
+        minimal = fuzz.shrink(data, lambda candidate: b'/*' in candidate)
+
+        assert minimal == b'/*'
+
+    def test_register_engine(self):
+        """Registered engines are checked by default."""
+        fuzz.register_engine('test-declines', _declines)
+        try:
+            report = fuzz.run_differential(iterations=2, seed=0, extensions=['.py'])
+            assert report['declined']['test-declines'] == 2
+        finally:
+            del fuzz.ENGINES['test-declines']
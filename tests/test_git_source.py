@@ -0,0 +1,105 @@
+"""
+Tests for the git source backend.
+"""
+
+import shutil
+import subprocess
+import pytest
+from pathlib import Path
+from lines_counter.core import analyze_directory
+from lines_counter.git_source import GitSource, analyze_revision
+
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+
+def git(repo: Path, *args: str) -> str:
+    """Run a git command with a fixed identity and return its output."""
+    completed = subprocess.run(
+        ['git', '-C', str(repo), '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+        check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    return completed.stdout.decode().strip()
+
+
+class TestGitSource:
+    """Test cases for GitSource."""
+    
+    def setup_method(self):
+        """Set up a small repository with two commits."""
+        self.test_dir = Path(__file__).parent / "test_git_repo"
+        self.repo = self.test_dir / "work"
+        self.repo.mkdir(parents=True, exist_ok=True)
+        git(self.repo, 'init', '-q')
+        
+        (self.repo / "main.py").write_text("# comment\nprint('hi')\n\n")
+        (self.repo / "lib").mkdir(exist_ok=True)
+        (self.repo / "lib" / "util.js").write_text("// util\nfunction f() {}\n")
+        (self.repo / "notes.xyz").write_text("unsupported\n")
+        git(self.repo, 'add', '-A')
+        git(self.repo, 'commit', '-q', '-m', 'first')
+        self.first = git(self.repo, 'rev-parse', 'HEAD')
+        
+        (self.repo / "main.py").write_text("# comment\nprint('hi')\nprint('bye')\n")
+        git(self.repo, 'commit', '-q', '-am', 'second')
+        self.second = git(self.repo, 'rev-parse', 'HEAD')
+    
+    def teardown_method(self):
+        """Clean up the repository."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def test_matches_analyze_directory(self):
+        """Counting HEAD from the object database matches counting the checkout."""
+        from_git = analyze_revision(self.repo, 'HEAD')
+        from_disk = analyze_directory(self.repo)
+        
+        assert from_git['summary'] == from_disk['summary']
+        assert from_git['languages'] == from_disk['languages']
+        assert sorted(f['path'] for f in from_git['files']) == ['lib/util.js', 'main.py']
+    
+    def test_historical_revision(self):
+        """Older revisions are analyzed without touching the work tree."""
+        results = analyze_revision(self.repo, self.first)
+        
+        assert results['languages']['Python']['total_lines'] == 3
+        assert results['languages']['Python']['blank_lines'] == 1
+    
+    def test_bare_repository(self):
+        """Bare mirrors can be analyzed."""
+        bare = self.test_dir / "mirror.git"
+        subprocess.run(['git', 'clone', '-q', '--bare', str(self.repo), str(bare)], check=True)
+        
+        results = analyze_revision(bare, self.second)
+        assert results['summary']['total_files'] == 2
+        assert results['languages']['Python']['code_lines'] == 2
+    
+    def test_blob_memoisation(self):
+        """Blobs unchanged across revisions are only read once."""
+        with GitSource(self.repo) as source:
+            source.analyze_revision(self.first)
+            assert source.blobs_read == 2
+            
+            source.analyze_revision(self.second)
+            # Only the modified main.py blob is new
+            assert source.blobs_read == 3
+    
+    def test_blob_memo_is_bounded(self):
+        """Only the most recently used blob counts are kept."""
+        with GitSource(self.repo, blob_cache_size=2) as source:
+            source.analyze_revision(self.first)
+            source.analyze_revision(self.second)
+            assert source.blobs_read == 3
+            assert len(source._blob_counts) == 2
+            
+            # The blobs of the second revision are kept, the first main.py blob was evicted
+            source.analyze_revision(self.second)
+            assert source.blobs_read == 3
+            source.analyze_revision(self.first)
+            assert source.blobs_read == 4
+    
+    def test_unknown_revision(self):
+        """Unknown revisions raise a ValueError."""
+        with GitSource(self.repo) as source:
+            with pytest.raises(ValueError):
+                source.resolve('does-not-exist')
@@ -0,0 +1,182 @@
+"""
+Tests for read bandwidth limits, memory backpressure and idle priority.
+"""
+
+import os
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directory
+from lines_counter import governor as governor_module
+from lines_counter.governor import MEMORY_CHECK_INTERVAL, ResourceGovernor, TokenBucket, current_rss
+from lines_counter.metrics import render_metrics
+
+
+class FakeClock:
+    """Clock that only advances when something sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestGovernor:
+    """Test cases for TokenBucket, ResourceGovernor and governed scans."""
+
+    def setup_method(self):
+        """Create a project of 40 files of about 2 KB each."""
+        self.test_dir = Path(__file__).parent / "test_governor"
+        self.test_dir.mkdir(exist_ok=True)
+        for index in range(40):
+            package = self.test_dir / f"pkg{index % 4}"
+            package.mkdir(exist_ok=True)
+            (package / f"mod{index}.py").write_text("# module\nx = 1\n\n" * 120)
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_token_bucket_rate(self):
+        """A full bucket lets a burst through, then waits for the refill."""
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+
+        assert bucket.consume(100) == 0
+        assert bucket.consume(50) == pytest.approx(0.5)
+        clock.now += 1.0
+        assert bucket.consume(100) == 0
+        # More than the capacity is let through after a proportional wait
+        assert bucket.consume(300) == pytest.approx(3.0)
+        assert clock.now == pytest.approx(4.5)
+
+    def test_invalid_limits(self):
+        """Limits must be positive."""
+        with pytest.raises(ValueError):
+            ResourceGovernor(max_read_rate=0)
+        with pytest.raises(ValueError):
+            ResourceGovernor(memory_limit=-1)
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_read_rate_limit(self):
+        """Reads beyond the burst wait; the result is unchanged."""
+        total_bytes = sum(path.stat().st_size for path in self.test_dir.rglob('*.py'))
+        governor = ResourceGovernor(max_read_rate=total_bytes / 2)
+
+        started = time.monotonic()
+        results = analyze_directory(self.test_dir, governor=governor)
+        elapsed = time.monotonic() - started
+
+        stats = results['governor']
+        assert stats['bytes_read'] == total_bytes
+        assert stats['read_waits'] > 0
+        assert stats['read_wait_seconds'] > 0.5
+        assert elapsed >= 0.5
+        del results['governor']
+        assert results == analyze_directory(self.test_dir)
+
+    def test_cache_hits_are_not_charged(self):
+        """Only files actually read count against the bandwidth."""
+        old = time.time() - 60
+        for path in self.test_dir.rglob('*.py'):
+            os.utime(path, (old, old))
+        cache = ScanCache()
+        governor = ResourceGovernor(max_read_rate=10 * 1024 * 1024)
+        analyze_directory(self.test_dir, cache=cache, governor=governor)
+        results = analyze_directory(self.test_dir, cache=cache, governor=governor)
+
+        assert results['cache']['file_hits'] == 40
+        assert results['governor']['bytes_read'] == 0
+
+    @pytest.mark.skipif(current_rss() is None, reason='RSS not available')
+    @pytest.mark.parametrize('backend', ['serial', 'thread'])
+    def test_memory_backpressure(self, backend):
+        """Above the memory cap the scan holds back work but still finishes."""
+        governor = ResourceGovernor(memory_limit=1, memory_pause=0.2)
+        results = analyze_directory(self.test_dir, governor=governor, backend=backend, workers=2)
+
+        stats = results.pop('governor')
+        assert stats['memory_waits'] == 1
+        assert stats['memory_wait_seconds'] == pytest.approx(0.2)
+        assert stats['peak_rss'] > 0
+        assert results == analyze_directory(self.test_dir)
+
+    def test_memory_checks_are_rate_limited(self, monkeypatch):
+        """Above the cap, RSS reads and collections happen once per interval and pauses are bounded."""
+        clock = FakeClock()
+        readings = []
+        collections = []
+        rss = {'value': 2000}
+
+        def read_rss():
+            readings.append(clock.now)
+            return rss['value']
+
+        monkeypatch.setattr(governor_module, 'current_rss', read_rss)
+        monkeypatch.setattr(governor_module.gc, 'collect', lambda: collections.append(clock.now))
+        governor = ResourceGovernor(memory_limit=1000, memory_pause=0.5, clock=clock, sleep=clock.sleep)
+
+        governor.relieve_memory()
+        assert governor.stats['memory_waits'] == 1
+        assert governor.stats['memory_wait_seconds'] == pytest.approx(0.5)
+        assert 1 < len(readings) <= 11
+        assert len(collections) == 1
+
+        # The pause is used up: further calls at the same time neither read nor collect again
+        governor.relieve_memory()
+        checks, collected = len(readings), len(collections)
+        for _ in range(1000):
+            governor.relieve_memory()
+        assert len(readings) == checks and len(collections) == collected
+        assert governor.stats['memory_waits'] == 1
+
+        # Going back under the cap and over again is a new event with a new pause
+        rss['value'] = 500
+        clock.now += MEMORY_CHECK_INTERVAL
+        governor.relieve_memory()
+        rss['value'] = 2000
+        clock.now += MEMORY_CHECK_INTERVAL
+        governor.relieve_memory()
+        assert governor.stats['memory_waits'] == 2
+        assert governor.stats['memory_wait_seconds'] == pytest.approx(1.0)
+        assert len(collections) == collected + 1
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'), reason='per-thread priorities are Linux specific')
+    def test_idle_priority_stays_in_scanning_thread(self):
+        """Idle mode lowers the priority of the scanning thread only."""
+        seen = {}
+
+        def scan():
+            seen['results'] = analyze_directory(self.test_dir, governor=ResourceGovernor(idle=True))
+            seen['nice'] = os.getpriority(os.PRIO_PROCESS, 0)
+            seen['policy'] = os.sched_getscheduler(0)
+
+        thread = threading.Thread(target=scan)
+        thread.start()
+        thread.join()
+
+        assert seen['results']['governor']['idle_cpu'] is True
+        assert seen['policy'] == os.SCHED_IDLE or seen['nice'] == 19
+        assert os.sched_getscheduler(0) != os.SCHED_IDLE
+
+    def test_render_throttling_metrics(self):
+        """Throttling counters are exported with the other scan gauges."""
+        results = analyze_directory(self.test_dir, governor=ResourceGovernor(memory_limit=1, memory_pause=0))
+        text = render_metrics(results, {'scans': 1, 'duration_seconds': 1.0, 'finished_at': 0.0})
+
+        assert 'lines_counter_read_throttle_waits 0' in text
+        assert 'lines_counter_memory_backpressure_events 1' in text
+        assert 'lines_counter_memory_pause_seconds 0.000000' in text
+        assert 'lines_counter_peak_rss_bytes' in text
@@ -0,0 +1,139 @@
+"""
+Tests for generated, minified and vendored file detection.
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directory
+from lines_counter.heuristics import (
+    GENERATED, MINIFIED, VENDORED, GeneratedFileFilter,
+    classify_head, classify_path, count_newlines,
+)
+
+
+class TestHeuristics:
+    """Test cases for the heuristics stage."""
+
+    def setup_method(self):
+        """Create a project mixing hand-written, generated and vendored files."""
+        self.test_dir = Path(__file__).parent / "test_heuristics"
+        self.test_dir.mkdir(exist_ok=True)
+        (self.test_dir / "vendor" / "lib").mkdir(parents=True, exist_ok=True)
+        (self.test_dir / "main.py").write_text("# main\nx = 1\n\ny = 2\n")
+        (self.test_dir / "vendor" / "lib" / "dep.py").write_text("a = 1\nb = 2\n")
+        (self.test_dir / "app.min.js").write_text("var a=1;" * 10 + "\n")
+        (self.test_dir / "bundle.js").write_text("var a=1;" * 1000)
+        (self.test_dir / "api_pb.py").write_text("# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n")
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_classify_path(self):
+        """Vendor directories, minified suffixes, lockfiles and large JSON are recognised by name."""
+        assert classify_path('vendor/lib/dep.py', 10) == VENDORED
+        assert classify_path('src/Third_Party/x.c', 10) == VENDORED
+        assert classify_path('static/app.min.js', 10) == MINIFIED
+        assert classify_path('package-lock.json', 10) == GENERATED
+        assert classify_path('proto/api_pb2.py', 10) == GENERATED
+        assert classify_path('data/dump.json', 10 * 1024 * 1024) == GENERATED
+        assert classify_path('config/settings.json', 100) is None
+        assert classify_path('vendor.py', 100) is None
+        assert classify_path('extern/bindings.c', 100) is None
+
+    def test_classify_head(self):
+        """Generated markers in the first lines and very long lines are recognised from the first block."""
+        assert classify_head(b'// Code generated by protoc-gen-go. DO NOT EDIT.\npackage x\n', 100) == GENERATED
+        assert classify_head(b'x = 1\n' * 10 + b'# generated by hand\n', 100) is None
+        assert classify_head(b'a' * 4096, 100000) == MINIFIED
+        assert classify_head((b'a' * 999 + b'\n') * 4, 4000) == MINIFIED
+        assert classify_head(b'x = 1\n' * 500, 3000) is None
+
+    def test_count_newlines(self):
+        """Newline-only counting agrees with line counting, with or without a final newline."""
+        assert count_newlines(b'a\nb\nc') == 3
+        assert count_newlines(b'a\n') == 1
+        assert count_newlines(b'') == 0
+
+    def test_unknown_mode(self):
+        """Only 'skip' and 'count' are accepted."""
+        with pytest.raises(ValueError):
+            GeneratedFileFilter('full')
+
+    def test_skip_mode(self):
+        """Flagged files are left out of the totals and listed in the generated section."""
+        results = analyze_directory(self.test_dir, generated='skip')
+
+        assert [f['path'] for f in results['files']] == ['main.py']
+        assert results['summary']['total_files'] == 1
+        kinds = {record['path']: record['kind'] for record in results['generated']}
+        assert kinds == {
+            os.path.join('vendor', 'lib', 'dep.py'): VENDORED,
+            'app.min.js': MINIFIED,
+            'bundle.js': MINIFIED,
+            'api_pb.py': GENERATED,
+        }
+        assert all('lines' not in record for record in results['generated'])
+
+    def test_count_mode(self):
+        """Flagged files get a newline-only line count."""
+        results = analyze_directory(self.test_dir, generated='count')
+
+        lines = {record['path']: record['lines'] for record in results['generated']}
+        assert lines[os.path.join('vendor', 'lib', 'dep.py')] == 2
+        assert lines['bundle.js'] == 1
+        assert lines['api_pb.py'] == 2
+        assert results['summary']['total_files'] == 1
+
+    def test_count_mode_wide_encodings(self):
+        """Flagged UTF-16 and UTF-32 files are counted by character, not by 0x0A byte."""
+        # U+010A is 0x0A 0x01 in UTF-16-LE
+        text = "\u010a = 1\nb = 2\n"
+        (self.test_dir / "vendor" / "wide16.py").write_bytes(text.encode('utf-16'))
+        (self.test_dir / "vendor" / "wide32.py").write_bytes(text.encode('utf-32'))
+        results = analyze_directory(self.test_dir, generated='count')
+
+        lines = {record['path']: record['lines'] for record in results['generated']}
+        assert lines[os.path.join('vendor', 'wide16.py')] == 2
+        assert lines[os.path.join('vendor', 'wide32.py')] == 2
+
+    def test_count_mode_binary_vendored_file(self):
+        """A binary file flagged by its path is listed without a line count."""
+        (self.test_dir / "vendor" / "data.json").write_bytes(b"\x00\x0a\x01\x0a" * 100)
+        results = analyze_directory(self.test_dir, generated='count')
+
+        assert {'path': os.path.join('vendor', 'data.json'), 'kind': VENDORED} in results['generated']
+
+    def test_disabled_by_default(self):
+        """Without a mode every file is classified as before."""
+        results = analyze_directory(self.test_dir)
+
+        assert 'generated' not in results
+        assert results['summary']['total_files'] == 5
+
+    def test_cache_entries_depend_on_mode(self):
+        """Cached results of one mode are not reused by another."""
+        old = time.time() - 60
+        for path in self.test_dir.rglob('*'):
+            os.utime(path, (old, old))
+        cache = ScanCache()
+        skipped = analyze_directory(self.test_dir, generated='skip', cache=cache)
+        skipped.pop('cache')
+
+        results = analyze_directory(self.test_dir, cache=cache)
+        assert results['summary']['total_files'] == 5
+
+        # Cached entries keep the kind of flagged files
+        results = analyze_directory(self.test_dir, generated='skip', cache=cache)
+        assert results.pop('cache')['file_hits'] == 5
+        assert results == skipped
+        results = analyze_directory(self.test_dir, generated='skip', cache=cache)
+        assert results['summary']['total_files'] == 1
+        assert results['cache']['file_hits'] == 5
@@ -0,0 +1,90 @@
+"""
+Tests for the historical trend mode.
+"""
+
+import io
+import json
+import shutil
+import pytest
+from pathlib import Path
+from lines_counter.git_source import analyze_revision
+from lines_counter.history import iter_history, prepare_resume, write_history
+from tests.test_git_source import git
+
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+
+class TestHistory:
+    """Test cases for iter_history and resuming."""
+    
+    def setup_method(self):
+        """Create a repository with additions, edits, renames and deletions."""
+        self.test_dir = Path(__file__).parent / "test_history_repo"
+        self.repo = self.test_dir / "work"
+        self.repo.mkdir(parents=True, exist_ok=True)
+        git(self.repo, 'init', '-q')
+        
+        steps = [
+            {'a.py': "x = 1\n"},
+            {'a.py': "x = 1\n# note\n", 'b.js': "// b\nlet b;\n"},
+            {'lib/c.py': "\n\nc = 3\n"},
+            {'b.js': None, 'lib/b.js': "// b\nlet b;\n"},
+            {'a.py': None, 'README.md': "# Title\n"},
+        ]
+        for changes in steps:
+            for name, content in changes.items():
+                target = self.repo / name
+                if content is None:
+                    target.unlink()
+                else:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_text(content)
+            git(self.repo, 'add', '-A')
+            git(self.repo, 'commit', '-q', '-m', 'step')
+        self.commits = git(self.repo, 'rev-list', '--reverse', 'HEAD').split()
+    
+    def teardown_method(self):
+        """Clean up the repository."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def test_deltas_match_full_counts(self):
+        """Every incrementally computed row equals a full recount of that commit."""
+        rows = list(iter_history(self.repo))
+        
+        assert [row['commit'] for row in rows] == self.commits
+        for row in rows:
+            full = analyze_revision(self.repo, row['commit'])
+            assert row['summary'] == full['summary']
+            assert row['languages'] == full['languages']
+    
+    def test_range_and_step(self):
+        """--from/--to are inclusive and --step samples every Nth commit."""
+        rows = list(iter_history(self.repo, from_rev=self.commits[1], to_rev=self.commits[4], step=2))
+        
+        assert [row['commit'] for row in rows] == [self.commits[1], self.commits[3]]
+    
+    def test_resume_produces_identical_output(self):
+        """An interrupted run resumed from its output file matches an uninterrupted one."""
+        expected = io.StringIO()
+        write_history(iter_history(self.repo), expected)
+        
+        output = self.test_dir / "history.jsonl"
+        lines = expected.getvalue().splitlines(keepends=True)
+        # Two complete rows followed by a partially written third row
+        output.write_text(lines[0] + lines[1] + lines[2][:20])
+        
+        resume_after = prepare_resume(output)
+        assert resume_after == self.commits[1]
+        
+        with open(output, 'a', encoding='utf-8') as f:
+            write_history(iter_history(self.repo, resume_after=resume_after), f)
+        
+        assert output.read_text() == expected.getvalue()
+        assert json.loads(output.read_text().splitlines()[-1])['commit'] == self.commits[-1]
+    
+    def test_invalid_step(self):
+        """Steps below one are rejected."""
+        with pytest.raises(ValueError):
+            list(iter_history(self.repo, step=0))
@@ -0,0 +1,94 @@
+"""
+Tests for inode-ordered reads and readahead hints.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from lines_counter.core import analyze_directory
+from lines_counter.iosched import HAVE_FADVISE, PREFETCH_BYTES, IOScheduler
+
+
+class TestIOScheduler:
+    """Test cases for IOScheduler and scheduled scans."""
+
+    def setup_method(self):
+        """Create files whose inode order differs from their name order."""
+        self.test_dir = Path(__file__).parent / "test_iosched"
+        self.test_dir.mkdir(exist_ok=True)
+        (self.test_dir / "sub").mkdir(exist_ok=True)
+        for index in reversed(range(20)):
+            (self.test_dir / f"file{index:02d}.py").write_text("# comment\n" + "x = 1\n" * index)
+        (self.test_dir / "sub" / "inner.py").write_text("y = 2\n\n")
+        (self.test_dir / "data.bin").write_bytes(b'\x00\x01' * 100)
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_order_by_inode(self):
+        """The planned order sorts files by device and inode."""
+        files = [(path, path.stat()) for path in sorted(self.test_dir.glob('*.py'))]
+        order = IOScheduler().order(files)
+
+        keys = [(files[i][1].st_dev, files[i][1].st_ino) for i in order]
+        assert keys == sorted(keys)
+        assert sorted(order) == list(range(len(files)))
+
+    def test_results_in_walk_order(self):
+        """Scheduled scans report the same results as unscheduled ones."""
+        plain = analyze_directory(self.test_dir)
+        scheduled = analyze_directory(self.test_dir, io_scheduler=IOScheduler(prefetch=4, drop_behind=True))
+
+        assert 'io' not in plain
+        io_stats = scheduled.pop('io')
+        assert scheduled == plain
+        if HAVE_FADVISE:
+            assert io_stats == {'prefetched': 21, 'dropped': 21}
+
+    def test_prefetch_disabled(self):
+        """A prefetch depth of 0 gives no hints."""
+        results = analyze_directory(self.test_dir, io_scheduler=IOScheduler(prefetch=0))
+
+        assert results['io'] == {'prefetched': 0, 'dropped': 0}
+        assert results['summary']['total_files'] == 21
+
+    @pytest.mark.skipif(not HAVE_FADVISE, reason="posix_fadvise not available")
+    def test_prefetch_window(self):
+        """Files are announced at most ``prefetch`` positions ahead of the reader, never behind it."""
+        files = [(path, path.stat()) for path in sorted(self.test_dir.glob('*.py'))]
+        scheduler = IOScheduler(prefetch=3)
+        scheduler.order(files)
+
+        scheduler.before_read(0)
+        assert scheduler.stats['prefetched'] == 4
+        scheduler.before_read(1)
+        assert scheduler.stats['prefetched'] == 5
+        scheduler.before_read(len(files) - 1)
+        assert scheduler.stats['prefetched'] == 6
+
+    @pytest.mark.skipif(not HAVE_FADVISE, reason="posix_fadvise not available")
+    @pytest.mark.parametrize('generated', [None, 'count'])
+    def test_sequential_advice_on_reader_descriptor(self, monkeypatch, generated):
+        """Sequential readahead is requested on the descriptor the reader is reading from."""
+        large = self.test_dir / "large.py"
+        large.write_text("x = 1\n" * (PREFETCH_BYTES // 6 + 1))
+        inode = large.stat().st_ino
+        advised = []
+        fadvise = os.posix_fadvise
+
+        def record(fd, offset, length, advice):
+            if advice == os.POSIX_FADV_SEQUENTIAL:
+                # A descriptor opened just for the hint would not have been read from yet
+                advised.append((os.fstat(fd).st_ino, os.lseek(fd, 0, os.SEEK_CUR) > 0))
+            fadvise(fd, offset, length, advice)
+
+        monkeypatch.setattr(os, 'posix_fadvise', record)
+        results = analyze_directory(self.test_dir, io_scheduler=IOScheduler(), generated=generated)
+
+        assert advised == [(inode, True)]
+        assert results['summary']['code_lines'] == sum(range(20)) + 1 + PREFETCH_BYTES // 6 + 1
@@ -0,0 +1,127 @@
+"""
+Tests for the OpenMetrics exporter.
+"""
+
+import shutil
+import threading
+import urllib.request
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from lines_counter import metrics
+from lines_counter.cli import main
+from lines_counter.metrics import CONTENT_TYPE, MetricsExporter, render_metrics
+
+
+class TestMetrics:
+    """Test cases for MetricsExporter."""
+    
+    def setup_method(self):
+        """Create a small project."""
+        self.test_dir = Path(__file__).parent / "test_metrics"
+        self.test_dir.mkdir(exist_ok=True)
+        (self.test_dir / "main.py").write_text("# main\nx = 1\n\n")
+        (self.test_dir / "app.js").write_text('// app\nconst s = "a";\n')
+    
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def test_render_before_first_scan(self):
+        """Before a scan finishes only the up gauge and scan counter are exported."""
+        text = render_metrics(None, {'scans': 0})
+        
+        assert 'lines_counter_up 0' in text
+        assert 'lines_counter_files' not in text
+        assert text.endswith('# EOF\n')
+    
+    def test_snapshot_after_scan(self):
+        """A scan publishes summary, per-language and scan gauges."""
+        exporter = MetricsExporter(self.test_dir)
+        exporter.scan_once()
+        text = exporter.snapshot
+        
+        assert 'lines_counter_up 1' in text
+        assert 'lines_counter_scans_total 1' in text
+        assert 'lines_counter_files 2' in text
+        assert 'lines_counter_lines{kind="code"} 2' in text
+        assert 'lines_counter_language_lines{language="Python",kind="blank"} 1' in text
+        assert 'lines_counter_language_files{language="JavaScript"} 1' in text
+        assert 'lines_counter_scan_duration_seconds' in text
+        assert 'lines_counter_scan_files_per_second' in text
+        assert 'lines_counter_cache_hit_ratio' in text
+    
+    def test_scrape_does_not_scan(self):
+        """HTTP scrapes are served from the snapshot."""
+        exporter = MetricsExporter(self.test_dir)
+        exporter.scan_once()
+        server = exporter.make_server(port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            for _ in range(3):
+                with urllib.request.urlopen(url) as response:
+                    assert response.headers['Content-Type'] == CONTENT_TYPE
+                    body = response.read().decode()
+            assert 'lines_counter_scans_total 1' in body
+        finally:
+            server.shutdown()
+            server.server_close()
+    
+    def test_watch_detects_new_files(self):
+        """Adding a file changes a directory mtime, which triggers a rescan when watching."""
+        exporter = MetricsExporter(self.test_dir, watch=True)
+        exporter.scan_once()
+        assert not exporter.cache.directories_changed()
+        
+        (self.test_dir / "new.py").write_text("y = 2\n")
+        assert exporter.cache.directories_changed()
+    
+    def test_background_loop(self):
+        """start() scans in the background and stop() ends the loop."""
+        exporter = MetricsExporter(self.test_dir, interval=60)
+        exporter.start()
+        try:
+            for _ in range(200):
+                if 'lines_counter_up 1' in exporter.snapshot:
+                    break
+                threading.Event().wait(0.01)
+            assert 'lines_counter_up 1' in exporter.snapshot
+        finally:
+            exporter.stop()
+    
+    def test_failed_scans_are_counted(self, monkeypatch):
+        """A failing background scan is counted and the last good metrics are kept."""
+        exporter = MetricsExporter(self.test_dir, interval=60)
+        exporter.scan_once()
+        
+        def fail(*args, **kwargs):
+            raise OSError('disk gone')
+        
+        monkeypatch.setattr(metrics, 'analyze_directory', fail)
+        exporter.start()
+        try:
+            for _ in range(200):
+                if 'lines_counter_scan_errors_total 1' in exporter.snapshot:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            exporter.stop()
+        
+        text = exporter.snapshot
+        assert 'lines_counter_scan_errors_total 1' in text
+        assert 'lines_counter_scans_total 1' in text
+        assert 'lines_counter_files 2' in text
+        assert exporter.last_error == 'OSError: disk gone'
+    
+    def test_interval_floor(self):
+        """Intervals that would rescan in a tight loop are rejected."""
+        with pytest.raises(ValueError):
+            MetricsExporter(self.test_dir, interval=0)
+        
+        result = CliRunner().invoke(main, ['serve-metrics', str(self.test_dir), '--interval', '0'])
+        assert result.exit_code == 2
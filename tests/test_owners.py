@@ -0,0 +1,104 @@
+"""
+Tests for CODEOWNERS-based ownership rollups.
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from lines_counter.core import analyze_directory
+from lines_counter.owners import UNOWNED, CodeOwners
+from lines_counter.sampling import StratifiedSample
+
+
+CODEOWNERS = """
+# Default owners
+*                   @org/everyone
+*.js                @org/frontend   # inline comment
+/build/logs/        @org/build
+docs/*              docs@example.com
+apps/               @octocat
+/docs/reference/    @org/docs
+**/logs             @org/logs
+/apps/github
+src/**/test_*.py    @org/qa
+/scripts/           @alice @bob
+"""
+
+
+class TestOwners:
+    """Test cases for CodeOwners and the 'owners' result section."""
+
+    def setup_method(self):
+        """Create a project with a CODEOWNERS file."""
+        self.test_dir = Path(__file__).parent / "test_owners"
+        files = {
+            'main.py': "x = 1\n",
+            'web/app.js': "// c\nrun()\n",
+            'scripts/deploy.sh': "# c\necho\n\n",
+            'src/pkg/test_core.py': "assert True\n",
+            'docs/index.md': "text\n",
+        }
+        for name, content in files.items():
+            path = self.test_dir / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        self.codeowners = CodeOwners(CODEOWNERS)
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    @pytest.mark.parametrize('path, owners', [
+        ('main.py', ('@org/everyone',)),
+        ('deep/dir/app.js', ('@org/frontend',)),
+        ('build/logs/2024/run.txt', ('@org/logs',)),
+        ('docs/intro.md', ('docs@example.com',)),
+        ('docs/guide/intro.md', ('@org/everyone',)),
+        ('docs/reference/api.md', ('@org/docs',)),
+        ('x/apps/main.py', ('@octocat',)),
+        ('apps/github/main.py', ()),
+        ('src/test_a.py', ('@org/qa',)),
+        ('src/a/b/test_b.py', ('@org/qa',)),
+        ('src/a/b/core.py', ('@org/everyone',)),
+        ('scripts/deploy.sh', ('@alice', '@bob')),
+    ])
+    def test_last_match_wins(self, path, owners):
+        """Rules follow GitHub's CODEOWNERS semantics; the last matching rule wins."""
+        assert self.codeowners.owners_of(path) == owners
+
+    def test_anchored_and_escaped_patterns(self):
+        """Leading slashes anchor to the root; escaped spaces and '#' are literal."""
+        codeowners = CodeOwners("/README.md @root\nmy\\ file.txt @spaces\n\\#notes @hash\n[Section]\n")
+
+        assert codeowners.owners_of('README.md') == ('@root',)
+        assert codeowners.owners_of('sub/README.md') == ()
+        assert codeowners.owners_of('a/my file.txt') == ('@spaces',)
+        assert codeowners.owners_of('#notes') == ('@hash',)
+        assert len(codeowners) == 3
+
+    def test_owners_section(self):
+        """The scan totals the files of each owner; several owners each get the file."""
+        results = analyze_directory(self.test_dir, codeowners=self.codeowners)
+
+        assert list(results['owners']) == ['@alice', '@bob', '@org/everyone', '@org/frontend', '@org/qa',
+                                           'docs@example.com']
+        assert results['owners']['@alice'] == {
+            'files': 1, 'total_lines': 3, 'code_lines': 1, 'comment_lines': 1, 'blank_lines': 1
+        }
+        assert results['owners']['@org/frontend']['comment_lines'] == 1
+        assert 'owners' not in analyze_directory(self.test_dir)
+
+    def test_unowned_files(self):
+        """Files no rule assigns are totalled under UNOWNED."""
+        results = analyze_directory(self.test_dir, codeowners=CodeOwners("/src/ @org/core\n"))
+
+        assert results['owners']['@org/core']['files'] == 1
+        assert results['owners'][UNOWNED]['files'] == 4
+
+    def test_sampling_rejected(self):
+        """Owner totals are exact counts and cannot come from a sample."""
+        with pytest.raises(ValueError):
+            analyze_directory(self.test_dir, codeowners=self.codeowners, sample=StratifiedSample(0.5))
@@ -0,0 +1,119 @@
+"""
+Tests for the parallel execution backends.
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from lines_counter.cache import ScanCache
+from lines_counter.checkpoint import Checkpoint
+from lines_counter.core import analyze_directories, analyze_directory
+from lines_counter.file_analyzer import FileAnalyzer
+from lines_counter.parallel import gil_enabled, resolve_backend
+
+
+class TestParallel:
+    """Test cases for thread and process backends."""
+
+    def setup_method(self):
+        """Create a tree with more files than one chunk, binary and generated files."""
+        self.test_dir = Path(__file__).parent / "test_parallel"
+        self.test_dir.mkdir(exist_ok=True)
+        for index in range(60):
+            package = self.test_dir / f"pkg{index % 4}"
+            package.mkdir(exist_ok=True)
+            (package / f"module{index}.py").write_text('"""Doc."""\n# comment\n' + "x = 1\n\n" * index)
+            (package / f"script{index}.js").write_text("// c\nlet a = 1;\n" * (index % 7))
+        (self.test_dir / "data.json").write_bytes(b'\x00\x01binary')
+        (self.test_dir / "api_pb2.py").write_text("# Generated. DO NOT EDIT!\nx = 1\n")
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_resolve_backend(self):
+        """'auto' picks threads without a GIL, processes with one and no pool for one worker."""
+        assert resolve_backend('auto', 1) == ('serial', 1)
+        assert resolve_backend('auto', 4) == ('process' if gil_enabled() else 'thread', 4)
+        assert resolve_backend('thread', 2) == ('thread', 2)
+        assert resolve_backend('serial', None)[1] >= 1
+        with pytest.raises(ValueError):
+            resolve_backend('gpu', 2)
+        with pytest.raises(ValueError):
+            resolve_backend('thread', 0)
+
+    @pytest.mark.parametrize('backend', ['thread', 'process'])
+    def test_results_identical(self, backend):
+        """Every backend gives exactly the serial result."""
+        serial = analyze_directory(self.test_dir, generated='count', extra_metrics=True, rollup_depth=1)
+        pooled = analyze_directory(self.test_dir, generated='count', extra_metrics=True, rollup_depth=1,
+                                   backend=backend, workers=3)
+
+        assert pooled == serial
+
+    def test_cache_and_checkpoint(self):
+        """Pooled scans fill and reuse the cache and resume from a checkpoint."""
+        old = time.time() - 60
+        for path in self.test_dir.rglob('*'):
+            os.utime(path, (old, old))
+        serial = analyze_directory(self.test_dir)
+        cache = ScanCache()
+        first = analyze_directory(self.test_dir, cache=cache, backend='thread', workers=2)
+        second = analyze_directory(self.test_dir, cache=cache, backend='thread', workers=2)
+
+        assert first.pop('cache')['file_misses'] == 122
+        assert second.pop('cache')['file_hits'] == 122
+        assert first == second == serial
+
+        journal = self.test_dir.parent / "test_parallel.journal"
+        partial = analyze_directory(self.test_dir, max_files=50, checkpoint=Checkpoint(journal),
+                                    backend='thread', workers=2)
+        resumed = analyze_directory(self.test_dir, checkpoint=Checkpoint(journal, resume=True),
+                                    backend='thread', workers=2)
+
+        assert partial['incomplete']['files_analyzed'] == 50
+        assert resumed == serial
+        assert not journal.exists()
+
+    def test_max_files_and_progress(self):
+        """Limits and progress reports work the same with a pool."""
+        calls = []
+        results = analyze_directory(self.test_dir, max_files=20, backend='thread', workers=2,
+                                    progress_callback=lambda done, total, path: calls.append(done))
+
+        assert results['incomplete']['files_analyzed'] == 20
+        assert calls == list(range(1, 21))
+
+    def test_batch_shares_pool(self):
+        """analyze_directories gives the same roots with a pool."""
+        roots = [self.test_dir / "pkg0", self.test_dir / "pkg1"]
+
+        assert analyze_directories(roots, backend='thread', workers=2) == analyze_directories(roots)
+
+    def test_analyzer_is_immutable_and_thread_safe(self):
+        """Configuration cannot be changed in place and concurrent calls agree with serial ones."""
+        analyzer = FileAnalyzer({'.py'}, {'.git'})
+        assert analyzer.include_extensions == frozenset({'.py'})
+        with pytest.raises(AttributeError):
+            analyzer.include_extensions.add('.js')
+
+        files = sorted(self.test_dir.rglob('module*.py'))
+        expected = [analyzer.analyze_lines(path) for path in files]
+        results = [None] * 8
+
+        def work(slot):
+            results[slot] = [analyzer.analyze_lines(path) for path in files]
+
+        threads = [threading.Thread(target=work, args=(slot,)) for slot in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(result == expected for result in results)
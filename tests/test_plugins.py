@@ -0,0 +1,163 @@
+"""
+Tests for classifier plugins.
+"""
+
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from lines_counter import plugins
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directory
+from lines_counter.file_analyzer import FileAnalyzer
+from lines_counter.plugins import Classifier, MarkerClassifier, installed_classifiers
+
+
+TEMPLATE = MarkerClassifier('Template', ['.tpl'], single=('##', '%#'), blocks=[('{#', '#}'), ('<!--', '-->')],
+                            nested=True)
+
+
+class BrokenClassifier(Classifier):
+    """Classifier whose count always fails."""
+
+    language = 'Broken'
+    extensions = ('.brk',)
+
+    def count(self, data):
+        raise RuntimeError('cannot classify')
+
+
+class IncompleteClassifier(Classifier):
+    """Classifier that forgot to implement count."""
+
+    language = 'Incomplete'
+    extensions = ('.inc',)
+
+
+class FakeEntryPoint:
+    """Stand-in for an importlib.metadata entry point."""
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+
+    def load(self):
+        if isinstance(self.target, Exception):
+            raise self.target
+        return self.target
+
+
+class TestPlugins:
+    """Test cases for Classifier plugins and their discovery."""
+
+    def setup_method(self):
+        """Create a project with template and Python files."""
+        self.test_dir = Path(__file__).parent / "test_plugins"
+        self.test_dir.mkdir(exist_ok=True)
+        for index in range(12):
+            (self.test_dir / f"page{index}.tpl").write_text(
+                "<p>{{ title }}</p>\n## note\n{# outer {# inner #}\nstill comment #}\n\n%# other\n"
+            )
+            (self.test_dir / f"mod{index}.py").write_text("# module\nx = 1\n")
+        installed_classifiers.cache_clear()
+
+    def teardown_method(self):
+        """Clean up test files."""
+        installed_classifiers.cache_clear()
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_marker_classifier(self):
+        """Several single-line markers and nested blocks are comments."""
+        counts = TEMPLATE.count(b"<p>x</p>\n## a\n{# a {# b #}\nc #}\nd\n\n%# e\n<!-- f -->\n")
+
+        assert counts == {'total': 8, 'code': 2, 'comments': 5, 'blank': 1}
+
+    def test_unnested_blocks_close_at_first_end(self):
+        """Without nesting the first end delimiter closes the block."""
+        classifier = MarkerClassifier('C-like', ['.x'], blocks=[('/*', '*/')])
+
+        assert classifier.count(b"/* a /* b */\ncode\n") == {'total': 2, 'code': 1, 'comments': 1, 'blank': 0}
+
+    def test_analyzer_uses_classifier(self):
+        """Plugins add languages and take precedence over built-in patterns."""
+        html = MarkerClassifier('Jinja HTML', ['.html'], blocks=[('{#', '#}')])
+        analyzer = FileAnalyzer(classifiers=[TEMPLATE, html])
+
+        assert analyzer.is_supported_file(Path('page.tpl'))
+        assert analyzer.get_file_language(Path('page.TPL')) == 'Template'
+        assert analyzer.get_file_language(Path('index.html')) == 'Jinja HTML'
+        assert analyzer.inspect_content(b'{# c #}\n<!-- code here -->\n', Path('index.html')) == (
+            {'total': 2, 'code': 1, 'comments': 1, 'blank': 0}, 'utf-8'
+        )
+        assert analyzer.classifiers == (TEMPLATE, html)
+
+    def test_metrics_with_classifier(self):
+        """Extra metrics are gathered for plugin languages too."""
+        analyzer = FileAnalyzer(extra_metrics=True, classifiers=[TEMPLATE])
+        counts, _ = analyzer.inspect_content(b'## c\n    x\n', Path('a.tpl'))
+
+        assert counts['comments'] == 1
+        assert counts['metrics'] == {'longest_line': 5, 'average_line_length': 4.5, 'max_indent': 4,
+                                     'trailing_whitespace_lines': 0, 'bytes': 11}
+
+    def test_invalid_classifier(self):
+        """Classifiers without a language or extensions are rejected."""
+        with pytest.raises(TypeError):
+            FileAnalyzer(classifiers=[MarkerClassifier('', ['.x'])])
+        with pytest.raises(TypeError):
+            FileAnalyzer(classifiers=[MarkerClassifier('X', ['x'])])
+
+    def test_entry_point_discovery(self, monkeypatch):
+        """Installed plugins are loaded once; broken ones are skipped with a warning."""
+        monkeypatch.setattr(plugins, '_entry_points', lambda: [
+            FakeEntryPoint('template', lambda: TEMPLATE),
+            FakeEntryPoint('missing', ImportError('no module named tpl_plugin')),
+            FakeEntryPoint('invalid', object),
+            FakeEntryPoint('incomplete', IncompleteClassifier),
+        ])
+
+        with pytest.warns(RuntimeWarning) as warned:
+            assert installed_classifiers() == (TEMPLATE,)
+        assert len(warned) == 3
+        assert 'abstract' in str(warned[2].message)
+        assert installed_classifiers() == (TEMPLATE,)
+
+        results = analyze_directory(self.test_dir)
+        assert results['languages']['Template']['files'] == 12
+        assert 'Template' not in analyze_directory(self.test_dir, classifiers=[])['languages']
+
+    @pytest.mark.parametrize('backend', ['thread', 'process'])
+    def test_pool_backends(self, backend):
+        """Plugins run in pool workers with the same result as a serial scan."""
+        serial = analyze_directory(self.test_dir, classifiers=[TEMPLATE])
+        pooled = analyze_directory(self.test_dir, classifiers=[TEMPLATE], backend=backend, workers=2)
+
+        assert pooled == serial
+        assert serial['languages']['Template'] == {
+            'files': 12, 'total_lines': 72, 'code_lines': 12, 'comment_lines': 48, 'blank_lines': 12
+        }
+
+    def test_failing_classifier_is_an_error(self):
+        """A classifier that raises puts the file in the 'errors' section."""
+        (self.test_dir / "bad.brk").write_text("x\n")
+        results = analyze_directory(self.test_dir, classifiers=[BrokenClassifier()])
+
+        assert results['errors'] == [{'path': 'bad.brk', 'error': 'error',
+                                      'detail': 'RuntimeError: cannot classify', 'attempts': 1}]
+
+    def test_cache_separates_classifiers(self):
+        """Cached results of a plugin are not reused without it."""
+        old = time.time() - 60
+        for path in self.test_dir.iterdir():
+            os.utime(path, (old, old))
+        cache = ScanCache()
+        override = MarkerClassifier('Python', ['.py'], single=('x',))
+
+        analyze_directory(self.test_dir, classifiers=[override], cache=cache)
+        results = analyze_directory(self.test_dir, classifiers=[], cache=cache)
+
+        assert results['languages']['Python']['comment_lines'] == 12
@@ -0,0 +1,96 @@
+"""
+Tests for progress reporting, scan limits and cancellation.
+"""
+
+import io
+import json
+import shutil
+from pathlib import Path
+from click.testing import CliRunner
+from lines_counter.cli import main
+from lines_counter.core import analyze_directory
+from lines_counter.progress import CancellationToken, ProgressBar
+
+
+class TestProgress:
+    """Test cases for progress callbacks and partial results."""
+    
+    def setup_method(self):
+        """Create a directory with a handful of files."""
+        self.test_dir = Path(__file__).parent / "test_progress"
+        self.test_dir.mkdir(exist_ok=True)
+        for i in range(5):
+            (self.test_dir / f"mod{i}.py").write_text("# doc\n" + "x = 1\n" * (i + 1))
+    
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def assert_consistent(self, results):
+        """The summary of a (partial) result matches its file list."""
+        assert results['summary']['total_files'] == len(results['files'])
+        assert results['summary']['total_lines'] == sum(f['lines']['total'] for f in results['files'])
+    
+    def test_progress_callback(self):
+        """The callback is called once per file with a growing count."""
+        calls = []
+        results = analyze_directory(self.test_dir, progress_callback=lambda done, total, path: calls.append((done, total)))
+        
+        assert calls == [(i, 5) for i in range(1, 6)]
+        assert 'incomplete' not in results
+    
+    def test_path_named_like_a_subcommand(self, monkeypatch):
+        """An existing directory named like a subcommand is counted, not run as one."""
+        (self.test_dir / "history").mkdir()
+        (self.test_dir / "history" / "old.py").write_text("x = 1\n")
+        monkeypatch.chdir(self.test_dir)
+        
+        for args in (['history'], ['history', '--no-server']):
+            result = CliRunner().invoke(main, args)
+            assert result.exit_code == 0, result.output
+            assert json.loads(result.output)['files'][0]['path'] == 'old.py'
+    
+    def test_max_files(self):
+        """max_files returns a consistent partial result."""
+        results = analyze_directory(self.test_dir, max_files=2)
+        
+        assert results['summary']['total_files'] == 2
+        assert results['incomplete'] == {
+            'reason': 'max_files', 'files_analyzed': 2, 'files_pending': 3, 'walk_finished': True
+        }
+        self.assert_consistent(results)
+    
+    def test_time_budget(self):
+        """An exhausted time budget stops the scan."""
+        results = analyze_directory(self.test_dir, time_budget=0)
+        
+        assert results['incomplete']['reason'] == 'time_budget'
+        self.assert_consistent(results)
+    
+    def test_cancellation(self):
+        """Cancelling from the progress callback stops at the next file."""
+        token = CancellationToken()
+        
+        def cancel_after_three(done, total, path):
+            if done == 3:
+                token.cancel()
+        
+        results = analyze_directory(self.test_dir, progress_callback=cancel_after_three, cancel_token=token)
+        
+        assert results['incomplete']['reason'] == 'cancelled'
+        assert results['summary']['total_files'] == 3
+        self.assert_consistent(results)
+    
+    def test_progress_bar(self):
+        """The progress bar reports files/s and an ETA."""
+        stream = io.StringIO()
+        bar = ProgressBar(stream=stream, interval=0)
+        bar(1, 4)
+        bar(4, 4)
+        bar.close()
+        
+        output = stream.getvalue()
+        assert '4/4 files' in output
+        assert 'files/s' in output and 'ETA' in output
+        assert output.endswith('\n') and not output.endswith('\n\n')
@@ -0,0 +1,177 @@
+"""
+Tests for read deadlines, retries and the 'errors' section.
+"""
+
+import errno
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from lines_counter import core
+from lines_counter.core import analyze_directory
+from lines_counter.plugins import Classifier
+from lines_counter.readpolicy import ReadError, ReadPolicy, classify_error
+
+
+class SlowClassifier(Classifier):
+    """Classifier taking longer than the read deadline of the tests."""
+
+    language = 'Slow'
+    extensions = ('.slow',)
+
+    def count(self, data):
+        time.sleep(0.5)
+        lines = len(self.split_lines(data))
+        return {'total': lines, 'code': lines, 'comments': 0, 'blank': 0}
+
+
+class TestReadPolicy:
+    """Test cases for ReadPolicy and error accounting in scans."""
+
+    def setup_method(self):
+        """Create a project of ten small files."""
+        self.test_dir = Path(__file__).parent / "test_readpolicy"
+        self.test_dir.mkdir(exist_ok=True)
+        for index in range(10):
+            (self.test_dir / f"mod{index}.py").write_text("# module\nx = 1\n")
+        self.release = threading.Event()
+
+    def teardown_method(self):
+        """Release hung reads and clean up test files."""
+        self.release.set()
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_classify_error(self):
+        """Exceptions map to the reported reasons."""
+        assert classify_error(PermissionError(errno.EACCES, 'denied')) == 'permission'
+        assert classify_error(FileNotFoundError(errno.ENOENT, 'gone')) == 'vanished'
+        assert classify_error(OSError(errno.ESTALE, 'stale')) == 'vanished'
+        assert classify_error(OSError(errno.EIO, 'io')) == 'io'
+        assert classify_error(TimeoutError()) == 'timeout'
+        assert classify_error(UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'bad')) == 'decode'
+        assert classify_error(ValueError()) == 'error'
+
+    def test_transient_errors_are_retried(self):
+        """EIO is retried up to the limit; other errors are not."""
+        calls = []
+
+        def flaky(fail_times):
+            calls.append(1)
+            if len(calls) <= fail_times:
+                raise OSError(errno.EIO, 'Input/output error')
+            return 'ok'
+
+        policy = ReadPolicy(retries=2, backoff=0)
+        assert policy.call(flaky, 2) == 'ok'
+        assert len(calls) == 3
+
+        calls.clear()
+        failed = policy.call(flaky, 5)
+        assert failed == ReadError('io', 'OSError: [Errno 5] Input/output error', 3)
+
+        failed = policy.call(open, self.test_dir / 'missing.py')
+        assert failed.reason == 'vanished'
+        assert failed.attempts == 1
+
+    def test_deadline_abandons_hung_read(self):
+        """A read past its deadline times out and the next read still runs."""
+        policy = ReadPolicy(timeout=0.1)
+        try:
+            started = time.monotonic()
+            failed = policy.call(self.release.wait)
+            assert failed.reason == 'timeout'
+            assert failed.attempts == 1
+            assert time.monotonic() - started < 1
+            assert policy.call(lambda: 'next') == 'next'
+        finally:
+            policy.close()
+
+    def test_process_runs_outside_deadline(self):
+        """Only the read is timed; errors raised while processing the content are reported."""
+        policy = ReadPolicy(timeout=0.1)
+        try:
+            assert policy.call(lambda: b'data', process=lambda data: time.sleep(0.3) or len(data)) == 4
+            failed = policy.call(lambda: b'\xff', process=lambda data: data.decode('utf-8'))
+            assert failed.reason == 'decode'
+        finally:
+            policy.close()
+
+    @pytest.mark.parametrize('backend', ['serial', 'thread'])
+    def test_slow_classifier_is_not_a_timeout(self, backend):
+        """A file read in time but slow to classify is counted, not reported as timed out."""
+        (self.test_dir / "data.slow").write_text("a\nb\n")
+        results = analyze_directory(self.test_dir, read_policy=ReadPolicy(timeout=0.1),
+                                    classifiers=[SlowClassifier()], backend=backend, workers=2)
+
+        assert results['errors'] == []
+        assert results['languages']['Slow']['total_lines'] == 2
+
+    def test_invalid_policy(self):
+        """Deadlines must be positive and retries not negative."""
+        with pytest.raises(ValueError):
+            ReadPolicy(timeout=0)
+        with pytest.raises(ValueError):
+            ReadPolicy(retries=-1)
+
+    def test_vanished_file_is_reported(self):
+        """A file deleted between walk and read is listed in 'errors'."""
+        def delete_next(done, total, path):
+            if done == 1:
+                (self.test_dir / 'mod1.py').unlink()
+
+        results = analyze_directory(self.test_dir, progress_callback=delete_next)
+
+        assert results['summary']['total_files'] == 9
+        assert results['errors'] == [
+            {'path': 'mod1.py', 'error': 'vanished', 'detail': results['errors'][0]['detail'], 'attempts': 1}
+        ]
+        assert results['errors'][0]['detail'].startswith('FileNotFoundError')
+
+    def test_errors_reach_the_sink(self, monkeypatch):
+        """Files failing outside the read are listed in 'errors' and passed to the sink."""
+        class ListSink(list):
+            add = list.append
+
+        make_record = core._make_record
+
+        def failing_record(analyzer, file_path, *args):
+            if file_path.name == 'mod1.py':
+                raise OSError(errno.EIO, 'I/O error')
+            return make_record(analyzer, file_path, *args)
+
+        monkeypatch.setattr(core, '_make_record', failing_record)
+        sink = ListSink()
+        results = analyze_directory(self.test_dir, sink=sink)
+
+        assert [error['path'] for error in results['errors']] == ['mod1.py']
+        assert [record for record in sink if 'error' in record] == results['errors']
+        assert len(sink) == 10
+
+    def test_clean_scan_has_empty_errors(self):
+        """A scan without failures reports an empty 'errors' section."""
+        assert analyze_directory(self.test_dir)['errors'] == []
+
+    @pytest.mark.parametrize('backend', ['serial', 'thread'])
+    def test_hung_reads_do_not_stall_scan(self, backend, monkeypatch):
+        """Hung reads time out per file while the other files are counted."""
+        read_file = core._read_file
+
+        def hanging_read(analyzer, file_path, *args):
+            if file_path.name in ('mod3.py', 'mod7.py'):
+                self.release.wait()
+            return read_file(analyzer, file_path, *args)
+
+        monkeypatch.setattr(core, '_read_file', hanging_read)
+        started = time.monotonic()
+        results = analyze_directory(self.test_dir, read_policy=ReadPolicy(timeout=0.2),
+                                    backend=backend, workers=2)
+
+        assert time.monotonic() - started < 3
+        assert results['summary']['total_files'] == 8
+        assert [(error['path'], error['error']) for error in results['errors']] == [
+            ('mod3.py', 'timeout'), ('mod7.py', 'timeout')
+        ]
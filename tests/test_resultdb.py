@@ -0,0 +1,111 @@
+"""
+Tests for the SQLite result database.
+"""
+
+import json
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from lines_counter.core import analyze_directory
+from lines_counter.resultdb import (
+    SqliteWriter, open_results, run_query, run_sql, write_results_to_sqlite,
+)
+
+
+class TestResultDatabase:
+    """Test cases for SqliteWriter and the named queries."""
+
+    def setup_method(self):
+        """Create a small service tree."""
+        self.test_dir = Path(__file__).parent / "test_resultdb"
+        self.db_path = Path(__file__).parent / "test_resultdb.db"
+        for service in ('services/api', 'services/web', 'tools'):
+            (self.test_dir / service).mkdir(parents=True, exist_ok=True)
+        (self.test_dir / "services" / "api" / "main.go").write_text("// main\npackage main\n" + "x := 1\n" * 50)
+        (self.test_dir / "services" / "api" / "util.go").write_text("package main\n\n")
+        (self.test_dir / "services" / "web" / "app.py").write_text("# app\n# more\nx = 1\n")
+        (self.test_dir / "services-old.go").write_text("package old\n")
+        (self.test_dir / "tools" / "build.py").write_text("import os\n")
+        (self.test_dir / "data.json").write_bytes(bytes(range(256)) * 4)
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def _write(self, **options):
+        writer = SqliteWriter(self.db_path, batch_size=2)
+        results = analyze_directory(self.test_dir, sink=writer, **options)
+        writer.finish(results)
+        return results
+
+    def test_tables_match_results(self):
+        """Files, languages and meta sections round-trip through the database."""
+        results = self._write()
+        conn = open_results(self.db_path)
+
+        assert run_query(conn, 'summary') == [results['summary']]
+        languages = {row.pop('language'): row for row in run_query(conn, 'languages')}
+        assert languages == results['languages']
+        paths = [row['path'] for row in run_sql(conn, 'SELECT path FROM files ORDER BY path')]
+        assert paths == sorted(Path(f['path']).as_posix() for f in results['files'])
+        skipped = json.loads(run_sql(conn, "SELECT value FROM meta WHERE key = 'skipped'")[0]['value'])
+        assert skipped == results['skipped']
+
+    def test_files_query(self):
+        """Files are filtered by language, directory prefix and size."""
+        self._write()
+        conn = open_results(self.db_path)
+
+        rows = run_query(conn, 'files', language='Go', under='services/')
+        assert [row['path'] for row in rows] == ['services/api/main.go', 'services/api/util.go']
+        rows = run_query(conn, 'files', language='Go', under='services', min_lines=10)
+        assert [row['path'] for row in rows] == ['services/api/main.go']
+        assert len(run_query(conn, 'files', limit=2)) == 2
+
+    def test_directories_query(self):
+        """Directories carry totals of everything below them and a comment ratio."""
+        self._write()
+        conn = open_results(self.db_path)
+
+        rows = {row['path']: row for row in run_query(conn, 'directories')}
+        assert rows['.']['files'] == 5
+        assert rows['services']['files'] == 3
+        assert rows['services/api']['depth'] == 2
+        assert rows['services/web']['comment_ratio'] == pytest.approx(2 / 3, abs=1e-4)
+        rows = run_query(conn, 'directories', under='services', depth=1)
+        assert [row['path'] for row in rows] == ['services']
+
+    def test_metrics_columns(self):
+        """Extra metrics fill the optional file columns."""
+        self._write(extra_metrics=True, backend='thread', workers=2)
+        conn = open_results(self.db_path)
+
+        row = run_sql(conn, "SELECT bytes, longest_line FROM files WHERE path = 'tools/build.py'")[0]
+        assert row == {'bytes': 10, 'longest_line': 9}
+
+    def test_failed_scan_keeps_previous_database(self):
+        """The output is only replaced once the writer finishes."""
+        self._write()
+        writer = SqliteWriter(self.db_path)
+        writer.add(analyze_directory(self.test_dir)['files'][0])
+        writer.close()
+
+        assert run_sql(open_results(self.db_path), 'SELECT COUNT(*) AS n FROM files') == [{'n': 5}]
+        assert list(self.db_path.parent.glob(self.db_path.name + '*')) == [self.db_path]
+
+    def test_write_results_and_read_only(self):
+        """Existing results can be converted, and the query connection cannot write."""
+        write_results_to_sqlite(analyze_directory(self.test_dir), self.db_path)
+        conn = open_results(self.db_path)
+
+        assert run_sql(conn, 'SELECT COUNT(*) AS n FROM files') == [{'n': 5}]
+        with pytest.raises(sqlite3.OperationalError):
+            run_sql(conn, 'DELETE FROM files')
+        with pytest.raises(ValueError):
+            run_query(conn, 'everything')
@@ -0,0 +1,99 @@
+"""
+Tests for per-directory rollups.
+"""
+
+import os
+import shutil
+import time
+import pytest
+from pathlib import Path
+from lines_counter.cache import ScanCache
+from lines_counter.core import analyze_directory, load_results_from_json, save_results_to_json
+from lines_counter.rollup import DirectoryRollup, get_directory_totals
+
+
+class TestRollup:
+    """Test cases for the 'tree' section and directory queries."""
+    
+    def setup_method(self):
+        """Create a tree with nested packages."""
+        self.test_dir = Path(__file__).parent / "test_rollup"
+        payments = self.test_dir / "services" / "payments" / "api"
+        payments.mkdir(parents=True, exist_ok=True)
+        (self.test_dir / "services" / "auth").mkdir(parents=True, exist_ok=True)
+        
+        (self.test_dir / "setup.py").write_text("x = 1\n")
+        (self.test_dir / "services" / "payments" / "core.py").write_text("# c\nx = 1\n\n")
+        (payments / "views.py").write_text("y = 2\nz = 3\n")
+        (self.test_dir / "services" / "auth" / "login.js").write_text("// login\n")
+    
+    def teardown_method(self):
+        """Clean up the tree."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def test_tree_section(self):
+        """Each directory up to the depth holds the totals of its subtree."""
+        results = analyze_directory(self.test_dir, rollup_depth=2)
+        tree = results['tree']
+        
+        assert tree['depth'] == 2
+        assert tree['columns'] == ['files', 'total_lines', 'code_lines', 'comment_lines', 'blank_lines']
+        assert tree['directories']['.'] == [4, 7, 4, 2, 1]
+        assert tree['directories']['services'] == [3, 6, 3, 2, 1]
+        assert tree['directories']['services/payments'] == [2, 5, 3, 1, 1]
+        assert 'services/payments/api' not in tree['directories']
+    
+    def test_no_tree_by_default(self):
+        """The rollup is optional."""
+        assert 'tree' not in analyze_directory(self.test_dir)
+    
+    def test_directory_queries(self):
+        """Totals can be queried from the tree and beyond its depth."""
+        results = analyze_directory(self.test_dir, rollup_depth=1)
+        json_file = self.test_dir / "results.json"
+        save_results_to_json(results, json_file)
+        loaded = load_results_from_json(json_file)
+        
+        assert get_directory_totals(loaded, 'services')['files'] == 3
+        # Deeper than the tree: answered from the file list
+        assert get_directory_totals(loaded, 'services/payments') == {
+            'files': 2, 'total_lines': 5, 'code_lines': 3, 'comment_lines': 1, 'blank_lines': 1
+        }
+        assert get_directory_totals(loaded, '.')['files'] == 4
+        assert get_directory_totals(loaded, 'missing') is None
+    
+    def test_tree_with_pool_and_sink(self):
+        """Files are added to the tree as they finish, in any order, and still reach the sink."""
+        class ListSink(list):
+            add = list.append
+        
+        sink = ListSink()
+        results = analyze_directory(self.test_dir, rollup_depth=2, backend='thread', workers=2, sink=sink)
+        
+        assert results['tree'] == analyze_directory(self.test_dir, rollup_depth=2)['tree']
+        assert sorted(record['path'] for record in sink) == sorted(f['path'] for f in results['files'])
+    
+    def test_cache_directory_totals(self):
+        """A ScanCache answers directory totals from its file results, also once saved and loaded."""
+        old = time.time() - 60
+        for path in self.test_dir.rglob('*'):
+            os.utime(path, (old, old))
+        cache_file = self.test_dir / "cache.json"
+        cache = ScanCache(cache_file)
+        analyze_directory(self.test_dir, cache=cache)
+        analyze_directory(self.test_dir, cache=cache, extra_metrics=True)
+        cache.save()
+        
+        loaded = ScanCache(cache_file).load()
+        assert loaded.directory_totals(self.test_dir / "services" / "payments") == {
+            'files': 2, 'total_lines': 5, 'code_lines': 3, 'comment_lines': 1, 'blank_lines': 1
+        }
+        assert loaded.directory_totals(self.test_dir)['files'] == 4
+        assert loaded.directory_totals(self.test_dir / "serv") is None
+        assert loaded.directory_totals(self.test_dir / "missing") is None
+    
+    def test_negative_depth(self):
+        """Negative depths are rejected."""
+        with pytest.raises(ValueError):
+            DirectoryRollup(-1)
@@ -0,0 +1,100 @@
+"""
+Tests for sampling estimates.
+"""
+
+import random
+import shutil
+from pathlib import Path
+
+import pytest
+
+from lines_counter.core import analyze_directory
+from lines_counter.sampling import StratifiedSample, size_bucket
+
+
+class TestSampling:
+    """Test cases for StratifiedSample and sampled scans."""
+
+    def setup_method(self):
+        """Create a few hundred files of varying size in three languages."""
+        self.test_dir = Path(__file__).parent / "test_sampling"
+        self.test_dir.mkdir(exist_ok=True)
+        rng = random.Random(42)
+        templates = {
+            '.py': ('# comment\n', 'x = compute(1, 2)\n'),
+            '.js': ('// comment\n', 'const value = compute(1, 2);\n'),
+            '.sql': ('-- comment\n', 'SELECT id FROM items;\n'),
+        }
+        for index in range(600):
+            extension = ('.py', '.js', '.sql')[index % 3]
+            comment, code = templates[extension]
+            length = int(rng.lognormvariate(3, 1.2))
+            lines = [rng.choice((comment, code, code, code, '\n')) for _ in range(length)]
+            (self.test_dir / f"file{index}{extension}").write_text(''.join(lines))
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_size_bucket(self):
+        """Sizes map to increasing buckets."""
+        assert size_bucket(0) == 0
+        assert size_bucket(1024) == 1
+        assert size_bucket(10 ** 9) == 4
+
+    def test_invalid_arguments(self):
+        """Fractions and confidence levels are range checked."""
+        with pytest.raises(ValueError):
+            StratifiedSample(0)
+        with pytest.raises(ValueError):
+            StratifiedSample(0.5, confidence=1)
+        with pytest.raises(ValueError):
+            analyze_directory(self.test_dir, sample=StratifiedSample(0.5), max_files=10)
+
+    def test_full_sample_is_exact(self):
+        """Sampling every file reproduces the full scan with zero-width intervals."""
+        full = analyze_directory(self.test_dir)
+        estimate = analyze_directory(self.test_dir, sample=StratifiedSample(1.0))
+
+        assert estimate['summary'] == full['summary']
+        assert estimate['languages'] == full['languages']
+        for key, value in full['summary'].items():
+            assert estimate['estimate']['summary'][key] == [value, value]
+
+    def test_estimates_match_full_scan(self):
+        """A quarter sample lands within a few percent and its 99% intervals cover the truth."""
+        full = analyze_directory(self.test_dir)
+        estimate = analyze_directory(self.test_dir, sample=StratifiedSample(0.25, confidence=0.99, seed=1))
+        info = estimate['estimate']
+
+        assert info['files_enumerated'] == 600
+        assert info['files_sampled'] < 200
+        assert len(estimate['files']) == info['files_sampled']
+        for key, value in full['summary'].items():
+            low, high = info['summary'][key]
+            assert low <= value <= high, key
+            assert abs(estimate['summary'][key] - value) <= 0.05 * value, key
+        for language, stats in full['languages'].items():
+            low, high = info['languages'][language]['code_lines']
+            assert low <= stats['code_lines'] <= high, language
+
+    def test_reproducible_with_seed(self):
+        """The same seed draws the same sample."""
+        first = analyze_directory(self.test_dir, sample=StratifiedSample(0.1, seed=3))
+        second = analyze_directory(self.test_dir, sample=StratifiedSample(0.1, seed=3))
+
+        assert first == second
+
+    def test_sample_reused_for_another_scan(self):
+        """A StratifiedSample passed to a second scan only estimates that scan's files."""
+        subdir = self.test_dir / "sub"
+        subdir.mkdir()
+        (subdir / "a.py").write_text("# a\nx = 1\n")
+        (subdir / "b.js").write_text("let b = 2;\n")
+        sample = StratifiedSample(1.0)
+        analyze_directory(self.test_dir, sample=sample)
+        estimate = analyze_directory(subdir, sample=sample)
+
+        assert estimate['summary'] == analyze_directory(subdir)['summary']
+        assert estimate['estimate']['files_enumerated'] == estimate['summary']['total_files']
@@ -0,0 +1,248 @@
+"""
+Tests for the resident analysis server.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from lines_counter import cli
+from lines_counter.core import analyze_directory
+from lines_counter.server import AnalysisClient, AnalysisServer, find_server, is_loopback, write_state_file
+
+
+class TestServer:
+    """Test cases for AnalysisServer and its client."""
+
+    def setup_method(self):
+        """Create a small project with timestamps outside the racy window."""
+        self.test_dir = Path(__file__).parent / "test_server"
+        self.test_dir.mkdir(exist_ok=True)
+        (self.test_dir / "src").mkdir(exist_ok=True)
+        (self.test_dir / "main.py").write_text("# main\nx = 1\n\n")
+        (self.test_dir / "src" / "app.js").write_text('// app\nconst s = "a";\n')
+        old = time.time() - 60
+        for path in [self.test_dir / "main.py", self.test_dir / "src" / "app.js",
+                     self.test_dir / "src", self.test_dir]:
+            os.utime(path, (old, old))
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def _start(self, analysis_server):
+        """Serve ``analysis_server`` on a free port in a background thread."""
+        server = analysis_server.make_http_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def test_results_match_local_scan(self):
+        """The server returns the same dict as analyze_directory."""
+        analysis_server = AnalysisServer()
+        results = analysis_server.analyze(str(self.test_dir), {'rollup_depth': 1})
+
+        expected = analyze_directory(self.test_dir, rollup_depth=1)
+        assert results == expected
+
+    def test_cache_stays_warm(self):
+        """A repeated request is served from the in-memory cache."""
+        analysis_server = AnalysisServer()
+        analysis_server.analyze(str(self.test_dir))
+        analysis_server.analyze(str(self.test_dir))
+
+        assert analysis_server.stats['scans'] == 2
+        assert analysis_server.cache_for(str(self.test_dir)).stats['file_hits'] == 2
+        assert analysis_server.cache_for(str(self.test_dir)).stats['dir_hits'] == 2
+
+    def test_root_caches_are_bounded(self):
+        """Only the caches of the most recently scanned roots are kept."""
+        analysis_server = AnalysisServer(max_roots=1)
+        analysis_server.analyze(str(self.test_dir))
+        analysis_server.analyze(str(self.test_dir / "src"))
+
+        assert list(analysis_server._roots) == [str(self.test_dir / "src")]
+        analysis_server.analyze(str(self.test_dir))
+        assert analysis_server.cache_for(str(self.test_dir)).stats['file_hits'] == 0
+
+    def test_identical_requests_are_coalesced(self):
+        """Concurrent identical requests share one scan."""
+        analysis_server = AnalysisServer()
+        release = threading.Event()
+        scan = analysis_server._scan
+
+        def slow_scan(path, options):
+            release.wait(5)
+            return scan(path, options)
+
+        analysis_server._scan = slow_scan
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                analysis_server.analyze(str(self.test_dir), {'exclude_patterns': ['.git', 'x']})))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        while analysis_server.stats['requests'] < 4:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 4
+        assert analysis_server.stats['coalesced'] == 3
+        assert all(result == results[0] for result in results)
+
+    def test_different_roots_scan_concurrently(self):
+        """A scan held up on one root does not hold up a scan of another root."""
+        analysis_server = AnalysisServer()
+        release = threading.Event()
+        started = threading.Event()
+        slow_root = str((self.test_dir / "src").resolve())
+        cache_for = analysis_server.cache_for(slow_root)
+        get_listing = cache_for.get_listing
+
+        def slow_listing(directory, mtime_ns):
+            started.set()
+            release.wait(5)
+            return get_listing(directory, mtime_ns)
+
+        cache_for.get_listing = slow_listing
+        thread = threading.Thread(target=analysis_server.analyze, args=(slow_root,))
+        thread.start()
+        try:
+            assert started.wait(5)
+            results = analysis_server.analyze(str(self.test_dir))
+            assert results['summary']['total_files'] == 2
+            assert thread.is_alive()
+        finally:
+            release.set()
+            thread.join()
+
+    def test_allowed_roots(self):
+        """With allowed roots, only directories below them are scanned, also over HTTP."""
+        analysis_server = AnalysisServer([self.test_dir / "src"])
+        assert analysis_server.analyze(str(self.test_dir / "src"))['summary']['total_files'] == 1
+        with pytest.raises(PermissionError):
+            analysis_server.analyze(str(self.test_dir))
+        with pytest.raises(PermissionError):
+            analysis_server.analyze(str(self.test_dir / "src" / ".."))
+
+        server = self._start(analysis_server)
+        try:
+            with pytest.raises(RuntimeError, match='allowed root'):
+                AnalysisClient('127.0.0.1', server.server_address[1]).analyze(self.test_dir)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_non_loopback_host_needs_allowed_roots(self):
+        """Unauthenticated requests are only served on loopback unless the roots are restricted."""
+        assert is_loopback('127.0.0.1') and is_loopback('::1') and is_loopback('localhost')
+        assert not is_loopback('0.0.0.0')
+        with pytest.raises(ValueError):
+            AnalysisServer().make_http_server('0.0.0.0', 0)
+
+        result = CliRunner().invoke(cli.main, ['serve', '--host', '0.0.0.0', '--state-file',
+                                               str(self.test_dir / "state.json")])
+        assert result.exit_code == 2
+        assert '--allow-root' in result.output
+
+    def test_serve_defaults_to_current_directory(self, monkeypatch):
+        """Without --allow-root, ``serve`` only scans below the directory it was started in."""
+        class FakeHTTPServer:
+            server_address = ('127.0.0.1', 1)
+
+            def serve_forever(self):
+                raise KeyboardInterrupt
+
+            def server_close(self):
+                pass
+
+        started = []
+
+        def make_http_server(analysis_server, host, port):
+            started.append(analysis_server)
+            return FakeHTTPServer()
+
+        monkeypatch.setattr(AnalysisServer, 'make_http_server', make_http_server)
+        monkeypatch.chdir(self.test_dir / "src")
+        result = CliRunner().invoke(cli.main, ['serve', '--state-file', str(self.test_dir / "state.json")])
+
+        assert result.exit_code == 0, result.output
+        assert started[0].is_allowed(str(self.test_dir / "src"))
+        assert not started[0].is_allowed(str(self.test_dir))
+
+    @pytest.mark.skipif(not hasattr(os, 'getuid'), reason="file ownership is not available")
+    def test_state_file_of_another_user_is_ignored(self, monkeypatch):
+        """``count`` does not trust a server advertised by another user."""
+        server = self._start(AnalysisServer())
+        state_file = self.test_dir / "state.json"
+        try:
+            write_state_file(state_file, '127.0.0.1', server.server_address[1])
+            assert find_server(state_file) is not None
+
+            uid = os.getuid()
+            monkeypatch.setattr(os, 'getuid', lambda: uid + 1)
+            assert find_server(state_file) is None
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_count_falls_back_when_server_is_gone(self, monkeypatch):
+        """If the server stops answering after it was found, ``count`` scans locally."""
+        monkeypatch.setattr(cli, 'find_server', lambda: AnalysisClient('127.0.0.1', 1, timeout=1))
+        result = CliRunner().invoke(cli.main, [str(self.test_dir)])
+
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output) == analyze_directory(self.test_dir)
+
+    def test_unknown_option_rejected(self):
+        """Only scan options are accepted."""
+        with pytest.raises(ValueError):
+            AnalysisServer().analyze(str(self.test_dir), {'cache': 'x'})
+
+    def test_client_over_http(self):
+        """The client finds the server through the state file and gets results back."""
+        server = self._start(AnalysisServer())
+        state_file = self.test_dir / "state" / "server.json"
+        try:
+            write_state_file(state_file, '127.0.0.1', server.server_address[1])
+            client = find_server(state_file)
+            assert client is not None
+
+            results = client.analyze(self.test_dir, include_extensions={'.py'})
+            assert results['summary']['total_files'] == 1
+            assert results['files'][0]['path'] == 'main.py'
+
+            with pytest.raises(RuntimeError):
+                client.analyze(self.test_dir / "missing")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_no_server_running(self):
+        """Without a live server the client is not used."""
+        assert find_server(self.test_dir / "missing.json") is None
+
+        write_state_file(self.test_dir / "stale.json", '127.0.0.1', 1)
+        assert find_server(self.test_dir / "stale.json") is None
+
+    def test_malformed_server_address(self, monkeypatch):
+        """A malformed address falls back to a local scan instead of failing."""
+        monkeypatch.setenv('LINES_COUNTER_SERVER', 'localhost:abc')
+        assert find_server() is None
+        result = CliRunner().invoke(cli.main, [str(self.test_dir)])
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output) == analyze_directory(self.test_dir)
+
+        monkeypatch.delenv('LINES_COUNTER_SERVER')
+        (self.test_dir / "state.json").write_text('{"host": "127.0.0.1"}')
+        assert find_server(self.test_dir / "state.json") is None
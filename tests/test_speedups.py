@@ -0,0 +1,74 @@
+"""
+Tests for the optional vectorised classification kernel.
+"""
+
+import io
+import random
+import pytest
+from pathlib import Path
+from lines_counter import _speedups
+from lines_counter.file_analyzer import FileAnalyzer
+
+
+pytest.importorskip('numpy')
+
+
+def reference_counts(data: bytes, patterns: dict) -> dict:
+    """Count lines with the scalar implementation."""
+    lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None).readlines()
+    return FileAnalyzer()._count_line_types(lines, patterns)
+
+
+class TestSpeedups:
+    """Test cases for the vectorised kernel."""
+    
+    FRAGMENTS = [
+        '', '   ', '\t', 'code()', '# comment', '// comment', '  // indented',
+        '/* start', 'end */', '/* one line */', 'x = "/*"', '"""', 'a """ b',
+        '=begin', '=end', '<!-- c -->', '<!--', '-->', '-- sql', '; ini', '\x0c',
+    ]
+    
+    def random_source(self, rng: random.Random) -> bytes:
+        """Build a random source file from interesting fragments."""
+        lines = [rng.choice(self.FRAGMENTS) for _ in range(rng.randint(0, 60))]
+        text = '\n'.join(lines)
+        if rng.random() < 0.5:
+            text += '\n'
+        return text.encode()
+    
+    def test_matches_scalar_for_all_languages(self):
+        """The kernel agrees with _count_line_types for every comment pattern."""
+        rng = random.Random(1234)
+        for patterns in FileAnalyzer.COMMENT_PATTERNS.values():
+            for _ in range(50):
+                data = self.random_source(rng)
+                assert _speedups.count_line_types(data, patterns) == reference_counts(data, patterns)
+    
+    def test_falls_back_for_unsupported_buffers(self):
+        """Non-ASCII content and carriage returns are left to the scalar path."""
+        patterns = FileAnalyzer.COMMENT_PATTERNS['.py']
+        assert _speedups.count_line_types('é = 1\n'.encode(), patterns) is None
+        assert _speedups.count_line_types(b'a = 1\r\nb = 2\r\n', patterns) is None
+    
+    def test_selected_for_large_files(self):
+        """analyze_content uses the kernel above the size threshold with identical results."""
+        block = b'# comment\n\ndef f():\n    """doc"""\n    return 1\n'
+        data = block * (_speedups.MIN_KERNEL_SIZE // len(block) + 1)
+        patterns = FileAnalyzer.COMMENT_PATTERNS['.py']
+        
+        result = FileAnalyzer().analyze_content(data, Path('big.py'))
+        assert result == reference_counts(data, patterns)
+        assert result['total'] == 5 * (_speedups.MIN_KERNEL_SIZE // len(block) + 1)
+    
+    def test_metrics_match_scalar(self):
+        """Metrics derived from the kernel's line boundaries agree with the scalar pass."""
+        rng = random.Random(99)
+        patterns = FileAnalyzer.COMMENT_PATTERNS['.js']
+        fragments = self.FRAGMENTS + ['    deep()', 'trailing  ', '\ttab\t', '        ']
+        for _ in range(200):
+            lines = [rng.choice(fragments) for _ in range(rng.randint(0, 40))]
+            data = ('\n'.join(lines) + rng.choice(['', '\n'])).encode()
+            reference = io.StringIO(data.decode(), newline=None).readlines()
+            expected = FileAnalyzer()._count_line_types(reference, patterns, metrics=True)
+            expected['metrics']['bytes'] = len(data)
+            assert _speedups.count_line_types(data, patterns, metrics=True) == expected
@@ -0,0 +1,117 @@
+"""
+Tests for streaming line classification.
+"""
+
+import io
+import json
+import shutil
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from lines_counter import fuzz
+from lines_counter.cli import main
+from lines_counter.core import analyze_stream
+from lines_counter.file_analyzer import FileAnalyzer
+from lines_counter.streaming import LONG_LINE, count_chunks, count_stream
+
+
+PYTHON = FileAnalyzer.COMMENT_PATTERNS['.py']
+C = FileAnalyzer.COMMENT_PATTERNS['.c']
+
+
+class TestStreaming:
+    """Test cases for LineStream, count_stream and analyze_stream."""
+
+    def setup_method(self):
+        """Create a directory for test files."""
+        self.test_dir = Path(__file__).parent / "test_streaming"
+        self.test_dir.mkdir(exist_ok=True)
+
+    def teardown_method(self):
+        """Clean up test files."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+
+    def test_matches_analyze_file_at_every_split(self):
+        """Splitting content anywhere, inside CRLF pairs and characters, changes nothing."""
+        data = '# é\r\nx = 1\r\n\r\n/* ü\r */\rtail \t'.encode('utf-8')
+        for patterns in (PYTHON, C):
+            expected = fuzz.reference_counts(data, patterns, True)
+            for split in range(len(data) + 1):
+                assert count_chunks([data[:split], data[split:]], patterns, True) == expected
+
+    def test_long_lines_are_summarised(self):
+        """Lines longer than LONG_LINE give the same counts and metrics."""
+        data = (b'  ' + b'x' * LONG_LINE + b'/' + b'* c\n' + b'*' * (2 * LONG_LINE) + b'/ \n'
+                + b'\t' * LONG_LINE + b'\n' + b'# ' * LONG_LINE + b'\ncode')
+        chunks = [data[start:start + 1000] for start in range(0, len(data), 1000)]
+
+        assert count_chunks(chunks, C, True) == fuzz.reference_counts(data, C, True)
+        assert count_chunks(chunks, PYTHON, True) == fuzz.reference_counts(data, PYTHON, True)
+
+    def test_encodings(self):
+        """BOMs and UTF-16 are handled; binary streams are not read past the first block."""
+        text = '# comment\r\nx = "ü"\n'
+        analyzer = FileAnalyzer(extra_metrics=True)
+        for data in (text.encode('utf-8-sig'), text.encode('utf-16'), text.encode('utf-16-le')):
+            stream = io.BytesIO(data)
+            assert count_stream(stream, PYTHON, True, chunk_size=3) == analyzer.inspect_content(data, Path('a.py'))
+
+        binary = io.BytesIO(b'\0\1\2\3' * 10000)
+        assert count_stream(binary, PYTHON) == (None, 'binary')
+        assert binary.tell() == 4096
+
+    def test_analyze_stream(self):
+        """A stream gives the result of a one-file directory scan."""
+        result = analyze_stream(io.BytesIO(b'"""doc"""\nx = 1\n'), 'main.py')
+
+        assert result['files'] == [{'path': 'main.py', 'language': 'Python', 'encoding': 'utf-8',
+                                    'lines': {'total': 2, 'code': 1, 'comments': 1, 'blank': 0}}]
+        assert result['languages']['Python']['files'] == 1
+        assert result['skipped'] == [] and result['errors'] == []
+        assert analyze_stream(io.BytesIO(b'\0\1\2\3' * 100), 'a.py')['skipped'] == [{'path': 'a.py', 'reason': 'binary'}]
+
+    def test_cli_stdin_and_single_file(self):
+        """``-`` reads stdin with a language hint; a file path is analyzed on its own."""
+        runner = CliRunner()
+        result = runner.invoke(main, ['-', '--language', 'python'], input='# c\nx = 1\n')
+
+        assert result.exit_code == 0, result.output
+        assert json.loads(result.output)['files'][0]['path'] == 'stdin'
+        assert json.loads(result.output)['files'][0]['language'] == 'Python'
+        assert json.loads(result.output)['summary']['comment_lines'] == 1
+
+        result = runner.invoke(main, ['-', '--filename', 'build.txt', '--language', 'sql'], input='-- c\n')
+        assert json.loads(result.output)['files'][0] == {
+            'path': 'build.txt', 'language': 'SQL', 'encoding': 'utf-8',
+            'lines': {'total': 1, 'code': 0, 'comments': 1, 'blank': 0}
+        }
+
+        result = runner.invoke(main, ['-', '--filename', 'query.sql'], input='-- c\nselect 1;\n')
+        assert json.loads(result.output)['languages']['SQL']['comment_lines'] == 1
+
+        source = self.test_dir / "module.rs"
+        source.write_text("// c\nfn main() {}\n")
+        result = runner.invoke(main, [str(source)])
+        assert json.loads(result.output)['languages']['Rust']['code_lines'] == 1
+
+        result = runner.invoke(main, ['-', '--language', 'cobol'], input='x\n')
+        assert result.exit_code == 2
+
+        for option in (['-e', '.py'], ['-x', 'vendor']):
+            result = runner.invoke(main, [str(source)] + option)
+            assert result.exit_code == 2
+            assert '--extensions and --exclude take a directory' in result.output
+
+        for file_name in ('', '.', '..', '/'):
+            result = runner.invoke(main, ['-', '--filename', file_name, '--language', 'python'], input='x\n')
+            assert result.exit_code == 2, file_name
+            assert 'is not a file name' in result.output
+
+    def test_fuzz_engines_agree(self):
+        """The streaming engines pass the differential fuzzer."""
+        engines = {name: fuzz.ENGINES[name] for name in ('streaming', 'streaming-small')}
+        report = fuzz.run_differential(iterations=20, seed=11, engines=engines)
+
+        assert report['failures'] == []
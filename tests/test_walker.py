@@ -0,0 +1,107 @@
+"""
+Tests for the directory walker.
+"""
+
+import os
+import shutil
+import pytest
+from pathlib import Path
+from lines_counter.core import analyze_directory
+from lines_counter.walker import Walker
+
+
+needs_symlinks = pytest.mark.skipif(not hasattr(os, 'symlink') or os.name == 'nt',
+                                    reason="symlinks are not available")
+
+
+class TestWalker:
+    """Test cases for the Walker class."""
+    
+    def setup_method(self):
+        """Create a small tree."""
+        self.test_dir = Path(__file__).parent / "test_walk"
+        (self.test_dir / "src" / "pkg").mkdir(parents=True, exist_ok=True)
+        (self.test_dir / "src" / "main.py").write_text("print(1)\n")
+        (self.test_dir / "src" / "pkg" / "mod.py").write_text("# mod\nx = 1\n")
+    
+    def teardown_method(self):
+        """Clean up the tree."""
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+    
+    def walked(self, walker: Walker):
+        """Return walked paths relative to the test directory."""
+        return [str(path.relative_to(self.test_dir)) for path, _ in walker.walk(self.test_dir)]
+    
+    def test_walk_order_and_stats(self):
+        """Files are yielded in name order and counted."""
+        walker = Walker()
+        assert self.walked(walker) == [os.path.join('src', 'main.py'), os.path.join('src', 'pkg', 'mod.py')]
+        assert walker.stats['files'] == 2
+        assert walker.stats['directories'] == 3
+    
+    def test_non_recursive(self):
+        """Subdirectories are not entered when recursive is False."""
+        (self.test_dir / "top.py").write_text("x = 1\n")
+        assert self.walked(Walker(recursive=False)) == ['top.py']
+    
+    @needs_symlinks
+    def test_symlink_loop_is_not_followed(self):
+        """A symlink to an ancestor directory does not hang the walk."""
+        os.symlink(self.test_dir / "src", self.test_dir / "src" / "pkg" / "loop")
+        walker = Walker(follow_symlinks=True)
+        
+        assert len(self.walked(walker)) == 2
+        assert walker.stats['skipped_symlink_loops'] == 1
+    
+    @needs_symlinks
+    def test_symlinked_workspace_dedup(self):
+        """A second path to the same directory is only walked once with dedup_inodes."""
+        os.symlink(self.test_dir / "src", self.test_dir / "workspace")
+        
+        assert len(self.walked(Walker(follow_symlinks=True))) == 4
+        
+        walker = Walker(follow_symlinks=True, dedup_inodes=True)
+        assert len(self.walked(walker)) == 2
+        assert walker.stats['skipped_duplicates'] == 1
+    
+    @needs_symlinks
+    def test_no_follow_symlinks(self):
+        """Symlinks are skipped and reported when not followed."""
+        os.symlink(self.test_dir / "src" / "main.py", self.test_dir / "alias.py")
+        walker = Walker(follow_symlinks=False)
+        
+        assert 'alias.py' not in self.walked(walker)
+        assert walker.stats['skipped_symlinks'] == 1
+    
+    @needs_symlinks
+    def test_symlinked_directory_not_counted_twice_by_default(self):
+        """Plain scans do not descend into symlinked directories."""
+        os.symlink(self.test_dir / "src", self.test_dir / "link")
+        
+        results = analyze_directory(self.test_dir)
+        assert sorted(f['path'] for f in results['files']) == [
+            os.path.join('src', 'main.py'), os.path.join('src', 'pkg', 'mod.py')
+        ]
+        assert results['walk']['skipped_symlinks'] == 1
+        assert analyze_directory(self.test_dir, follow_symlinks=True)['summary']['total_files'] == 4
+    
+    def test_hard_links_counted_once(self):
+        """Hard-linked files are analyzed once with dedup_inodes."""
+        try:
+            os.link(self.test_dir / "src" / "main.py", self.test_dir / "copy.py")
+        except (OSError, AttributeError):
+            pytest.skip("hard links are not available")
+        
+        assert analyze_directory(self.test_dir)['summary']['total_files'] == 3
+        
+        results = analyze_directory(self.test_dir, dedup_inodes=True)
+        assert results['summary']['total_files'] == 2
+        assert results['walk']['skipped_duplicates'] == 1
+    
+    def test_excluded_directories_are_pruned(self):
+        """Directories matching exclude patterns are not entered."""
+        results = analyze_directory(self.test_dir, exclude_patterns={'pkg'})
+        
+        assert [f['path'] for f in results['files']] == [os.path.join('src', 'main.py')]
+        assert results['walk']['directories'] == 2